@@ -3,6 +3,7 @@ import os
 from dotenv import load_dotenv
 import time
 from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 from openai import OpenAIError
 
 import random
@@ -153,7 +154,7 @@ CATEGORY_MAP = {
 
 
 # Allowed activity keys for sanitization
-ALLOWED_KEYS = {k for keys in CATEGORY_MAP.values() for k in keys}
+ALLOWED_KEYS = frozenset(k for keys in CATEGORY_MAP.values() for k in keys)
 
 def _sanitize_inputs_for_prompt(user_data: dict) -> dict:
     """Sanitize raw user activity inputs for prompt/context use.
@@ -171,6 +172,8 @@ def _sanitize_inputs_for_prompt(user_data: dict) -> dict:
     if not isinstance(user_data, dict):
         return {}
     out = {}
+    # Read the (replaceable) thresholds once, not per key
+    thresholds = EXTREME_THRESHOLDS
     for k, v in user_data.items():
         if k not in ALLOWED_KEYS:
             continue
@@ -180,7 +183,7 @@ def _sanitize_inputs_for_prompt(user_data: dict) -> dict:
             continue
         if f < 0:
             f = 0.0
-        thr = EXTREME_THRESHOLDS.get(k)
+        thr = thresholds.get(k)
         if isinstance(thr, (int, float)) and f > float(thr):
             f = float(thr)
         out[k] = f
@@ -245,6 +248,11 @@ def _generic_tip_or_clarify() -> str:
         "Would you like a tip about Transport, Meals, or Energy?"
     )
 
+# Matchers used by classify_input_type, compiled once rather than per call
+_ALNUM_RE = re.compile(r"[A-Za-z0-9]")
+_HELP_TEXTS = frozenset({"help", "?", "what should i do?", "what can i do?"})
+_EMOJI_CHARS = frozenset("🚗🍔💡🔥✨🌱😊👍🏽⚡")
+
 def classify_input_type(user_data: dict) -> str:
     """Classify input edge-case type for logging and analysis.
     Returns one of: empty, help, emoji, nonsense, negative, extreme, valid.
@@ -273,13 +281,12 @@ def classify_input_type(user_data: dict) -> str:
     if (not texts) and (not nums):
         return "empty"
     # Help or question
-    if any(t.lower() in {"help", "?", "what should i do?", "what can i do?"} for t in texts if t):
+    if any(t.lower() in _HELP_TEXTS for t in texts if t):
         return "help"
     # Emoji or symbol-heavy (few alnum)
-    import re
-    if any(t and (len(re.findall(r"[A-Za-z0-9]", t)) <= max(1, len(t) // 5)) for t in texts):
+    if any(t and (len(_ALNUM_RE.findall(t)) <= max(1, len(t) // 5)) for t in texts):
         # If contains common emoji/symbols
-        if any(ch for ch in "🚗🍔💡🔥✨🌱😊👍🏽⚡" if (ch in "".join(texts))):
+        if not _EMOJI_CHARS.isdisjoint("".join(texts)):
             return "emoji"
         # Otherwise likely nonsense
         return "nonsense"
@@ -502,18 +509,30 @@ def generate_eco_tip_with_prompt(
     """Generate an eco tip for experimentation, returning (tip_text, prompt_text).
     Respects OPENAI_API_KEY and falls back to local rules; on fallback, returns the constructed prompt with a note.
     """
+    return generate_eco_tips_for_modes(user_data, emissions, [mode], category=category)[mode]
+
+def generate_eco_tips_for_modes(
+    user_data: dict,
+    emissions: float,
+    modes: list[str],
+    category: str | None = None,
+) -> dict[str, tuple[str, str]]:
+    """generate_eco_tip_with_prompt for several prompt modes at once: {mode: (tip_text, prompt_text)}.
+    Sanitizing, the breakdown and the local fallback are computed once for all modes; with an API key
+    the per-mode GPT requests are sent concurrently instead of one after another.
+    """
     # Sanitize inputs
     safe_inputs = _sanitize_inputs_for_prompt(user_data)
 
     # Ambiguity handling: if no meaningful inputs, return general tip + clarification
     if not _has_meaningful_inputs(safe_inputs):
-        tip = _generic_tip_or_clarify()
+        tip = clean_tip(_generic_tip_or_clarify())
         # Still return a synthetic prompt explaining ambiguity handling for logging
         prompt = (
             "Ambiguous inputs detected (no meaningful activity values). "
             "Returning general fallback + clarification question."
         )
-        return clean_tip(tip), prompt
+        return {m: (tip, prompt) for m in modes}
     # Build structured context
     breakdown = _compute_breakdowns(safe_inputs, float(emissions or 0))
     structured_context = (
@@ -522,17 +541,28 @@ def generate_eco_tip_with_prompt(
         f"ACTIVITY BREAKDOWN:\n{breakdown['activity_lines']}\n\n"
         f"CATEGORY BREAKDOWN:\n{breakdown['category_lines']}\n"
     )
-    prompt = _build_prompt_variant(float(emissions or 0), structured_context, mode=mode, category=category)
+    prompts = {m: _build_prompt_variant(float(emissions or 0), structured_context, mode=m, category=category) for m in modes}
 
     if not get_openai_key():
-        tip = local_tip(safe_inputs, emissions)
-        return clean_tip(tip), prompt + "\n\n(Note: Fallback used; no API key)"
+        tip = clean_tip(local_tip(safe_inputs, emissions))
+        return {m: (tip, p + "\n\n(Note: Fallback used; no API key)") for m, p in prompts.items()}
 
-    # Call GPT with the exact prompt
-    tip_text = _gpt_tip_from_prompt(prompt)
-    if not tip_text:
-        tip_text = local_tip(safe_inputs, emissions)
-    return clean_tip(tip_text), prompt
+    # Call GPT with the exact prompts; several modes share the wait for the round trips
+    if len(prompts) > 1:
+        with ThreadPoolExecutor(max_workers=min(4, len(prompts))) as ex:
+            texts = dict(zip(prompts, ex.map(_gpt_tip_from_prompt, prompts.values())))
+    else:
+        texts = {m: _gpt_tip_from_prompt(p) for m, p in prompts.items()}
+    fallback = None
+    out = {}
+    for m, p in prompts.items():
+        tip_text = texts[m]
+        if not tip_text:
+            if fallback is None:
+                fallback = local_tip(safe_inputs, emissions)
+            tip_text = fallback
+        out[m] = (clean_tip(tip_text), p)
+    return out
 
 def local_tip(user_data: dict, emissions: float) -> str:
     """
@@ -1,5 +1,6 @@
 # app.py
 import pandas as pd
+import numpy as np
 import datetime as dt
 import streamlit as st
 st.set_page_config(
@@ -36,16 +37,16 @@ from co2_engine import (
     calculate_co2,
     CO2_FACTORS,
     calculate_co2_breakdown,
-    calculate_co2_v2,
     calculate_co2_breakdown_v2,
-    REGION_FACTOR_PACKS,
+    calculate_co2_with_breakdown_v2,
+    get_region_codes,
     get_engine_meta,
     get_grid_mix,              
     compute_mix_intensity, 
     get_effective_electricity_factor,
-    hourlyIntensityProfile,
+    hourly_profile_with_best,
     suggest_low_hours,
-    compare_tasks_at_hours,
+    compare_tasks_columns,
     calculate_annual_savings,
     DEVICE_PRESETS,
     get_device_presets_by_category,
@@ -62,7 +63,7 @@ from utils import (
 )
 from ai_tips import (
     generate_ai_summary,
-    generate_eco_tip_with_prompt,
+    generate_eco_tips_for_modes,
     classify_input_type,
     set_extreme_thresholds,
     clean_tip,
@@ -70,23 +71,37 @@ from ai_tips import (
 )
 from app_helpers import (
     _coerce_float,
-    has_meaningful_input,
     find_invalid_fields,
+    validate_inputs,
     should_generate_tip,
 )
 import time
+import uuid
 import concurrent.futures
+import functools
 import csv
 import json
 import os
 import random
+import re
 import zipfile
 import altair as alt
-try:
-    from altair_saver import save as alt_save
-except Exception:
-    alt_save = None
-import tempfile
+import importlib.util
+from typing import NamedTuple
+
+# altair_saver pulls in its renderer backends on import, so only check it's installed here
+# and import it the first time a PNG is actually rendered (see alt_save()).
+ALT_SAVER_AVAILABLE = importlib.util.find_spec("altair_saver") is not None
+
+
+@functools.lru_cache(maxsize=None)
+def alt_save():
+    """altair_saver.save, or None if it can't be imported."""
+    try:
+        from altair_saver import save
+    except Exception:
+        return None
+    return save
 
 ENABLE_LATE_PDF = False
 
@@ -122,9 +137,36 @@ CATEGORY_MAP = {
     ],
 }
 ALL_KEYS = [k for keys in CATEGORY_MAP.values() for k in keys]
+# Emission factors and per-category masks aligned with ALL_KEYS, for vectorized totals
+_FACTOR_VEC = np.array([CO2_FACTORS.get(k, 0.0) for k in ALL_KEYS], dtype=np.float64)
+_CAT_MASKS = {cat: np.isin(ALL_KEYS, keys) for cat, keys in CATEGORY_MAP.items()}
+# Category x key factor matrix, so per-category subtotals are one matrix product
+_CATS = list(CATEGORY_MAP)
+_CAT_FACTOR_MATRIX = np.vstack([_FACTOR_VEC * _CAT_MASKS[c] for c in _CATS])
+
+
+def _to_vec(d, keys) -> np.ndarray:
+    """Coerce d[k] for each key into one float64 vector; missing, None and NaN become 0."""
+    return np.nan_to_num(np.array([d.get(k, 0.0) for k in keys], dtype=np.float64), nan=0.0)
+
+# Hour axis shared by the intensity charts and captions
+_HOURS_24 = np.arange(24)
+_HOURS_LABELS = [f"{h:02d}:00" for h in range(24)]
 
 HISTORY_FILE = os.path.join(os.path.dirname(__file__), "history.csv")
 PREFS_PATH = os.path.join(os.path.dirname(__file__), ".user_prefs.json")
+LOGO_PATH = os.path.join(os.path.dirname(__file__), "logo.png")
+
+
+@st.cache_resource(show_spinner=False)
+def read_logo_bytes() -> bytes | None:
+    """Project logo for PDF exports (None if absent). st.cache_resource keeps it across reruns
+    and sessions; an lru_cache here would start empty on every rerun of this script."""
+    try:
+        with open(LOGO_PATH, "rb") as lf:
+            return lf.read()
+    except OSError:
+        return None
 
 
 # =========================
@@ -138,6 +180,25 @@ try:
 except Exception:
     REPORTLAB_AVAILABLE = False
 
+class PdfMargins(NamedTuple):
+    """Page margins in cm for build_eco_tips_pdf."""
+    side: float = 1.5
+    top: float = 1.5
+    bottom: float = 1.5
+
+
+def _as_pdf_margins(margins) -> PdfMargins:
+    """Accept PdfMargins, a plain (side, top, bottom) sequence (e.g. after a JSON
+    round-trip), a legacy {"side", "top", "bottom"} dict, or None for defaults."""
+    if isinstance(margins, PdfMargins):
+        return margins
+    if isinstance(margins, dict):
+        return PdfMargins(*(float(margins.get(k, d)) for k, d in PdfMargins._field_defaults.items()))
+    if margins is None:
+        return PdfMargins()
+    return PdfMargins(*map(float, margins))
+
+
 def build_eco_tips_pdf(
     summary_text: str,
     tip_text: str,
@@ -155,7 +216,7 @@ def build_eco_tips_pdf(
     include_sparklines: bool = False,  # ignored
     spark_data=None,               # ignored
     footer_text: str = None,
-    margins_cm: dict = None,
+    margins_cm: PdfMargins = None,
     text_hex: str = "#111827",
     chart_bg_hex: str = "#FFFFFF",
     experiments_appendix=None      # ignored
@@ -170,9 +231,7 @@ def build_eco_tips_pdf(
         c = canvas.Canvas(buf, pagesize=A4)
 
         # Margins
-        m_side = float(margins_cm.get("side", 1.5)) if isinstance(margins_cm, dict) else 1.5
-        m_top = float(margins_cm.get("top", 1.5)) if isinstance(margins_cm, dict) else 1.5
-        m_bottom = float(margins_cm.get("bottom", 1.5)) if isinstance(margins_cm, dict) else 1.5
+        m_side, m_top, m_bottom = _as_pdf_margins(margins_cm)
         x = m_side * cm
         y = page_h - m_top * cm
 
@@ -283,6 +342,34 @@ def build_eco_tips_pdf(
 # =========================
 # Preferences (persisted across sessions)
 # =========================
+# Edge-case ("extreme" input) thresholds: defaults and the range each limit may be set to
+EDGE_THRESHOLD_DEFAULTS = {
+    "electricity_kwh": 200.0,
+    "natural_gas_m3": 100.0,
+    "hot_water_liter": 2000.0,
+    "petrol_liter": 100.0,
+    "diesel_liter": 100.0,
+    "bus_km": 500.0,
+    "rail_km": 1000.0,
+    "meat_kg": 10.0,
+    "dairy_kg": 15.0,
+    "vegetarian_kg": 20.0,
+}
+EDGE_THRESHOLD_DEFAULTS_JSON = json.dumps(EDGE_THRESHOLD_DEFAULTS, indent=2)
+EDGE_THRESHOLD_BOUNDS = {
+    "electricity_kwh": (1.0, 10000.0),
+    "natural_gas_m3": (1.0, 10000.0),
+    "hot_water_liter": (10.0, 100000.0),
+    "petrol_liter": (1.0, 10000.0),
+    "diesel_liter": (1.0, 10000.0),
+    "bus_km": (1.0, 100000.0),
+    "rail_km": (1.0, 100000.0),
+    "meat_kg": (0.1, 1000.0),
+    "dairy_kg": (0.1, 1000.0),
+    "vegetarian_kg": (0.1, 1000.0),
+}
+
+
 def load_user_prefs() -> dict:
     try:
         if os.path.exists(PREFS_PATH):
@@ -315,11 +402,19 @@ def get_pref(key: str, default=None):
 
 
 def set_pref(key: str, value):
+    set_prefs({key: value})
+
+
+def set_prefs(updates: dict):
+    """Update several prefs with at most one write; nothing is written if no value changed."""
     prefs = st.session_state.get("user_prefs")
     if prefs is None:
         prefs = load_user_prefs()
         st.session_state["user_prefs"] = prefs
-    prefs[key] = value
+    changed = {k: v for k, v in updates.items() if k not in prefs or prefs[k] != v}
+    if not changed:
+        return
+    prefs.update(changed)
     save_user_prefs(prefs)
 
 
@@ -339,19 +434,27 @@ def cached_generate_tip(norm_key: str, emissions: float, cache_salt: int = 0) ->
 
 def compute_category_emissions(activity_data: dict) -> dict:
     """Compute per-category emission subtotals from raw activity inputs."""
-    result: dict = {}
-    for cat, keys in CATEGORY_MAP.items():
-        subtotal = 0.0
-        for k in keys:
-            try:
-                amt = float(activity_data.get(k, 0) or 0)
-            except Exception:
-                amt = 0.0
-            factor = CO2_FACTORS.get(k)
-            if factor is not None:
-                subtotal += amt * factor
-        result[cat] = round(subtotal, 2)
-    return result
+    try:
+        vals = _to_vec(activity_data, ALL_KEYS)
+    except (TypeError, ValueError):
+        # Non-numeric entries count as 0
+        vals = np.nan_to_num(np.array([_coerce_float(activity_data.get(k, 0)) for k in ALL_KEYS], dtype=np.float64))
+    subtotals = _CAT_FACTOR_MATRIX @ vals
+    return {cat: round(float(v), 2) for cat, v in zip(_CATS, subtotals)}
+
+@st.cache_data(show_spinner=False)
+def _cat_emissions_cached(items: tuple) -> dict:
+    return compute_category_emissions(dict(items))
+
+def cached_category_emissions(activity_data: dict) -> dict:
+    """compute_category_emissions memoized with st.cache_data on the sorted (key, value) items.
+    Reruns with unchanged inputs hit the cache and each hit returns a fresh dict; values
+    Streamlit can't hash fall back to a direct call.
+    """
+    try:
+        return _cat_emissions_cached(tuple(sorted(activity_data.items())))
+    except Exception:
+        return compute_category_emissions(activity_data)
 
 @st.cache_data(show_spinner=False)
 def get_cached_mix(region_code):
@@ -370,29 +473,215 @@ def get_cached_implied_intensity(region_code):
     except Exception:
         return None
 
-def load_history() -> pd.DataFrame:
-    cols = ["date", "total_kg"] + ALL_KEYS
-    if os.path.exists(HISTORY_FILE):
-        try:
-            df = pd.read_csv(HISTORY_FILE)
-        except Exception:
-            return pd.DataFrame(columns=cols)
-
-        # Coerce types
-        df["date"] = pd.to_datetime(df.get("date"), errors="coerce")
-        if "total_kg" not in df.columns:
-            df["total_kg"] = 0.0
-        df["total_kg"] = pd.to_numeric(df["total_kg"], errors="coerce").fillna(0.0)
-
-        # Ensure all activity columns exist (used by charts/summary)
-        for k in ALL_KEYS:
-            if k not in df.columns:
-                df[k] = 0.0
-            else:
-                df[k] = pd.to_numeric(df[k], errors="coerce").fillna(0.0)
+@st.cache_data(show_spinner=False)
+def get_cached_engine_meta(region_code):
+    return get_engine_meta(region_code)
+
+@st.cache_data(show_spinner=False)
+def cached_efficiency_score(items: tuple) -> dict:
+    """Efficiency score for user_data passed as sorted (key, value) pairs."""
+    return efficiency_score(dict(items))
 
+@st.cache_data(show_spinner=False)
+def read_file_bytes(path: str, mtime_ns: int, size: int) -> bytes:
+    """Raw file contents, cached per (mtime_ns, size) so download buttons don't re-read on every rerun."""
+    with open(path, "rb") as fh:
+        return fh.read()
+
+# Arrow-backed strings run .str methods in C++ kernels (pyarrow ships with streamlit)
+TEXT_DTYPE = "string[pyarrow]" if importlib.util.find_spec("pyarrow") else "string"
+
+@st.cache_data(show_spinner=False)
+def read_prompt_log(path: str, mtime_ns: int, size: int) -> pd.DataFrame:
+    """Parse prompt_log.csv once per file change (mtime/size are the cache key).
+    category/mode are categoricals so the tab's filters compare integer codes;
+    tip/prompt are Arrow strings and timestamp is parsed for the time-binned charts."""
+    df = pd.read_csv(path, dtype={"category": "category", "mode": "category"})
+    if df.empty:
         return df
-    return pd.DataFrame(columns=cols)
+    for col in ("tip", "prompt"):
+        df[col] = (df[col].astype(str) if col in df.columns else pd.Series("", index=df.index)).astype(TEXT_DTYPE)
+    if "timestamp" in df.columns:
+        df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce", cache=True)
+    return df
+
+@st.cache_data(show_spinner=False)
+def cached_eco_tips_pdf(payload_json: str, logo_bytes: bytes | None = None):
+    """build_eco_tips_pdf with its JSON-serializable kwargs passed as one string,
+    so the PDF is only rebuilt when an input actually changes."""
+    return build_eco_tips_pdf(**json.loads(payload_json), logo_bytes=logo_bytes)
+
+@st.cache_data(show_spinner=False)
+def presets_by_category_sorted() -> dict:
+    """Device preset names grouped by category, with categories and names pre-sorted."""
+    cats = get_device_presets_by_category()
+    return {c: sorted(cats[c]) for c in sorted(cats)}
+
+@st.cache_data(show_spinner=False)
+def columns_csv_bytes(columns: tuple) -> bytes:
+    """UTF-8 CSV for data given as ((column, values), ...); cached so unchanged tables aren't re-serialized."""
+    return pd.DataFrame({c: list(v) for c, v in columns}).to_csv(index=False).encode("utf-8")
+
+@st.cache_data(show_spinner=False)
+def offset_mix_spec(mix: tuple, height: int = 160) -> dict:
+    """Vega-Lite bar spec for an offset project mix given as ((project, share), ...)."""
+    return {
+        "height": height,
+        "mark": "bar",
+        "data": {"values": [{"project": p, "share": float(sh)} for p, sh in mix]},
+        "encoding": {
+            "x": {"field": "project", "type": "nominal", "sort": None, "title": None},
+            "y": {"field": "share", "type": "quantitative", "axis": {"format": ".0%"}},
+            "tooltip": [
+                {"field": "project", "type": "nominal"},
+                {"field": "share", "type": "quantitative", "format": ".0%"},
+            ],
+        },
+    }
+
+
+def _chart_png_bytes(chart, method: str = None) -> bytes:
+    """Render ``chart`` to PNG bytes through altair_saver into an in-memory buffer (uncached)."""
+    save = alt_save()
+    if save is None:
+        raise RuntimeError("altair_saver is not available")
+    bio = io.BytesIO()
+    save(chart, bio, fmt="png", method=method)
+    return bio.getvalue()
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def render_chart_png(spec_json: str, _chart, method: str = "selenium") -> bytes:
+    """Render an Altair chart to PNG bytes via altair_saver.
+    spec_json: the chart's JSON spec, used only as the cache key so repeated
+    downloads of an unchanged chart don't relaunch selenium.
+    method: altair_saver backend; None lets altair_saver pick one.
+    """
+    return _chart_png_bytes(_chart, method)
+
+
+@st.cache_resource(show_spinner=False)
+def _png_pool() -> concurrent.futures.ThreadPoolExecutor:
+    """Background renderer for PNGs that are only needed later (e.g. in exports).
+    One pool per server via st.cache_resource, so reruns and sessions share the 2-worker limit."""
+    return concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix="chart-png")
+
+
+def submit_chart_png(key: str, chart, method: str = None) -> None:
+    """Start rendering ``chart`` to PNG off the script thread; the future lives in session_state[key].
+    An unchanged chart keeps its existing future instead of being queued again."""
+    spec_json = chart.to_json()
+    prev = st.session_state.get(key)
+    if isinstance(prev, tuple) and prev[0] == spec_json:
+        return
+    st.session_state[key] = (spec_json, _png_pool().submit(_chart_png_bytes, chart, method))
+
+
+def chart_png_result(key: str):
+    """PNG bytes from submit_chart_png once rendering has finished, else None."""
+    entry = st.session_state.get(key)
+    if not isinstance(entry, tuple) or not entry[1].done():
+        return None
+    try:
+        return entry[1].result()
+    except Exception:
+        return None
+
+
+def chart_png_export(chart, label: str, file_name: str, key: str) -> None:
+    """Offer a PNG download for a chart, rendering only when the user asks."""
+    if not ALT_SAVER_AVAILABLE:
+        return
+    with st.expander("Export PNG"):
+        if st.button("Render PNG", key=f"{key}_render"):
+            try:
+                png = render_chart_png(chart.to_json(), chart)
+                st.download_button(
+                    label,
+                    data=png,
+                    file_name=file_name,
+                    mime="image/png",
+                    key=key,
+                )
+            except Exception:
+                st.caption("PNG export unavailable (altair_saver/selenium not configured).")
+
+def _history_stamp():
+    """(path, mtime_ns, size) for the history file, or None if it doesn't exist.
+    Used as the cache key so any write to the CSV invalidates the cached frames."""
+    try:
+        stat = os.stat(HISTORY_FILE)
+    except OSError:
+        return None
+    return (HISTORY_FILE, stat.st_mtime_ns, stat.st_size)
+
+
+@st.cache_data(show_spinner=False)
+def _read_history(path: str, mtime_ns: int, size: int) -> pd.DataFrame:
+    cols = ["date", "total_kg"] + ALL_KEYS
+    try:
+        df = pd.read_csv(path)
+    except Exception:
+        return pd.DataFrame(columns=cols)
+
+    # Coerce types
+    df["date"] = pd.to_datetime(df.get("date"), errors="coerce", cache=True)
+    if "total_kg" not in df.columns:
+        df["total_kg"] = 0.0
+    df["total_kg"] = pd.to_numeric(df["total_kg"], errors="coerce").fillna(0.0)
+
+    # Ensure all activity columns exist (used by charts/summary)
+    for k in ALL_KEYS:
+        if k not in df.columns:
+            df[k] = 0.0
+        else:
+            df[k] = pd.to_numeric(df[k], errors="coerce").fillna(0.0)
+
+    return df
+
+
+@st.cache_data(show_spinner=False)
+def _read_history_normalized(path: str, mtime_ns: int, size: int) -> pd.DataFrame:
+    df = _read_history(path, mtime_ns, size)
+    df = df.sort_values("date", kind="stable").reset_index(drop=True)
+    df["date"] = df["date"].dt.date
+    return df
+
+
+def load_history() -> pd.DataFrame:
+    stamp = _history_stamp()
+    if stamp is None:
+        return pd.DataFrame(columns=["date", "total_kg"] + ALL_KEYS)
+    return _read_history(*stamp)
+
+
+def load_history_normalized() -> pd.DataFrame:
+    """History with ``date`` as datetime.date, sorted ascending, fresh 0..n-1 index."""
+    stamp = _history_stamp()
+    if stamp is None:
+        return pd.DataFrame(columns=["date", "total_kg"] + ALL_KEYS)
+    return _read_history_normalized(*stamp)
+
+
+@st.cache_data(show_spinner=False)
+def _category_sparklines(path: str, mtime_ns: int, size: int, days: int) -> dict:
+    dfh = _read_history_normalized(path, mtime_ns, size).dropna(subset=["date"])
+    # Last entry per day (history is date-sorted), then the most recent ``days`` days
+    last = dfh.drop_duplicates("date", keep="last").tail(days)
+    if last.empty:
+        return {}
+    # (days x keys) @ (keys x cats), rounded exactly like compute_category_emissions.
+    # _read_history guarantees every ALL_KEYS column exists as NaN-free floats.
+    cat_matrix = last[ALL_KEYS].to_numpy(dtype=np.float64) @ _CAT_FACTOR_MATRIX.T
+    return {cat: [round(v, 2) for v in cat_matrix[:, i].tolist()] for i, cat in enumerate(_CATS)}
+
+
+def category_sparklines(days: int = 7) -> dict:
+    """{category: [kg per day]} over the last ``days`` history dates, oldest first (for PDF sparklines)."""
+    stamp = _history_stamp()
+    if stamp is None:
+        return {}
+    return _category_sparklines(*stamp, int(days))
 
 
 def save_entry(date_val: dt.date, activity_data: dict, total: float):
@@ -444,6 +733,337 @@ def compute_streak(df: pd.DataFrame, date_val: dt.date) -> int:
     return streak
 
 
+def longest_streak(dates) -> int:
+    """Length of the longest run of consecutive calendar days in ``dates`` (any order, duplicates ok)."""
+    days = np.unique(np.asarray(pd.to_datetime(pd.Series(dates)).dropna(), dtype="datetime64[D]"))
+    if days.size == 0:
+        return 0
+    # Run boundaries are wherever the gap between neighbouring days isn't exactly 1
+    breaks = np.flatnonzero(np.diff(days).astype(np.int64) != 1)
+    edges = np.concatenate(([-1], breaks, [days.size - 1]))
+    return int(np.diff(edges).max())
+
+
+@st.cache_data(show_spinner=False)
+def _leaderboard_stats(path: str, mtime_ns: int, size: int) -> dict:
+    df = _read_history_normalized(path, mtime_ns, size)
+    stats = {"low": None, "high": None, "best_avg7": None, "streak": 0, "top5": df.iloc[:0][["date", "total_kg"]], "last30": df.iloc[:0][["date", "total_kg"]]}
+    if df.empty:
+        return stats
+    # Already sorted by date, so every result below comes from this one ordered view
+    vals = df["total_kg"].to_numpy(dtype=np.float64)
+    dates = df["date"].to_numpy()
+    if not np.isnan(vals).all():
+        i_lo = int(np.nanargmin(vals))
+        i_hi = int(np.nanargmax(vals))
+        stats["low"] = (dates[i_lo], float(vals[i_lo]))
+        stats["high"] = (dates[i_hi], float(vals[i_hi]))
+    # Best 7-day rolling average via prefix sums: window sum = cs[i+7] - cs[i]
+    if len(vals) >= 7:
+        cs = np.r_[0.0, np.cumsum(np.nan_to_num(vals))]
+        stats["best_avg7"] = float((cs[7:] - cs[:-7]).min() / 7.0)
+    stats["streak"] = longest_streak(dates)
+    stats["top5"] = df.nsmallest(5, "total_kg")[["date", "total_kg"]]
+    stats["last30"] = df.tail(30)[["date", "total_kg"]]
+    return stats
+
+
+def leaderboard_stats() -> dict:
+    """Lowest/highest day, best 7-day average, longest streak, top-5 and last-30 from one cached pass."""
+    stamp = _history_stamp()
+    if stamp is None:
+        empty = pd.DataFrame(columns=["date", "total_kg"])
+        return {"low": None, "high": None, "best_avg7": None, "streak": 0, "top5": empty, "last30": empty}
+    return _leaderboard_stats(*stamp)
+
+
+# Shared generator for resampling; callers pass their own (e.g. a seeded one) for reproducible runs
+_RNG = np.random.default_rng()
+
+
+def bootstrap_rate_ci(n, rate_pct, n_boot: int, rng=None):
+    """95% bootstrap CI (in %) for success rates ``rate_pct`` observed over ``n`` trials, one per bin.
+    Each resample is a Binomial(n, p) draw, so all bins are sampled in one call."""
+    n = np.asarray(n, dtype=np.int64)
+    p = np.clip(np.asarray(rate_pct, dtype=np.float64) / 100.0, 0.0, 1.0)
+    if n.size == 0:
+        return np.zeros(0), np.zeros(0)
+    rng = _RNG if rng is None else rng
+    draws = rng.binomial(n[:, None], p[:, None], size=(n.size, int(n_boot)))
+    samples = np.where(n[:, None] > 0, draws / np.maximum(n, 1)[:, None] * 100.0, 0.0)
+    lo, hi = np.percentile(samples, [2.5, 97.5], axis=1, method="lower")
+    return lo, hi
+
+
+def _distinct_bigrams(texts) -> tuple:
+    """Tokenize each distinct text once. Returns (text_ids, bigram_owner, bigram_ids, n_texts, n_bigrams):
+    text_ids maps every input row to its distinct text, and bigram_owner/bigram_ids list the
+    within-text bigrams of each distinct text as integer ids."""
+    text_ids, distinct = pd.factorize(pd.Series(texts, dtype=object).fillna("").to_numpy())
+    toks = pd.Series(distinct, dtype=object).str.split().explode().dropna()
+    codes, _ = pd.factorize(toks.to_numpy())
+    owner = toks.index.to_numpy(dtype=np.int64)
+    # Token ids packed as (first << 32) | second -> one exact int64 key per bigram; only
+    # neighbours from the same text pair up
+    same_text = owner[1:] == owner[:-1]
+    keys = (codes[:-1][same_text].astype(np.int64) << 32) | codes[1:][same_text].astype(np.int64)
+    bigram_ids, bigram_keys = pd.factorize(keys)
+    return text_ids, owner[:-1][same_text], bigram_ids, len(distinct), len(bigram_keys)
+
+
+def bootstrap_mode_cis(tips_low, oks, n_boot: int, rng=None) -> dict:
+    """95% bootstrap CIs (in %) for one mode's OK rate, unique tips and unique bigrams.
+    ``tips_low`` holds normalized tip text. All resamples come from one (n_boot, n) index
+    matrix over integer tip ids, so no replicate touches Python strings."""
+    n = len(tips_low)
+    if n == 0:
+        return {"ok_ci": (0.0, 0.0), "uniq_tips_ci": (0.0, 0.0), "uniq_bi_ci": (0.0, 0.0)}
+    rng = _RNG if rng is None else rng
+    n_boot = int(n_boot)
+    idx = rng.integers(0, n, size=(n_boot, n))
+    ok_samples = np.asarray(oks, dtype=bool)[idx].mean(axis=1) * 100.0
+    # Distinct tips per replicate: sort the drawn ids and count the steps
+    tip_ids, bi_owner, bi_ids, n_tips, n_bigrams = _distinct_bigrams(tips_low)
+    ids = tip_ids[idx]
+    n_distinct = (np.diff(np.sort(ids, axis=1), axis=1) != 0).sum(axis=1) + 1
+    utip_samples = n_distinct / n * 100.0
+    # Bigram membership per distinct tip; a replicate's unique bigrams are the union over its tips
+    member = np.zeros((n_tips, n_bigrams), dtype=np.float32)
+    member[bi_owner, bi_ids] = 1.0
+    present = np.zeros((n_boot, n_tips), dtype=np.float32)
+    present[np.arange(n_boot)[:, None], ids] = 1.0
+    total_bi = np.bincount(bi_owner, minlength=n_tips)[ids].sum(axis=1)
+    uniq_bi = ((present @ member) > 0).sum(axis=1)
+    ubi_samples = np.where(total_bi > 0, uniq_bi / np.maximum(total_bi, 1) * 100.0, 0.0)
+    ok_lo, ok_hi = np.percentile(ok_samples, [2.5, 97.5], method="lower")
+    ut_lo, ut_hi = np.percentile(utip_samples, [2.5, 97.5], method="lower")
+    ub_lo, ub_hi = np.percentile(ubi_samples, [2.5, 97.5], method="lower")
+    return {
+        "ok_ci": (float(ok_lo), float(ok_hi)),
+        "uniq_tips_ci": (float(ut_lo), float(ut_hi)),
+        "uniq_bi_ci": (float(ub_lo), float(ub_hi)),
+    }
+
+
+# Prompt-log tip quality checks, compiled once per process
+TIP_VERBS_RE = re.compile("|".join(map(re.escape, [
+    "try", "switch", "take", "bike", "walk", "reduce", "set", "lower", "replace", "unplug", "turn off", "plan", "use", "install", "carpool",
+])), re.IGNORECASE)
+TIP_CAT_HINT_RE = {
+    cat: re.compile("|".join(map(re.escape, hints)), re.IGNORECASE)
+    for cat, hints in {
+        "Energy": ["electric", "heating", "thermostat", "kwh", "standby", "plug"],
+        "Transport": ["car", "bus", "train", "bike", "walk", "commute", "drive"],
+        "Meals": ["meal", "meat", "plant", "vegan", "vegetarian", "dairy"],
+    }.items()
+}
+FALLBACK_RE = re.compile("fallback used", re.IGNORECASE)
+
+# README.md shipped in the Day-6 report ZIPs
+DAY6_README_MD = "\n".join((
+    "# Day 6 Report Package",
+    "",
+    "## Files",
+    "- prompt_compare.csv — All test rows (mode/category/ok flags/tip/prompt)",
+    "- prompt_compare.md — Summary + full table in Markdown",
+    "- per_mode_metrics.csv — Per-mode OK rate and diversity with 95% CIs",
+    "- per_mode_metrics.md — Per-mode metrics in Markdown",
+    "- ok_rate.png — OK rate bar chart with error bars",
+    "- unique_tips.png — Unique tips % bar chart with error bars",
+    "- unique_bigrams.png — Unique bigrams % bar chart with error bars",
+    "- ok_rate_over_time.png — OK rate over time with 95% CI (if generated)",
+    "- ok_rate_over_time.csv — Data for over-time chart (if generated)",
+    "- report.html — Interactive HTML report (if charts available)",
+    "",
+    "## How to interpret",
+    "- OK rate: percent of tips that are Relevant, Actionable, and Simple.",
+    "- Unique tips %: lexical uniqueness across tips (case-insensitive).",
+    "- Unique bigrams %: n-gram diversity proxy (higher means more varied phrasing).",
+    "- 95% CI: uncertainty from bootstrap resampling.",
+    "",
+    "## input_type taxonomy (heuristics)",
+    "- empty: no usable numeric or text inputs provided",
+    "- help: explicit request for help (e.g., 'help', '?', 'what should I do?')",
+    "- emoji: text dominated by emojis/symbols (very low alphanumeric ratio)",
+    "- nonsense: symbol-heavy/gibberish without clear meaning",
+    "- negative: any numeric input is negative (per field)",
+    "- extreme: numeric input exceeds per-activity sanity thresholds (heuristics)",
+    "- valid: inputs pass the above checks",
+))
+
+
+@st.cache_data(show_spinner=False)
+def tip_quality_flags(tips: pd.Series, categories: pd.Series) -> pd.DataFrame:
+    """relevant/actionable/simple flags per tip, plus ``ok`` when all three hold.
+    Cached on the inputs, so large logs are only scanned once per change."""
+    # Factorize categories once; rows are then selected by integer code
+    cat_codes, cat_names = pd.factorize(categories.astype(str).str.strip(), use_na_sentinel=False)
+    actionable = tips.str.contains(TIP_VERBS_RE)
+    # Uncategorized/mixed tips count as relevant; unknown categories never do
+    relevant = np.isin(cat_names, ["", "Mixed", "Ambiguous"])[cat_codes]
+    # Each tip is only matched against its own category's hints
+    for code, c in enumerate(cat_names):
+        hint_re = TIP_CAT_HINT_RE.get(c)
+        if hint_re is not None:
+            in_cat = cat_codes == code
+            relevant[in_cat] = tips[in_cat].str.contains(hint_re, na=False).to_numpy(dtype=bool)
+    simple = (tips.str.split().str.len() <= 35) & (tips.str.count(r"\.") <= 2)
+    flags = pd.DataFrame({"relevant": relevant, "actionable": actionable, "simple": simple}, index=tips.index).astype(bool)
+    flags["ok"] = flags.all(axis=1)
+    return flags
+
+
+@st.cache_data(show_spinner=False)
+def tip_length_pivots(df_plot: pd.DataFrame, bin_freq: str):
+    """Mean tip words and chars per time bin, one column per mode (for the prompt-log charts)."""
+    # One grouping pass for both measures
+    piv = (df_plot
+           .dropna(subset=["timestamp"])
+           .groupby([pd.Grouper(key="timestamp", freq=bin_freq), "mode"], sort=False, observed=True)  # time bins
+           .agg(words=("words", "mean"), chars=("chars", "mean"))
+           .reset_index())
+    chart_df = piv.pivot(index="timestamp", columns="mode", values="words").sort_index()
+    chart_df_c = piv.pivot(index="timestamp", columns="mode", values="chars").sort_index()
+    return chart_df, chart_df_c
+
+
+@st.cache_data(show_spinner=False)
+def ok_rate_ci_frame(df_ok: pd.DataFrame, bin_freq: str, boot_n: int) -> pd.DataFrame:
+    """OK rate per time bin and mode with bootstrap 95% CI; cached so reruns reuse the same resamples."""
+    agg = (
+        df_ok.dropna(subset=["timestamp"])
+            .groupby([pd.Grouper(key="timestamp", freq=bin_freq), "mode"], sort=False, observed=True)
+            .agg(ok_rate=("ok", "mean"), n=("ok", "size"))
+            .reset_index()
+    )
+    # Built-in mean per group, scaled to % once on the whole column; one row per bin/mode, so
+    # the CIs are plain column arrays too
+    agg["ok_rate"] = agg["ok_rate"].astype(np.float64) * 100.0
+    ci_low, ci_high = bootstrap_rate_ci(agg["n"], agg["ok_rate"], int(boot_n))
+    return agg.assign(ok_ci_low=ci_low, ok_ci_high=ci_high)[["timestamp", "mode", "ok_rate", "ok_ci_low", "ok_ci_high", "n"]]
+
+
+def _bigram_counts(texts: pd.Series) -> tuple:
+    """(total, unique) within-text token bigrams over ``texts``, without building Python tuples.
+    Repeated texts are tokenized once and weighted by how often they occur."""
+    text_ids, bi_owner, _, n_texts, n_bigrams = _distinct_bigrams(texts)
+    total = np.bincount(text_ids, minlength=n_texts) @ np.bincount(bi_owner, minlength=n_texts)
+    return int(total), int(n_bigrams)
+
+
+@st.cache_data(show_spinner=False)
+def prompt_mode_summary(df_modes: pd.DataFrame) -> pd.DataFrame:
+    """Per-mode samples, average words, unique tips/bigrams and fallbacks.
+    Expects columns mode, tip_low (normalized tip text), words and fallback."""
+    grp = df_modes.groupby("mode", dropna=False, sort=False, observed=True)
+    # Counts, means and distinct tips (case-insensitive) in one grouped pass
+    per_mode = grp.agg(
+        samples=("tip_low", "size"),
+        avg_words=("words", "mean"),
+        unique_tips=("tip_low", "nunique"),
+        fallbacks=("fallback", "sum"),
+    )
+    # Bigram distinctiveness; same group keys, so it aligns on the index
+    bigrams = grp["tip_low"].apply(_bigram_counts)
+    total_bi = bigrams.str[0].astype(np.int64)
+    per_mode["unique_bigrams"] = bigrams.str[1].astype(np.int64)
+    per_mode["unique_tips_%"] = per_mode["unique_tips"] / per_mode["samples"] * 100.0
+    per_mode["unique_bigrams_%"] = (per_mode["unique_bigrams"] / total_bi.where(total_bi > 0) * 100.0).fillna(0.0)
+    per_mode["avg_words"] = per_mode["avg_words"].astype(np.float64)
+    per_mode["fallbacks"] = per_mode["fallbacks"].astype(np.int64)
+    cols = ["mode", "samples", "avg_words", "unique_tips", "unique_tips_%", "unique_bigrams", "unique_bigrams_%", "fallbacks"]
+    return per_mode.reset_index()[cols].sort_values("mode")
+
+
+def suite_mode_metrics(df_modes: pd.DataFrame, boot_n: int, rng=None) -> pd.DataFrame:
+    """Per-mode OK rate and tip/bigram diversity with bootstrap 95% CIs for the Day-6 testing suite.
+    Expects columns mode, tip_low (normalized tip text) and ok."""
+    grp = df_modes.groupby("mode", dropna=False, sort=False)
+    per_mode = grp.agg(samples=("tip_low", "size"), ok_rate=("ok", "mean"), unique_tips=("tip_low", "nunique"))
+    bigrams = grp["tip_low"].apply(_bigram_counts)
+    total_bi = bigrams.str[0].astype(np.int64)
+    per_mode["unique_bigrams"] = bigrams.str[1].astype(np.int64)
+    per_mode["ok_rate_%"] = per_mode["ok_rate"].astype(np.float64) * 100.0
+    per_mode["unique_tips_%"] = per_mode["unique_tips"] / per_mode["samples"] * 100.0
+    per_mode["unique_bigrams_%"] = (per_mode["unique_bigrams"] / total_bi.where(total_bi > 0) * 100.0).fillna(0.0)
+    # One vectorized bootstrap per mode; each returns its three (low, high) pairs
+    cis = grp[["tip_low", "ok"]].apply(lambda g: pd.Series(bootstrap_mode_cis(g["tip_low"], g["ok"], boot_n, rng=rng)))
+    for key, name in (("ok_ci", "ok_rate"), ("uniq_tips_ci", "unique_tips"), ("uniq_bi_ci", "unique_bigrams")):
+        per_mode[f"{name}_ci_low"] = cis[key].str[0].astype(np.float64)
+        per_mode[f"{name}_ci_high"] = cis[key].str[1].astype(np.float64)
+    cols = [
+        "mode", "samples", "ok_rate_%", "ok_rate_ci_low", "ok_rate_ci_high",
+        "unique_tips", "unique_tips_%", "unique_tips_ci_low", "unique_tips_ci_high",
+        "unique_bigrams", "unique_bigrams_%", "unique_bigrams_ci_low", "unique_bigrams_ci_high",
+    ]
+    return per_mode.reset_index()[cols].sort_values("mode")
+
+
+def _perturb_inputs(inputs: dict, rng) -> dict:
+    """Apply small random multiplicative noise (±15%) to numeric fields; other values pass through."""
+    if not inputs:
+        return inputs
+    out = {}
+    for k, v in inputs.items():
+        try:
+            f = float(v)
+            noise = 1.0 + rng.uniform(-0.15, 0.15)
+            out[k] = max(0.0, f * noise)
+        except Exception:
+            out[k] = v
+    return out
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def run_prompt_suite(scenarios: list, var_n: int, modes: tuple, boot_n: int, seed: int, thresholds: dict, run_id: str):
+    """Generate and score a tip for every scenario x variation x mode (the Day-6 testing suite).
+    Returns (df_cmp, per_mode_metrics). Cached on all arguments, so reruns after a run (filters,
+    downloads) reuse the results instead of calling the tip generator again; run_id is a unique
+    token for unseeded runs, so repeats with the same settings never share a cache entry, even
+    across sessions (the cache is global). The caller applies thresholds to the
+    classifier beforehand; they are a parameter only so runs with different limits cache apart."""
+    rng = np.random.default_rng(seed) if seed else _RNG
+    # Collect results column by column so the frame is built straight from lists
+    results_cols = {c: [] for c in ("timestamp", "category", "mode", "emissions_est_kg", "tip", "prompt", "input_type", "EC")}
+    # Non-numeric scenarios (e.g. ambiguous notes) survive perturbation unchanged, so their
+    # repeats would rebuild the same prompt; reuse (tip, prompt) for identical inputs within this run
+    tip_memo = {}
+    for (cat, base_inputs) in scenarios:
+        variants = [_perturb_inputs(base_inputs, rng) for _ in range(int(var_n))]
+        # Estimate emissions locally for all variants at once (one matrix product with CO2_FACTORS)
+        em_ests = np.vstack([_to_vec(u or {}, ALL_KEYS) for u in variants]) @ _FACTOR_VEC
+        for user_inputs, em_est in zip(variants, em_ests.tolist()):
+            # Input type depends only on the inputs, so classify once for every mode
+            input_type = classify_input_type(user_inputs)
+            # One call covers every mode, so the shared breakdown and fallback are built once
+            memo_key = (tuple(sorted(user_inputs.items(), key=lambda kv: kv[0])), em_est, cat)
+            if memo_key not in tip_memo:
+                tip_memo[memo_key] = generate_eco_tips_for_modes(user_inputs, float(em_est), list(modes), category=(None if cat in ("Ambiguous", "Mixed") else cat))
+            for m in modes:
+                tip_i, prompt_i = tip_memo[memo_key][m]
+                results_cols["timestamp"].append(dt.datetime.now().isoformat())
+                results_cols["category"].append(cat)
+                results_cols["mode"].append(m)
+                results_cols["emissions_est_kg"].append(f"{em_est:.2f}")
+                results_cols["tip"].append(tip_i)
+                results_cols["prompt"].append(prompt_i)
+                results_cols["input_type"].append(input_type)
+                results_cols["EC"].append("⚠️" if input_type != "valid" else "")
+    df_cmp = pd.DataFrame(results_cols)
+    # Normalize tips once; scoring (case-insensitive patterns) and diversity metrics share it
+    tip_norm = df_cmp["tip"].fillna("").astype(str).str.strip().str.lower()
+    # Score every generated tip in one vectorized pass, keeping the flags right after the tip
+    flags = tip_quality_flags(tip_norm, df_cmp["category"])
+    flags["fallback_used"] = df_cmp["prompt"].fillna("").astype(str).str.contains(FALLBACK_RE)
+    df_cmp = pd.concat([df_cmp.loc[:, :"tip"], flags, df_cmp.loc[:, "prompt":]], axis=1)
+    per_mode_metrics = suite_mode_metrics(
+        pd.DataFrame({"mode": df_cmp["mode"], "tip_low": tip_norm, "ok": df_cmp["ok"]}),
+        int(boot_n),
+        rng=rng,
+    )
+    return df_cmp, per_mode_metrics
+
+
 def award_badges(today_total: float, streak: int, df: pd.DataFrame) -> list:
     badges = []
     if not df.empty:
@@ -583,12 +1203,22 @@ def format_summary_html(user_data: dict) -> str:
     return "\n".join(html_parts)
 
 
+def metric_strip_html(items: list[tuple[str, str]]) -> str:
+    """Return a single flex row of label/value pairs, rendered in one st.markdown call
+    instead of one st.metric widget per column."""
+    cells = "".join(
+        f"<div><div style='font-size:0.85em;opacity:0.7;'>{label}</div>"
+        f"<div style='font-size:1.6em;font-weight:600;'>{value}</div></div>"
+        for label, value in items
+    )
+    return f"<div style='display:flex;gap:2em;flex-wrap:wrap;margin:0.5em 0;'>{cells}</div>"
+
 def dominant_category_icon(user_data: dict) -> tuple[str, str]:
     """Return (icon, category_label) for the dominant emitting category.
     Defaults to neutral if nothing is logged.
     """
     try:
-        cat = compute_category_emissions(user_data)
+        cat = cached_category_emissions(user_data)
     except Exception:
         cat = {}
     if not cat:
@@ -598,6 +1228,26 @@ def dominant_category_icon(user_data: dict) -> tuple[str, str]:
     return (icon_map.get(dom, "💡"), dom)
 
 
+@st.cache_data(show_spinner=False)
+def tips_context(items: tuple, region_code, renewable_adjust) -> dict:
+    """Header icon, summaries and breakdowns for the Eco Tips tab.
+    items: sorted (key, value) pairs of user_data. Cached so reruns from unrelated
+    widgets in the tab skip the summary HTML and per-activity breakdown.
+    """
+    user_data = dict(items)
+    icon, dom = dominant_category_icon(user_data)
+    return {
+        "icon": icon,
+        "dom": dom,
+        "summary": format_summary(user_data),
+        "html": format_summary_html(user_data),
+        "per_activity": calculate_co2_breakdown_v2(
+            user_data, region_code=region_code, renewable_adjust=renewable_adjust
+        ),
+        "cat": compute_category_emissions(user_data),
+    }
+
+
 # =========================
 # Validation helpers
 # =========================
@@ -907,7 +1557,7 @@ def main():
             with st.container():
                 st.markdown("### Regionalization")
                 try:
-                    available_regions = ["(default)"] + sorted(list(REGION_FACTOR_PACKS.keys()))
+                    available_regions = ["(default)"] + get_region_codes()
                 except Exception:
                     available_regions = ["(default)"]
 
@@ -1014,7 +1664,7 @@ def main():
                     st.caption("No grid mix data for this region.")
                 # Factors source
                 try:
-                    meta = get_engine_meta(region_code)
+                    meta = get_cached_engine_meta(region_code)
                     st.caption(f"Factors: {meta.get('source','Default')} {meta.get('version','')}")
                 except Exception:
                     pass
@@ -1506,22 +2156,15 @@ def main():
     # Inline warnings near inputs (if any invalid fields)
     show_input_warnings(user_data)
 
-    # Calculate total emissions
-    emissions = calculate_co2_v2(
+    # Total emissions and the per-activity breakdown (for the breakdown tab) in one pass
+    emissions, per_activity = calculate_co2_with_breakdown_v2(
         user_data,
-        region_code=region_code if 'region_code' in locals() else None,
-        renewable_adjust=renewable_adjust if 'renewable_adjust' in locals() else None,
+        region_code=region_code,
+        renewable_adjust=renewable_adjust,
     )
     # Store for cross-tab visibility (Eco Tips tab)
     st.session_state["emissions_today"] = float(emissions)
 
-    # Compute per-activity once for optional breakdown tab
-    per_activity = calculate_co2_breakdown_v2(
-        user_data,
-        region_code=region_code if 'region_code' in locals() else None,
-        renewable_adjust=renewable_adjust if 'renewable_adjust' in locals() else None,
-    )
-
     # Load history for KPIs and visuals
     history_df = load_history()
     yesterday_total = get_yesterday_total(history_df, selected_date)
@@ -1544,7 +2187,7 @@ def main():
 
         with left_col:
             # Category-wise table
-            cat_emissions = compute_category_emissions(user_data)
+            cat_emissions = cached_category_emissions(user_data)
             st.caption("Category totals (kg CO₂)")
             st.markdown('<div style="max-width:1100px;margin:0 auto;">', unsafe_allow_html=True)
             st.dataframe(
@@ -1559,7 +2202,8 @@ def main():
         with right_col:
             # Save after calculation
             if submitted:
-                invalid = find_invalid_fields(user_data)
+                check = validate_inputs(user_data)
+                invalid = check.invalid
                 if invalid:
                     bad_list = ", ".join(invalid)
                     st.warning(f"Some inputs look invalid (negative or non-numeric): {bad_list}. Please correct them before saving.")
@@ -1575,7 +2219,7 @@ def main():
                                 writer.writerow([dt.datetime.now().isoformat(), "warning:invalid_inputs", f"{emissions:.4f}"])
                         except Exception:
                             pass
-                elif not has_meaningful_input(user_data):
+                elif not check.meaningful:
                     st.warning("No valid input detected – please log at least one activity before saving.")
                     if st.session_state.get("perf_logging", False):
                         log_path = os.path.join(os.getcwd(), "perf_log.csv")
@@ -1596,10 +2240,9 @@ def main():
             history_df = load_history()  # reload after potential save
             if not history_df.empty:
                 st.caption("Trend (Total kg CO₂)")               
-                history_df_display = history_df.copy()
-                history_df_display = history_df_display.dropna(subset=["date"])
-                history_df_display["date"] = history_df_display["date"].dt.date
-                st.line_chart(history_df_display.set_index("date")["total_kg"], height=trend_height)
+                # Keep datetime64 dates for the x axis; no frame copy or object-dtype .dt.date needed
+                trend = history_df.dropna(subset=["date"]).set_index("date")["total_kg"]
+                st.line_chart(trend, height=trend_height)
 
                 # CSV export button
                 csv_buf = io.StringIO()
@@ -1755,7 +2398,7 @@ def main():
                 prev7 = float(s.iloc[-14:-7].sum()) if len(s) >= 14 else 0.0
                 return last7, percentage_change(prev7, last7)
 
-            df_sorted = history_df.sort_values("date").copy()
+            df_sorted = history_df.sort_values("date")
             df_sorted_indexed = df_sorted.set_index("date")
 
             energy_s = _category_series(df_sorted, CATEGORY_MAP["Energy"]) 
@@ -1808,8 +2451,7 @@ def main():
             st.info("No entries yet. Click Calculate & Save on the Dashboard to start your history.")
         else:
             st.caption("All logged entries (most recent shown first)")
-            display_df = history_all.copy()
-            display_df["date"] = display_df["date"].dt.date
+            display_df = history_all.assign(date=history_all["date"].dt.date)
 
             # Constrain width and reduce height for compact view
             st.markdown('<div style="max-width:1100px;margin:0 auto;">', unsafe_allow_html=True)
@@ -1875,21 +2517,12 @@ def main():
                     st.altair_chart(pie, use_container_width=True)
                     
                     # Download button for pie chart (if altair_saver available)
-                    if alt_save:
-                        try:
-                            with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp:
-                                alt_save(pie, tmp.name, method="selenium")
-                                with open(tmp.name, "rb") as f:
-                                    st.download_button(
-                                        "💾 Download Pie",
-                                        data=f.read(),
-                                        file_name=f"grid_mix_pie_{region_code or 'default'}.png",
-                                        mime="image/png",
-                                        key="btn_download_pie",
-                                    )
-                                os.unlink(tmp.name)
-                        except Exception:
-                            pass
+                    chart_png_export(
+                        pie,
+                        "💾 Download Pie",
+                        f"grid_mix_pie_{region_code or 'default'}.png",
+                        "btn_download_pie",
+                    )
                 except Exception:
                     st.bar_chart(df_mix.set_index("source")["share"], height=240)
             
@@ -1905,21 +2538,12 @@ def main():
                     st.altair_chart(bar, use_container_width=True)
                     
                     # Download button for stacked bar (if altair_saver available)
-                    if alt_save:
-                        try:
-                            with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp:
-                                alt_save(bar, tmp.name, method="selenium")
-                                with open(tmp.name, "rb") as f:
-                                    st.download_button(
-                                        "💾 Download Bar",
-                                        data=f.read(),
-                                        file_name=f"grid_mix_bar_{region_code or 'default'}.png",
-                                        mime="image/png",
-                                        key="btn_download_bar",
-                                    )
-                                os.unlink(tmp.name)
-                        except Exception:
-                            pass
+                    chart_png_export(
+                        bar,
+                        "💾 Download Bar",
+                        f"grid_mix_bar_{region_code or 'default'}.png",
+                        "btn_download_bar",
+                    )
                 except Exception:
                     # Fallback: simple bar chart
                     st.bar_chart(df_mix.set_index("source")["share"], height=240)
@@ -1928,8 +2552,8 @@ def main():
             implied = get_cached_implied_intensity(region_code)
             try:
                 effective_ef = get_effective_electricity_factor(
-                    region_code if 'region_code' in locals() else None,
-                    renewable_adjust if 'renewable_adjust' in locals() else None,
+                    region_code,
+                    renewable_adjust,
                 )
             except Exception:
                 effective_ef = CO2_FACTORS.get("electricity_kwh", 0.233)
@@ -1956,7 +2580,7 @@ def main():
 
             # Factors source metadata
             try:
-                meta = get_engine_meta(region_code)
+                meta = get_cached_engine_meta(region_code)
                 st.caption(f"Factors: {meta.get('source','Default')} {meta.get('version','')} {meta.get('url','')}")
             except Exception:
                 pass
@@ -1964,225 +2588,227 @@ def main():
             st.info("No grid mix data available for the selected region.")
     
     with tab_intensity:
-        st.subheader("Hourly Carbon Intensity")
-        st.caption("See how grid carbon intensity varies over 24 hours, and plan high-load activities at low-intensity times.")
+        @st.fragment
+        def _render_intensity_tab():
+            st.subheader("Hourly Carbon Intensity")
+            st.caption("See how grid carbon intensity varies over 24 hours, and plan high-load activities at low-intensity times.")
 
-        # Controls
-        col_s1, col_s2 = st.columns([2, 1])
-        with col_s1:
-            season = st.selectbox("Season", ["Spring", "Summer", "Autumn", "Winter"], index=0, key="intensity_season")
-        with col_s2:
-            st.caption("Profile adapts to your region's grid mix")
+            # Controls
+            col_s1, col_s2 = st.columns([2, 1])
+            with col_s1:
+                season = st.selectbox("Season", ["Spring", "Summer", "Autumn", "Winter"], index=0, key="intensity_season")
+            with col_s2:
+                st.caption("Profile adapts to your region's grid mix")
 
-        # Get 24h profile (kg CO₂/kWh)
-        profile = hourlyIntensityProfile(region_code if 'region_code' in locals() else None, season)
+            # Get 24h profile (kg CO₂/kWh)
+            # Profile and best hour are memoized together in the engine
+            profile, best_hr, best_intensity = hourly_profile_with_best(region_code, season)
+            profile_arr = np.asarray(profile, dtype=np.float64)
 
-        # Chart with color-coded zones
-        try:
-            df_profile = pd.DataFrame({
-                "Hour": list(range(24)),
-                "Intensity": profile,
-            })
-            
-            # Create Altair chart with color zones
+            # Chart with color-coded zones
             try:
-                # Calculate thresholds for color zones
-                min_val = min(profile)
-                max_val = max(profile)
-                range_val = max_val - min_val
-                low_threshold = min_val + range_val * 0.33
-                high_threshold = min_val + range_val * 0.67
-                
-                # Color by intensity level
-                df_profile["Zone"] = df_profile["Intensity"].apply(
-                    lambda x: "Low" if x < low_threshold else ("Medium" if x < high_threshold else "High")
-                )
+                df_profile = pd.DataFrame({
+                    "Hour": _HOURS_24,
+                    "Intensity": profile_arr,
+                })
+            
+                # Create Altair chart with color zones
+                try:
+                    # Calculate thresholds for color zones
+                    min_val = float(profile_arr.min())
+                    max_val = float(profile_arr.max())
+                    range_val = max_val - min_val
+                    low_threshold = min_val + range_val * 0.33
+                    high_threshold = min_val + range_val * 0.67
                 
-                chart = alt.Chart(df_profile).mark_area(
-                    line={"color": "#1f77b4"},
-                    color=alt.Gradient(
-                        gradient="linear",
-                        stops=[
-                            alt.GradientStop(color="#10b981", offset=0),
-                            alt.GradientStop(color="#fbbf24", offset=0.5),
-                            alt.GradientStop(color="#ef4444", offset=1)
-                        ],
-                        x1=1, x2=1, y1=1, y2=0
+                    # Color by intensity level
+                    df_profile["Zone"] = np.where(
+                        profile_arr < low_threshold, "Low",
+                        np.where(profile_arr < high_threshold, "Medium", "High"),
                     )
-                ).encode(
-                    x=alt.X("Hour:Q", axis=alt.Axis(title="Hour of Day", format="02d")),
-                    y=alt.Y("Intensity:Q", axis=alt.Axis(title="kg CO₂/kWh")),
-                    tooltip=[
-                        alt.Tooltip("Hour:Q", format="02d", title="Hour"),
-                        alt.Tooltip("Intensity:Q", format=".4f", title="Intensity"),
-                        alt.Tooltip("Zone:N", title="Zone")
-                    ]
-                ).properties(height=240, width=600)
                 
-                st.altair_chart(chart, use_container_width=True)
+                    chart = alt.Chart(df_profile).mark_area(
+                        line={"color": "#1f77b4"},
+                        color=alt.Gradient(
+                            gradient="linear",
+                            stops=[
+                                alt.GradientStop(color="#10b981", offset=0),
+                                alt.GradientStop(color="#fbbf24", offset=0.5),
+                                alt.GradientStop(color="#ef4444", offset=1)
+                            ],
+                            x1=1, x2=1, y1=1, y2=0
+                        )
+                    ).encode(
+                        x=alt.X("Hour:Q", axis=alt.Axis(title="Hour of Day", format="02d")),
+                        y=alt.Y("Intensity:Q", axis=alt.Axis(title="kg CO₂/kWh")),
+                        tooltip=[
+                            alt.Tooltip("Hour:Q", format="02d", title="Hour"),
+                            alt.Tooltip("Intensity:Q", format=".4f", title="Intensity"),
+                            alt.Tooltip("Zone:N", title="Zone")
+                        ]
+                    ).properties(height=240, width=600)
+                
+                    st.altair_chart(chart, use_container_width=True)
                 
-                # Download button
-                if alt_save:
-                    try:
-                        with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp:
-                            alt_save(chart, tmp.name, method="selenium")
-                            with open(tmp.name, "rb") as f:
-                                st.download_button(
-                                    "💾 Download Chart",
-                                    data=f.read(),
-                                    file_name=f"hourly_intensity_{region_code or 'default'}_{season}.png",
-                                    mime="image/png",
-                                    key="btn_download_intensity",
-                                )
-                            os.unlink(tmp.name)
-                    except Exception:
-                        pass
+                    # Download button
+                    chart_png_export(
+                        chart,
+                        "💾 Download Chart",
+                        f"hourly_intensity_{region_code or 'default'}_{season}.png",
+                        "btn_download_intensity",
+                    )
+                except Exception:
+                    # Fallback to simple line chart
+                    st.line_chart(profile_arr, height=220)
             except Exception:
-                # Fallback to simple line chart
-                idx = list(range(24))
-                st.line_chart(pd.Series(profile, index=idx, name="kg CO₂/kWh"), height=220)
-        except Exception:
-            st.warning("Unable to render chart.")
+                st.warning("Unable to render chart.")
 
-        # Suggested low-intensity hours
-        try:
-            low_hours = suggest_low_hours(profile, top_n=3)
-            low_hours_str = ", ".join([f"{h:02d}:00" for h in sorted(low_hours)])
-            st.caption(f"Best low-carbon hours today: {low_hours_str}")
-        except Exception:
-            st.caption("Best low-carbon hours: n/a")
+            # Suggested low-intensity hours
+            try:
+                low_hours = suggest_low_hours(profile_arr, top_n=3)
+                low_hours_str = ", ".join(_HOURS_LABELS[h] for h in sorted(low_hours))
+                st.caption(f"Best low-carbon hours today: {low_hours_str}")
+            except Exception:
+                st.caption("Best low-carbon hours: n/a")
 
-        st.divider()
-        st.markdown("### What-if: shift a task to a better hour")
+            st.divider()
+            st.markdown("### What-if: shift a task to a better hour")
 
-        # Activity presets + custom
-        activity = st.selectbox("Activity", ["Laundry", "Air Conditioning", "Dishwasher", "Custom"], index=0, key="whatif_activity")
-        default_kwh = 2.0 if activity in ["Laundry", "Dishwasher"] else (3.5 if activity == "Air Conditioning" else 1.0)
-        task_kwh = st.number_input("Task energy (kWh)", min_value=0.0, step=0.1, value=default_kwh, key="whatif_kwh")
-        hour = st.slider("Operating hour", min_value=0, max_value=23, value=20, format="%02d:00", key="whatif_hour")
+            # Activity presets + custom
+            activity = st.selectbox("Activity", ["Laundry", "Air Conditioning", "Dishwasher", "Custom"], index=0, key="whatif_activity")
+            default_kwh = 2.0 if activity in ["Laundry", "Dishwasher"] else (3.5 if activity == "Air Conditioning" else 1.0)
+            task_kwh = st.number_input("Task energy (kWh)", min_value=0.0, step=0.1, value=default_kwh, key="whatif_kwh")
+            hour = st.slider("Operating hour", min_value=0, max_value=23, value=20, format="%02d:00", key="whatif_hour")
 
-        # Impact at chosen hour
-        try:
-            intensity_at_hour = float(profile[int(hour)])
-        except Exception:
-            intensity_at_hour = 0.0
-        co2_kg = task_kwh * intensity_at_hour
+            # Impact at chosen hour
+            try:
+                intensity_at_hour = float(profile_arr[hour])
+            except Exception:
+                intensity_at_hour = 0.0
+            co2_kg = task_kwh * intensity_at_hour
 
-        c1, c2 = st.columns(2)
-        with c1:
-            st.metric("Intensity at selected hour", f"{intensity_at_hour:.3f} kg/kWh")
-        with c2:
-            st.metric("Estimated CO₂ for this task", f"{co2_kg:.2f} kg")
+            c1, c2 = st.columns(2)
+            with c1:
+                st.metric("Intensity at selected hour", f"{intensity_at_hour:.3f} kg/kWh")
+            with c2:
+                st.metric("Estimated CO₂ for this task", f"{co2_kg:.2f} kg")
 
-        # Optional: show comparison vs best hour
-        try:
-            best_hr = min(range(24), key=lambda h: profile[h])
-            best_intensity = profile[best_hr]
-            co2_best = task_kwh * best_intensity
-            delta = co2_kg - co2_best
-            tip_color = "green" if delta > 0 else "blue"
-            st.caption(f"Suggestion: Run at {best_hr:02d}:00 for ~{co2_best:.2f} kg (Δ {delta:+.2f} kg).")
-        except Exception:
-            pass
+            # Optional: show comparison vs best hour
+            try:
+                co2_best = task_kwh * best_intensity
+                delta = co2_kg - co2_best
+                tip_color = "green" if delta > 0 else "blue"
+                st.caption(f"Suggestion: Run at {_HOURS_LABELS[best_hr]} for ~{co2_best:.2f} kg (Δ {delta:+.2f} kg).")
+            except Exception:
+                pass
 
         
-        st.divider()
-        st.markdown("### 💰 Annual Savings Calculator")
-        st.caption("Calculate yearly CO₂ and cost savings from shifting a recurring task to the optimal hour.")
+            st.divider()
+            st.markdown("### 💰 Annual Savings Calculator")
+            st.caption("Calculate yearly CO₂ and cost savings from shifting a recurring task to the optimal hour.")
         
-        col_a1, col_a2 = st.columns(2)
-        with col_a1:
-            recurring_kwh = st.number_input("Daily energy use (kWh)", min_value=0.0, step=0.5, value=2.0, key="recurring_kwh")
-        with col_a2:
-            recurring_hour = st.slider("Current operating hour", min_value=0, max_value=23, value=20, format="%02d:00", key="recurring_hour")
+            col_a1, col_a2 = st.columns(2)
+            with col_a1:
+                recurring_kwh = st.number_input("Daily energy use (kWh)", min_value=0.0, step=0.5, value=2.0, key="recurring_kwh")
+            with col_a2:
+                recurring_hour = st.slider("Current operating hour", min_value=0, max_value=23, value=20, format="%02d:00", key="recurring_hour")
         
-        try:
-            savings_data = calculate_annual_savings(recurring_kwh, recurring_hour, profile)
+            try:
+                savings_data = calculate_annual_savings(recurring_kwh, recurring_hour, profile_arr, best_hour=best_hr)
             
-            col_s1, col_s2, col_s3, col_s4 = st.columns(4)
-            with col_s1:
-                st.metric("Best hour", f"{savings_data['best_hour']:02d}:00")
-            with col_s2:
-                st.metric("Daily savings", f"{savings_data['daily_savings_kg']:.2f} kg")
-            with col_s3:
-                st.metric("Yearly savings", f"{savings_data['yearly_savings_kg']:.1f} kg")
-            with col_s4:
-                st.metric("Cost savings/year", f"${savings_data['yearly_cost_savings_usd']:.2f}")
+                st.markdown(
+                    metric_strip_html([
+                        ("Best hour", f"{savings_data['best_hour']:02d}:00"),
+                        ("Daily savings", f"{savings_data['daily_savings_kg']:.2f} kg"),
+                        ("Yearly savings", f"{savings_data['yearly_savings_kg']:.1f} kg"),
+                        ("Cost savings/year", f"${savings_data['yearly_cost_savings_usd']:.2f}"),
+                    ]),
+                    unsafe_allow_html=True,
+                )
             
-            st.caption(f"💡 Shifting from {recurring_hour:02d}:00 to {savings_data['best_hour']:02d}:00 saves {savings_data['savings_pct']:.1f}% CO₂ per day.")
-        except Exception:
-            st.warning("Unable to calculate savings.")
+                st.caption(f"💡 Shifting from {recurring_hour:02d}:00 to {savings_data['best_hour']:02d}:00 saves {savings_data['savings_pct']:.1f}% CO₂ per day.")
+            except Exception:
+                st.warning("Unable to calculate savings.")
         
-        st.divider()
-        st.markdown("### 📊 Multi-Task Comparison")
-        st.caption("Compare multiple household tasks and see which ones benefit most from load shifting.")
+            st.divider()
+            st.markdown("### 📊 Multi-Task Comparison")
+            st.caption("Compare multiple household tasks and see which ones benefit most from load shifting.")
         
-        # Initialize session state for tasks
-        if "intensity_tasks" not in st.session_state:
-            st.session_state["intensity_tasks"] = [
-                {"name": "Laundry", "kwh": 2.0, "hour": 20},
-                {"name": "Dishwasher", "kwh": 1.8, "hour": 21},
-                {"name": "EV Charging", "kwh": 15.0, "hour": 18},
-            ]
+            # Initialize session state for tasks
+            if "intensity_tasks" not in st.session_state:
+                st.session_state["intensity_tasks"] = [
+                    {"name": "Laundry", "kwh": 2.0, "hour": 20},
+                    {"name": "Dishwasher", "kwh": 1.8, "hour": 21},
+                    {"name": "EV Charging", "kwh": 15.0, "hour": 18},
+                ]
         
-        # Editable task table
-        df_tasks = pd.DataFrame(st.session_state["intensity_tasks"])
-        edited_tasks = st.data_editor(
-            df_tasks,
-            num_rows="dynamic",
-            use_container_width=True,
-            key="intensity_tasks_editor",
-            column_config={
-                "name": st.column_config.TextColumn("Task Name"),
-                "kwh": st.column_config.NumberColumn("Energy (kWh)", min_value=0.0, step=0.1),
-                "hour": st.column_config.NumberColumn("Current Hour", min_value=0, max_value=23, step=1),
-            },
-        )
+            # Editable task table: the base frame is built once; the editor keeps edits as deltas on top of it
+            if "intensity_tasks_df" not in st.session_state:
+                st.session_state["intensity_tasks_df"] = pd.DataFrame(st.session_state["intensity_tasks"])
+
+            def _tasks_changed():
+                st.session_state["intensity_tasks_dirty"] = True
+
+            edited_tasks = st.data_editor(
+                st.session_state["intensity_tasks_df"],
+                num_rows="dynamic",
+                use_container_width=True,
+                key="intensity_tasks_editor",
+                on_change=_tasks_changed,
+                column_config={
+                    "name": st.column_config.TextColumn("Task Name"),
+                    "kwh": st.column_config.NumberColumn("Energy (kWh)", min_value=0.0, step=0.1),
+                    "hour": st.column_config.NumberColumn("Current Hour", min_value=0, max_value=23, step=1),
+                },
+            )
         
-        # Update session state
-        try:
-            st.session_state["intensity_tasks"] = edited_tasks.to_dict("records")
-        except Exception:
-            pass
+            # Update session state only after an actual edit
+            if st.session_state.pop("intensity_tasks_dirty", False):
+                try:
+                    st.session_state["intensity_tasks"] = edited_tasks.to_dict("records")
+                except Exception:
+                    pass
         
-        # Compare button
-        if st.button("🔍 Compare Tasks", key="btn_compare_tasks"):
-            try:
-                comparison = compare_tasks_at_hours(profile, st.session_state["intensity_tasks"])
+            # Compare button
+            if st.button("🔍 Compare Tasks", key="btn_compare_tasks"):
+                try:
+                    comparison = compare_tasks_columns(profile_arr, st.session_state["intensity_tasks"])
                 
-                if comparison:
-                    df_comparison = pd.DataFrame(comparison)
+                    if len(comparison["name"]):
+                        df_comparison = pd.DataFrame(comparison, copy=False)
                     
-                    # Show summary metrics
-                    total_current = df_comparison["current_co2_kg"].sum()
-                    total_optimal = df_comparison["optimal_co2_kg"].sum()
-                    total_savings = total_current - total_optimal
+                        # Show summary metrics
+                        total_current = df_comparison["current_co2_kg"].sum()
+                        total_optimal = df_comparison["optimal_co2_kg"].sum()
+                        total_savings = total_current - total_optimal
                     
-                    col_t1, col_t2, col_t3 = st.columns(3)
-                    with col_t1:
-                        st.metric("Current total CO₂", f"{total_current:.2f} kg")
-                    with col_t2:
-                        st.metric("Optimal total CO₂", f"{total_optimal:.2f} kg")
-                    with col_t3:
-                        st.metric("Total savings", f"{total_savings:.2f} kg", delta=f"-{(total_savings/total_current*100):.1f}%")
+                        col_t1, col_t2, col_t3 = st.columns(3)
+                        with col_t1:
+                            st.metric("Current total CO₂", f"{total_current:.2f} kg")
+                        with col_t2:
+                            st.metric("Optimal total CO₂", f"{total_optimal:.2f} kg")
+                        with col_t3:
+                            st.metric("Total savings", f"{total_savings:.2f} kg", delta=f"-{(total_savings/total_current*100):.1f}%")
                     
-                    # Detailed table
-                    st.dataframe(
-                        df_comparison[[
-                            "name", "kwh", "current_hour", "current_co2_kg",
-                            "optimal_hour", "optimal_co2_kg", "savings_kg", "savings_pct"
-                        ]],
-                        use_container_width=True,
-                        height=300,
-                    )
+                        # Detailed table
+                        st.dataframe(
+                            df_comparison[[
+                                "name", "kwh", "current_hour", "current_co2_kg",
+                                "optimal_hour", "optimal_co2_kg", "savings_kg", "savings_pct"
+                            ]],
+                            use_container_width=True,
+                            height=300,
+                        )
                     
-                    # Highlight best opportunities
-                    best_task = max(comparison, key=lambda t: t["savings_kg"])
-                    st.success(f"🎯 Best opportunity: **{best_task['name']}** - shift from {best_task['current_hour']:02d}:00 to {best_task['optimal_hour']:02d}:00 to save {best_task['savings_kg']:.2f} kg CO₂ ({best_task['savings_pct']:.1f}%)")
-                else:
-                    st.info("No tasks to compare. Add tasks above.")
-            except Exception as e:
-                st.error(f"Comparison failed: {e}")
+                        # Highlight best opportunities
+                        best_task = df_comparison.iloc[int(comparison["savings_kg"].argmax())]
+                        st.success(f"🎯 Best opportunity: **{best_task['name']}** - shift from {best_task['current_hour']:02d}:00 to {best_task['optimal_hour']:02d}:00 to save {best_task['savings_kg']:.2f} kg CO₂ ({best_task['savings_pct']:.1f}%)")
+                    else:
+                        st.info("No tasks to compare. Add tasks above.")
+                except Exception as e:
+                    st.error(f"Comparison failed: {e}")
+
+        _render_intensity_tab()
 
     # Score tab content
     with tab_score:
@@ -2191,7 +2817,7 @@ def main():
 
         # Compute score
         try:
-            sc = efficiency_score(user_data)
+            sc = cached_efficiency_score(tuple(sorted((user_data or {}).items())))
         except Exception:
             sc = {"score": 50, "category_scores": {}, "badges": ["⚠️"], "notes": ["Scoring unavailable."]}
 
@@ -2240,345 +2866,281 @@ def main():
         except Exception:
             y_total = 0.0
 
-        # Basic metrics
-        colA, colB, colC = st.columns(3)
-        with colA:
-            st.metric("Today", fmt_emissions(emissions))
-        with colB:
-            st.metric("Yesterday", fmt_emissions(y_total))
-        with colC:
-            try:
-                pct = percentage_change(y_total, emissions)
-                st.metric("Change vs yesterday", f"{pct:+.1f}%")
-            except Exception:
-                st.metric("Change vs yesterday", "n/a")
+        try:
+            pct_str = f"{percentage_change(y_total, emissions):+.1f}%"
+        except Exception:
+            pct_str = "n/a"
 
-        # 7‑day average and sparkline
+        # 7‑day average and sparkline (date-normalized history, parsed once per file change)
         try:
-            if not df_hist.empty:
-                dfx = df_hist.copy()
-                dfx["date"] = pd.to_datetime(dfx["date"]).dt.date
-                last7 = dfx.sort_values("date").tail(7)
-                avg7 = float(last7["total_kg"].mean()) if not last7.empty else 0.0
-            else:
-                avg7 = 0.0
+            last7 = load_history_normalized().tail(7)
+        except Exception:
+            last7 = pd.DataFrame()
+        try:
+            avg7 = float(last7["total_kg"].mean()) if not last7.empty else 0.0
         except Exception:
             avg7 = 0.0
 
-        colD, colE = st.columns([1, 2])
-        with colD:
-            st.metric("7‑day average", f"{avg7:.2f} kg")
-        with colE:
-            try:
-                if not df_hist.empty:
-                    d7 = df_hist.copy()
-                    d7["date"] = pd.to_datetime(d7["date"]).dt.date
-                    last7 = d7.sort_values("date").tail(7)
-                    st.line_chart(last7.set_index("date")["total_kg"], height=180)
-            except Exception:
-                pass
+        # Basic metrics in one table row
+        st.table(pd.DataFrame({
+            "Today": [fmt_emissions(emissions)],
+            "Yesterday": [fmt_emissions(y_total)],
+            "Change vs yesterday": [pct_str],
+            "7‑day average": [f"{avg7:.2f} kg"],
+        }, index=[""]))
+        try:
+            if not last7.empty:
+                st.line_chart(last7.set_index("date")["total_kg"], height=180)
+        except Exception:
+            pass
 
         # Per‑category sparklines (derived from last 7 rows if available)
         try:
-            if not df_hist.empty:
-                d7 = df_hist.copy()
-                d7["date"] = pd.to_datetime(d7["date"]).dt.date
-                last7 = d7.sort_values("date").tail(7)
-                # compute per‑category from existing columns per day
-                cat_series = {}
-                for _, row in last7.iterrows():
-                    rdict = {k: float(row.get(k, 0) or 0) for k in ALL_KEYS}
-                    cats = compute_category_emissions(rdict)
-                    for c, v in cats.items():
-                        cat_series.setdefault(c, []).append(float(v))
-                if cat_series:
+            if not last7.empty:
+                # compute per‑category from existing columns per day: (rows x keys) @ (keys x cats)
+                X = np.nan_to_num(last7.reindex(columns=ALL_KEYS).to_numpy(dtype=np.float64))
+                cat_matrix = np.round(X @ _CAT_FACTOR_MATRIX.T, 2)
+                if len(cat_matrix):
                     st.markdown("**Per‑category trends (last 7 entries)**")
-                    cc1, cc2, cc3 = st.columns(3)
-                    cols = [cc1, cc2, cc3]
-                    i = 0
-                    for c, vals in cat_series.items():
+                    cols = st.columns(3)
+                    for i, c in enumerate(_CATS):
                         with cols[i % 3]:
                             try:
-                                idx = list(range(len(vals)))
-                                st.line_chart(pd.Series(vals, index=idx, name=c), height=140)
+                                st.line_chart(cat_matrix[:, i], height=140)
                                 st.caption(c)
                             except Exception:
                                 pass
-                        i += 1
         except Exception:
             pass
     
     # Offsets tab content
     with tab_offsets:
-        st.subheader("Offset Suggestions")
-        st.caption("Estimate the cost to offset today or this week. Prices and mix are illustrative (no API).")
+        @st.fragment
+        def _render_offsets_tab():
+            st.subheader("Offset Suggestions")
+            st.caption("Estimate the cost to offset today or this week. Prices and mix are illustrative (no API).")
 
-        # Inputs
-        price = st.slider("Offset price (USD per tCO₂e)", min_value=5, max_value=200, value=15, step=1, key="offset_price")
+            # Inputs
+            price = st.slider("Offset price (USD per tCO₂e)", min_value=5, max_value=200, value=15, step=1, key="offset_price")
 
-        # Compute last 7 sum to represent "this week"
-        try:
-            df_hist = load_history()
-        except Exception:
-            df_hist = pd.DataFrame()
+            # Compute last 7 sum to represent "this week"
+            try:
+                df_hist = load_history_normalized()
+            except Exception:
+                df_hist = pd.DataFrame()
 
-        week_sum = 0.0
-        try:
-            if not df_hist.empty:
-                dfx = df_hist.copy()
-                dfx["date"] = pd.to_datetime(dfx["date"]).dt.date
-                last7 = dfx.sort_values("date").tail(7)
-                week_sum = float(last7["total_kg"].sum()) if not last7.empty else float(emissions or 0.0)
-            else:
+            week_sum = 0.0
+            try:
+                if not df_hist.empty:
+                    last7 = df_hist.tail(7)
+                    week_sum = float(last7["total_kg"].sum()) if not last7.empty else float(emissions or 0.0)
+                else:
+                    week_sum = float(emissions or 0.0)
+            except Exception:
                 week_sum = float(emissions or 0.0)
-        except Exception:
-            week_sum = float(emissions or 0.0)
 
-        offs = estimate_offsets(float(emissions or 0.0), float(week_sum or 0.0), float(price))
-
-        c1, c2 = st.columns(2)
-        with c1:
-            t = offs["today"]
-            st.markdown("**Today**")
-            st.metric("Tonnes CO₂e", f"{t['tonnes']:.3f} t")
-            st.metric("Estimated cost", f"${t['cost_usd']:.2f}")
-            st.caption(f"Price: ${t['price_per_tonne']:.0f}/tCO₂e")
-            st.caption("Suggested mix:")
+            offs = estimate_offsets(float(emissions or 0.0), float(week_sum or 0.0), float(price))
+            # Both periods share the same read-only mix, so one chart key serves both
             try:
-                df_mix = pd.DataFrame(t["mix"])
-                st.bar_chart(df_mix.set_index("project")["share"], height=160)
+                mix_key = tuple((m["project"], m["share"]) for m in offs["today"]["mix"])
             except Exception:
-                pass
-        with c2:
-            w = offs.get("week")
-            st.markdown("**This week**")
-            if w:
-                st.metric("Tonnes CO₂e", f"{w['tonnes']:.3f} t")
-                st.metric("Estimated cost", f"${w['cost_usd']:.2f}")
-                st.caption(f"Price: ${w['price_per_tonne']:.0f}/tCO₂e")
+                mix_key = None
+
+            c1, c2 = st.columns(2)
+            with c1:
+                t = offs["today"]
+                st.markdown("**Today**")
+                st.metric("Tonnes CO₂e", f"{t['tonnes']:.3f} t")
+                st.metric("Estimated cost", f"${t['cost_usd']:.2f}")
+                st.caption(f"Price: ${t['price_per_tonne']:.0f}/tCO₂e")
                 st.caption("Suggested mix:")
-                try:
-                    df_mix_w = pd.DataFrame(w["mix"])
-                    st.bar_chart(df_mix_w.set_index("project")["share"], height=160)
-                except Exception:
-                    pass
-            else:
-                st.info("Not enough data to build a weekly sum.")
+                if mix_key:
+                    st.vega_lite_chart(offset_mix_spec(mix_key), use_container_width=True)
+            with c2:
+                w = offs.get("week")
+                st.markdown("**This week**")
+                if w:
+                    st.metric("Tonnes CO₂e", f"{w['tonnes']:.3f} t")
+                    st.metric("Estimated cost", f"${w['cost_usd']:.2f}")
+                    st.caption(f"Price: ${w['price_per_tonne']:.0f}/tCO₂e")
+                    st.caption("Suggested mix:")
+                    if mix_key:
+                        st.vega_lite_chart(offset_mix_spec(mix_key), use_container_width=True)
+                else:
+                    st.info("Not enough data to build a weekly sum.")
+
+        _render_offsets_tab()
     
     # Planner tab content
     with tab_planner:
-        st.subheader("7‑Day Forecast & Weekly Goal")
-        st.caption("Simple forecast from your history, plus a weekly target planner.")
+        @st.fragment
+        def _render_planner_tab():
+            st.subheader("7‑Day Forecast & Weekly Goal")
+            st.caption("Simple forecast from your history, plus a weekly target planner.")
 
-        # Prepare last N totals
-        try:
-            df_hist = load_history()
-        except Exception:
-            df_hist = pd.DataFrame()
+            # Prepare last N totals
+            try:
+                df_hist = load_history_normalized()
+            except Exception:
+                df_hist = pd.DataFrame()
 
-        last_totals = []
-        try:
-            if not df_hist.empty:
-                dfx = df_hist.copy()
-                dfx["date"] = pd.to_datetime(dfx["date"]).dt.date
-                dfx = dfx.sort_values("date")
-                last_totals = dfx["total_kg"].tail(14).astype(float).tolist()
-            else:
+            last_totals = []
+            try:
+                if not df_hist.empty:
+                    last_totals = df_hist["total_kg"].tail(14).astype(float).tolist()
+                else:
+                    last_totals = [float(emissions or 0.0)]
+            except Exception:
                 last_totals = [float(emissions or 0.0)]
-        except Exception:
-            last_totals = [float(emissions or 0.0)]
 
-        # Forecast
-        fc = simple_forecast_next7(last_totals)
-        try:
-            idx = [f"D+{i+1}" for i in range(7)]
-            st.line_chart(pd.Series(fc, index=idx, name="Forecast (kg CO₂)"), height=220)
-        except Exception:
-            st.warning("Unable to render forecast.")
+            # Forecast
+            fc = simple_forecast_next7(last_totals)
+            try:
+                idx = [f"D+{i+1}" for i in range(7)]
+                st.line_chart(pd.Series(fc, index=idx, name="Forecast (kg CO₂)"), height=220)
+            except Exception:
+                st.warning("Unable to render forecast.")
 
-        # Weekly goal planner
-        st.markdown("### Weekly goal")
-        # Compute current week sum (last 7 entries)
-        try:
-            current_week_sum = 0.0
-            remaining_days = 7
-            if not df_hist.empty:
-                dfx = df_hist.copy()
-                dfx["date"] = pd.to_datetime(dfx["date"]).dt.date
-                last7 = dfx.sort_values("date").tail(7)
-                current_week_sum = float(last7["total_kg"].sum()) if not last7.empty else float(emissions or 0.0)
-                remaining_days = int(7 - len(last7)) if not last7.empty else 6
-                remaining_days = max(1, min(7, remaining_days))
-            else:
+            # Weekly goal planner
+            st.markdown("### Weekly goal")
+            # Compute current week sum (last 7 entries)
+            try:
+                current_week_sum = 0.0
+                remaining_days = 7
+                if not df_hist.empty:
+                    last7 = df_hist.tail(7)
+                    current_week_sum = float(last7["total_kg"].sum()) if not last7.empty else float(emissions or 0.0)
+                    remaining_days = int(7 - len(last7)) if not last7.empty else 6
+                    remaining_days = max(1, min(7, remaining_days))
+                else:
+                    current_week_sum = float(emissions or 0.0)
+                    remaining_days = 6
+            except Exception:
                 current_week_sum = float(emissions or 0.0)
                 remaining_days = 6
-        except Exception:
-            current_week_sum = float(emissions or 0.0)
-            remaining_days = 6
 
-        target = st.number_input("Weekly target (kg CO₂)", min_value=0.0, value=max(0.0, round(current_week_sum + sum(fc), 1)), step=1.0)
-        plan = weekly_goal_plan(current_week_sum, remaining_days, float(target))
+            target = st.number_input("Weekly target (kg CO₂)", min_value=0.0, value=max(0.0, round(current_week_sum + sum(fc), 1)), step=1.0)
+            plan = weekly_goal_plan(current_week_sum, remaining_days, float(target))
 
-        c1, c2 = st.columns(2)
-        with c1:
-            st.metric("Required per remaining day", f"{plan['required_per_day']:.2f} kg/day")
-        with c2:
-            st.metric("Delta vs current daily avg", f"{plan['delta_vs_current_avg']:+.2f} kg/day")
-
-        st.markdown("### What‑if reductions")
-        colA, colB, colC = st.columns(3)
-        with colA:
-            r_energy = st.slider("Energy reduction (%)", 0, 50, 10, help="Apply to electricity/gas inputs.")
-        with colB:
-            r_transport = st.slider("Transport reduction (%)", 0, 50, 10)
-        with colC:
-            r_meals = st.slider("Meals reduction (%)", 0, 50, 10)
-
-        # Rough what‑if: scale today's inputs by category and recompute total
-        try:
-            tmp = dict(user_data or {})
-            for k in CATEGORY_MAP["Energy"]:
-                if k in tmp and isinstance(tmp[k], (int, float)):
-                    tmp[k] = float(tmp[k]) * (1.0 - r_energy/100.0)
-            for k in CATEGORY_MAP["Transport"]:
-                if k in tmp and isinstance(tmp[k], (int, float)):
-                    tmp[k] = float(tmp[k]) * (1.0 - r_transport/100.0)
-            for k in CATEGORY_MAP["Meals"]:
-                if k in tmp and isinstance(tmp[k], (int, float)):
-                    tmp[k] = float(tmp[k]) * (1.0 - r_meals/100.0)
-            # Re-estimate emissions locally
-            em_whatif = 0.0
-            for k, v in tmp.items():
-                try:
-                    em_whatif += float(v or 0) * CO2_FACTORS.get(k, 0.0)
-                except Exception:
-                    pass
-        except Exception:
-            em_whatif = float(emissions or 0.0)
+            c1, c2 = st.columns(2)
+            with c1:
+                st.metric("Required per remaining day", f"{plan['required_per_day']:.2f} kg/day")
+            with c2:
+                st.metric("Delta vs current daily avg", f"{plan['delta_vs_current_avg']:+.2f} kg/day")
 
-        st.caption(f"What‑if estimated total today: {em_whatif:.2f} kg (current: {fmt_emissions(emissions)})")
+            st.markdown("### What‑if reductions")
+            colA, colB, colC = st.columns(3)
+            with colA:
+                r_energy = st.slider("Energy reduction (%)", 0, 50, 10, help="Apply to electricity/gas inputs.")
+            with colB:
+                r_transport = st.slider("Transport reduction (%)", 0, 50, 10)
+            with colC:
+                r_meals = st.slider("Meals reduction (%)", 0, 50, 10)
+
+            # Rough what‑if: scale today's inputs by category and recompute total
+            try:
+                scale = 1.0 - (
+                    r_energy * _CAT_MASKS["Energy"]
+                    + r_transport * _CAT_MASKS["Transport"]
+                    + r_meals * _CAT_MASKS["Meals"]
+                ) / 100.0
+                # Re-estimate emissions locally
+                em_whatif = float((_to_vec(user_data or {}, ALL_KEYS) * scale) @ _FACTOR_VEC)
+            except Exception:
+                em_whatif = float(emissions or 0.0)
+
+            st.caption(f"What‑if estimated total today: {em_whatif:.2f} kg (current: {fmt_emissions(emissions)})")
+
+        _render_planner_tab()
 
     # renewables tab content    
     with tab_renewables:
-        st.subheader("Renewables Tracker")
-        st.caption("See how your renewable percentage affects electricity emissions. Uses your current sidebar setting when no region is selected.")
+        @st.fragment
+        def _render_renewables_tab():
+            st.subheader("Renewables Tracker")
+            st.caption("See how your renewable percentage affects electricity emissions. Uses your current sidebar setting when no region is selected.")
 
-        # Current renewable settings (from sidebar)
-        try:
-            renewable_pct = int(st.session_state.get("ui_renewable_pct_box", 0))
-        except Exception:
-            renewable_pct = 0
-        st.metric("Renewable adjustment", f"{renewable_pct}%")
+            # Current renewable settings (from sidebar)
+            try:
+                renewable_pct = int(st.session_state.get("ui_renewable_pct_box", 0))
+            except Exception:
+                renewable_pct = 0
+            st.metric("Renewable adjustment", f"{renewable_pct}%")
 
-        # Base vs adjusted electricity factor
-        try:
-            base_ef = float(CO2_FACTORS.get("electricity_kwh", 0.233))
-            # If a region is selected, factor is governed by that region and not the renewable slider.
-            if region_code:
-                # Factor in use via region
-                ef_use = float(get_effective_electricity_factor(region_code, None))
-                note = "Region override active. Renewable slider does not apply."
-            else:
-                ef_use = float(get_effective_electricity_factor(None, renewable_pct / 100.0))
-                note = "Default region. Renewable slider applies."
-        except Exception:
-            ef_use = base_ef
-            note = "Factor unavailable, using defaults."
+            # Base vs adjusted electricity factor
+            try:
+                base_ef = float(CO2_FACTORS.get("electricity_kwh", 0.233))
+                # If a region is selected, factor is governed by that region and not the renewable slider.
+                if region_code:
+                    # Factor in use via region
+                    ef_use = float(get_effective_electricity_factor(region_code, None))
+                    note = "Region override active. Renewable slider does not apply."
+                else:
+                    ef_use = float(get_effective_electricity_factor(None, renewable_pct / 100.0))
+                    note = "Default region. Renewable slider applies."
+            except Exception:
+                ef_use = base_ef
+                note = "Factor unavailable, using defaults."
 
-        c1, c2, c3 = st.columns([1, 1, 2])
-        with c1:
-            st.metric("Base factor", f"{base_ef:.3f} kg/kWh")
-        with c2:
-            st.metric("Factor in use", f"{ef_use:.3f} kg/kWh")
-        with c3:
-            delta = base_ef - ef_use
-            st.metric("Delta vs base", f"{delta:+.3f} kg/kWh")
-            st.caption(note)
+            c1, c2, c3 = st.columns([1, 1, 2])
+            with c1:
+                st.metric("Base factor", f"{base_ef:.3f} kg/kWh")
+            with c2:
+                st.metric("Factor in use", f"{ef_use:.3f} kg/kWh")
+            with c3:
+                delta = base_ef - ef_use
+                st.metric("Delta vs base", f"{delta:+.3f} kg/kWh")
+                st.caption(note)
 
-        # Estimated savings for today from renewable adjustment (only when default region)
-        try:
-            elec_kwh_today = float(user_data.get("electricity_kwh", 0) or 0)
-        except Exception:
-            elec_kwh_today = 0.0
-        savings_today = elec_kwh_today * max(0.0, base_ef - (ef_use if not region_code else base_ef))
-        st.caption(f"Estimated savings today: {savings_today:.2f} kg CO₂")
+            # Estimated savings for today from renewable adjustment (only when default region)
+            try:
+                elec_kwh_today = float(user_data.get("electricity_kwh", 0) or 0)
+            except Exception:
+                elec_kwh_today = 0.0
+            savings_today = elec_kwh_today * max(0.0, base_ef - (ef_use if not region_code else base_ef))
+            st.caption(f"Estimated savings today: {savings_today:.2f} kg CO₂")
 
-        # Weekly (last 7 entries) savings estimate, only when default region
-        try:
-            df_hist = load_history()
-        except Exception:
-            df_hist = pd.DataFrame()
+            # Weekly (last 7 entries) savings estimate, only when default region
+            try:
+                df_hist = load_history_normalized()
+            except Exception:
+                df_hist = pd.DataFrame()
 
-        try:
-            if not df_hist.empty:
-                dfx = df_hist.copy()
-                dfx["date"] = pd.to_datetime(dfx["date"]).dt.date
-                last7 = dfx.sort_values("date").tail(7)
-                if not last7.empty:
-                    kwh7 = float(last7.get("electricity_kwh", pd.Series(dtype=float)).fillna(0.0).sum())
+            try:
+                if not df_hist.empty:
+                    last7 = df_hist.tail(7)
+                    if not last7.empty:
+                        kwh7 = float(last7.get("electricity_kwh", pd.Series(dtype=float)).fillna(0.0).sum())
+                    else:
+                        kwh7 = float(elec_kwh_today)
                 else:
                     kwh7 = float(elec_kwh_today)
-            else:
+            except Exception:
                 kwh7 = float(elec_kwh_today)
-        except Exception:
-            kwh7 = float(elec_kwh_today)
 
-        savings_week = kwh7 * max(0.0, base_ef - (ef_use if not region_code else base_ef))
-        st.caption(f"Estimated savings (last 7 entries): {savings_week:.2f} kg CO₂")
+            savings_week = kwh7 * max(0.0, base_ef - (ef_use if not region_code else base_ef))
+            st.caption(f"Estimated savings (last 7 entries): {savings_week:.2f} kg CO₂")
 
-        # Simple visualization: base vs adjusted factor bar
-        try:
-            df_f = pd.DataFrame({"factor": ["Base", "In use"], "kg_per_kwh": [base_ef, ef_use]})
-            st.bar_chart(df_f.set_index("factor")["kg_per_kwh"], height=180)
-        except Exception:
-            pass
+            # Simple visualization: base vs adjusted factor bar
+            try:
+                df_f = pd.DataFrame({"factor": ["Base", "In use"], "kg_per_kwh": [base_ef, ef_use]})
+                st.bar_chart(df_f.set_index("factor")["kg_per_kwh"], height=180)
+            except Exception:
+                pass
+
+        _render_renewables_tab()
     
     # leaderboard tab content
     with tab_leaderboard:
         st.subheader("Local Leaderboard")
         st.caption("Your best streaks and days from local history.")
 
-        try:
-            df_hist = load_history()
-        except Exception:
-            df_hist = pd.DataFrame()
-
         # Cards: best (lowest) day, highest day, best 7-day average, longest streak
-        low_day, high_day, best_avg7, longest_streak = None, None, None, 0
         try:
-            if not df_hist.empty:
-                dfx = df_hist.copy()
-                dfx["date"] = pd.to_datetime(dfx["date"]).dt.date
-                dfx = dfx.sort_values("date")
-
-                # Lowest and highest single days
-                low_idx = dfx["total_kg"].idxmin()
-                high_idx = dfx["total_kg"].idxmax()
-                if pd.notna(low_idx):
-                    low_day = (dfx.loc[low_idx, "date"], float(dfx.loc[low_idx, "total_kg"]))
-                if pd.notna(high_idx):
-                    high_day = (dfx.loc[high_idx, "date"], float(dfx.loc[high_idx, "total_kg"]))
-
-                # Best 7-day rolling average
-                if len(dfx) >= 7:
-                    roll = dfx["total_kg"].rolling(7).mean()
-                    ridx = roll.idxmin()
-                    if pd.notna(ridx):
-                        best_avg7 = float(roll.loc[ridx])
-
-                # Longest streak
-                # Recompute streaks by scanning consecutive dates
-                dates = sorted(dfx["date"].unique())
-                max_streak, cur = 0, 1 if dates else 0
-                for i in range(1, len(dates)):
-                    if dates[i] == dates[i-1] + dt.timedelta(days=1):
-                        cur += 1
-                    else:
-                        max_streak = max(max_streak, cur)
-                        cur = 1
-                longest_streak = max(max_streak, cur)
+            lb = leaderboard_stats()
         except Exception:
-            pass
+            lb = {"low": None, "high": None, "best_avg7": None, "streak": 0, "top5": pd.DataFrame(), "last30": pd.DataFrame()}
+        low_day, high_day, best_avg7, longest_streak_days = lb["low"], lb["high"], lb["best_avg7"], lb["streak"]
 
         c1, c2, c3, c4 = st.columns(4)
         with c1:
@@ -2594,14 +3156,12 @@ def main():
         with c3:
             st.metric("Best 7-day avg", f"{(best_avg7 if best_avg7 is not None else 0.0):.2f} kg")
         with c4:
-            st.metric("Longest streak", f"{int(longest_streak)} days")
+            st.metric("Longest streak", f"{int(longest_streak_days)} days")
 
         # Top 5 lowest days table
         try:
-            if not df_hist.empty:
-                dfx2 = df_hist.copy()
-                dfx2["date"] = pd.to_datetime(dfx2["date"]).dt.date
-                top5 = dfx2.sort_values("total_kg").head(5)[["date", "total_kg"]]
+            top5 = lb["top5"]
+            if not top5.empty:
                 st.markdown("**Top 5 lowest days**")
                 st.dataframe(top5.set_index("date"), use_container_width=True, height=180)
         except Exception:
@@ -2609,10 +3169,8 @@ def main():
 
         # Last 30 days chart
         try:
-            if not df_hist.empty:
-                d30 = df_hist.copy()
-                d30["date"] = pd.to_datetime(d30["date"]).dt.date
-                d30 = d30.sort_values("date").tail(30)
+            d30 = lb["last30"]
+            if not d30.empty:
                 st.markdown("**Last 30 entries**")
                 st.bar_chart(d30.set_index("date")["total_kg"], height=200)
         except Exception:
@@ -2629,11 +3187,24 @@ def main():
             {"Appliance": "AC", "Power_W": 1200, "Hours_per_day": 4.0},
             {"Appliance": "Lights", "Power_W": 60, "Hours_per_day": 6.0},
         ]
-        if "appliance_estimator_df" not in st.session_state:
-            st.session_state["appliance_estimator_df"] = pd.DataFrame(
-                default_rows, columns=["Appliance", "Power_W", "Hours_per_day"]
+        # Rows are kept column-wise (dict of lists) so adding a device is an append, not a concat;
+        # the DataFrame is only materialized for the editor/export.
+        appliance_cols = ["Appliance", "Power_W", "Hours_per_day"]
+
+        def _as_columns(records):
+            return {c: [r[c] for r in records] for c in appliance_cols}
+
+        def _appliance_frame(rows):
+            # Watts fit in int32 and hours in float32; blank cells are stored as 0
+            frame = pd.DataFrame(rows, columns=appliance_cols)
+            return frame.assign(
+                Power_W=pd.to_numeric(frame["Power_W"], errors="coerce").fillna(0).round().astype("int32"),
+                Hours_per_day=pd.to_numeric(frame["Hours_per_day"], errors="coerce").fillna(0).astype("float32"),
             )
 
+        if "appliance_rows" not in st.session_state:
+            st.session_state["appliance_rows"] = _as_columns(default_rows)
+
         # Controls: CSV import/export, period toggle, quick presets
         ctop1, ctop2, ctop3, ctop4 = st.columns([1, 1, 1, 2])
         with ctop1:
@@ -2642,7 +3213,7 @@ def main():
             try:
                 st.download_button(
                     label="Export CSV",
-                    data=st.session_state["appliance_estimator_df"].to_csv(index=False).encode("utf-8"),
+                    data=columns_csv_bytes(tuple((c, tuple(st.session_state["appliance_rows"][c])) for c in appliance_cols)),
                     file_name="appliances.csv",
                     mime="text/csv",
                     key="appliance_csv_dl",
@@ -2663,39 +3234,31 @@ def main():
                     help="Automatically adjusts AC/heating usage based on season"
                 )
                 
-                st.caption("Click any device to add it to your list")
+                st.caption("Pick devices in a category, then add them to your list")
                 
                 # Get devices by category
                 try:
-                    categories = get_device_presets_by_category()
+                    categories = presets_by_category_sorted()
                 except Exception:
                     categories = {}
                 
-                # Display by category with expanders
-                for category in sorted(categories.keys()):
-                    with st.expander(f"{category} ({len(categories[category])} devices)"):
-                        for device_name in sorted(categories[category]):
-                            if st.button(f"➕ {device_name}", key=f"add_preset_{device_name}"):
-                                try:
-                                    device_info = DEVICE_PRESETS[device_name]
-                                    base_hours = device_info["hours_per_day"]
-                                    
-                                    # Apply seasonal adjustment
-                                    adjusted_hours = apply_seasonal_adjustment(device_name, season_est, base_hours)
-                                    
-                                    new_row = {
-                                        "Appliance": device_name,
-                                        "Power_W": device_info["power_w"],
-                                        "Hours_per_day": adjusted_hours,
-                                    }
-                                    
-                                    st.session_state["appliance_estimator_df"] = pd.concat(
-                                        [st.session_state["appliance_estimator_df"], pd.DataFrame([new_row])],
-                                        ignore_index=True,
-                                    )
-                                    st.success(f"Added {device_name}")
-                                except Exception as e:
-                                    st.warning(f"Could not add {device_name}: {e}")
+                # One multiselect + one button per category instead of a button per device
+                for category, device_names in categories.items():
+                    with st.expander(f"{category} ({len(device_names)} devices)"):
+                        selected = st.multiselect(category, options=device_names, key=f"lib_{category}", label_visibility="collapsed")
+                        if st.button(f"➕ Add selected ({len(selected)})", key=f"add_selected_{category}", disabled=not selected):
+                            try:
+                                infos = [DEVICE_PRESETS[name] for name in selected]
+                                powers = [info["power_w"] for info in infos]
+                                # Apply seasonal adjustment
+                                hours = [apply_seasonal_adjustment(name, season_est, info["hours_per_day"]) for name, info in zip(selected, infos)]
+                                rows = st.session_state["appliance_rows"]
+                                rows["Appliance"].extend(selected)
+                                rows["Power_W"].extend(powers)
+                                rows["Hours_per_day"].extend(hours)
+                                st.success(f"Added {', '.join(selected)}")
+                            except Exception as e:
+                                st.warning(f"Could not add devices: {e}")
             
             # Quick household profiles
             with st.popover("🏠 Quick Profiles"):
@@ -2711,7 +3274,7 @@ def main():
                             {"Appliance": "Washing Machine", "Power_W": 500, "Hours_per_day": 0.7},
                             {"Appliance": "Microwave", "Power_W": 1200, "Hours_per_day": 0.3},
                         ]
-                        st.session_state["appliance_estimator_df"] = pd.DataFrame(profile_devices)
+                        st.session_state["appliance_rows"] = _as_columns(profile_devices)
                         st.success("Loaded Small Apartment profile")
                     except Exception:
                         st.warning("Could not load profile")
@@ -2730,7 +3293,7 @@ def main():
                             {"Appliance": "Air Conditioner (Large)", "Power_W": 1800, "Hours_per_day": 6.0},
                             {"Appliance": "Electric Water Heater", "Power_W": 4000, "Hours_per_day": 2.0},
                         ]
-                        st.session_state["appliance_estimator_df"] = pd.DataFrame(profile_devices)
+                        st.session_state["appliance_rows"] = _as_columns(profile_devices)
                         st.success("Loaded Family Home profile")
                     except Exception:
                         st.warning("Could not load profile")
@@ -2749,7 +3312,7 @@ def main():
                             {"Appliance": "EV Charging (Level 2)", "Power_W": 7200, "Hours_per_day": 4.0},
                             {"Appliance": "Central AC", "Power_W": 3500, "Hours_per_day": 8.0},
                         ]
-                        st.session_state["appliance_estimator_df"] = pd.DataFrame(profile_devices)
+                        st.session_state["appliance_rows"] = _as_columns(profile_devices)
                         st.success("Loaded High-Tech Home profile")
                     except Exception:
                         st.warning("Could not load profile")
@@ -2757,12 +3320,17 @@ def main():
         # Handle CSV import
         if uploaded is not None:
             try:
-                imp = pd.read_csv(uploaded)
+                try:
+                    imp = pd.read_csv(uploaded, engine="pyarrow", dtype_backend="pyarrow")
+                except Exception:
+                    # pyarrow missing or unable to parse this file: fall back to the C engine
+                    uploaded.seek(0)
+                    imp = pd.read_csv(uploaded)
                 needed = {"Appliance", "Power_W", "Hours_per_day"}
                 if not needed.issubset(set(imp.columns)):
                     st.error("CSV must contain columns: Appliance, Power_W, Hours_per_day")
                 else:
-                    st.session_state["appliance_estimator_df"] = imp[list(needed)]
+                    st.session_state["appliance_rows"] = {c: imp[c].tolist() for c in appliance_cols}
                     st.success("Imported.")
             except Exception as e:
                 st.error(f"Failed to import CSV: {e}")
@@ -2771,55 +3339,55 @@ def main():
         
         # Show device count and total power
         try:
-            device_count = len(st.session_state["appliance_estimator_df"])
-            total_power = st.session_state["appliance_estimator_df"]["Power_W"].sum()
+            device_count = len(st.session_state["appliance_rows"]["Appliance"])
+            total_power = np.nansum(np.asarray(st.session_state["appliance_rows"]["Power_W"], dtype=np.float64))
             st.caption(f"📊 **{device_count} devices** | Total rated power: **{total_power:,.0f} W**")
         except Exception:
             pass
         df = st.data_editor(
-            st.session_state["appliance_estimator_df"],
+            _appliance_frame(st.session_state["appliance_rows"]),
             num_rows="dynamic",
             use_container_width=True,
             key="appliance_estimator_table",
             column_config={
                 "Appliance": st.column_config.TextColumn("Appliance"),
-                "Power_W": st.column_config.NumberColumn("Power (W)", min_value=0, step=10),
+                "Power_W": st.column_config.NumberColumn("Power (W)", min_value=0, step=10, format="%d"),
                 "Hours_per_day": st.column_config.NumberColumn("Hours/day", min_value=0.0, step=0.25),
             },
         )
-        # Persist editor changes
+        # Persist editor changes only when the table content actually changed
         try:
-            st.session_state["appliance_estimator_df"] = df.copy()
+            new_hash = int(pd.util.hash_pandas_object(df, index=False).sum())
+            if new_hash != st.session_state.get("_appliance_hash"):
+                st.session_state["appliance_rows"] = {c: df[c].tolist() for c in appliance_cols}
+                # float32 -> Python float would otherwise carry noise like 0.699999988 into the CSV export
+                st.session_state["appliance_rows"]["Hours_per_day"] = np.round(pd.to_numeric(df["Hours_per_day"], errors="coerce").to_numpy(dtype=np.float64), 6).tolist()
+                st.session_state["_appliance_hash"] = new_hash
         except Exception:
             pass
 
-        # Compute per-row and total kWh/day
-        def _row_kwh(w, h):
-            try:
-                wv = max(0.0, float(w))
-                hv = max(0.0, float(h))
-                return (wv * hv) / 1000.0
-            except Exception:
-                return 0.0
+        # Compute per-row and total kWh/day (non-numeric or negative cells count as 0)
+        def _num_col(name):
+            if name not in df.columns:
+                return np.zeros(len(df))
+            arr = pd.to_numeric(df[name], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+            return np.clip(np.nan_to_num(arr), 0.0, None)
 
-        df_calc = df.copy()
-        df_calc["kWh_day"] = df_calc.apply(
-            lambda r: _row_kwh(r.get("Power_W", 0), r.get("Hours_per_day", 0)), axis=1
-        )
+        kwh = _num_col("Power_W") * _num_col("Hours_per_day") / 1000.0
         
         # Determine effective electricity factor consistent with v2 rules
         try:
             effective_ef = get_effective_electricity_factor(
-                region_code if 'region_code' in locals() else None,
-                renewable_adjust if 'renewable_adjust' in locals() else None,
+                region_code,
+                renewable_adjust,
             )
         except Exception:
             effective_ef = CO2_FACTORS.get("electricity_kwh", 0.233)
 
         # Per-row CO2/day and totals
-        df_calc["CO2_kg_day"] = df_calc["kWh_day"] * float(effective_ef)
-        total_kwh_day = float(df_calc["kWh_day"].sum() if "kWh_day" in df_calc.columns else 0.0)
-        total_co2_day = float(df_calc["CO2_kg_day"].sum() if "CO2_kg_day" in df_calc.columns else 0.0)
+        co2 = kwh * float(effective_ef)
+        total_kwh_day = float(kwh.sum())
+        total_co2_day = float(co2.sum())
 
         # Period scaling
         mult = 1.0
@@ -2846,7 +3414,7 @@ def main():
 
         # Show table with computed kWh/day and CO2/day
         st.dataframe(
-            df_calc["Appliance Power_W Hours_per_day kWh_day CO2_kg_day".split()],
+            df.assign(kWh_day=kwh, CO2_kg_day=co2)["Appliance Power_W Hours_per_day kWh_day CO2_kg_day".split()],
             use_container_width=True,
             height=260,
         )
@@ -2864,7 +3432,8 @@ def main():
                 st.error(f"Could not apply: {e}")
 
     with tab_tips:
-        icon_hdr, dom_hdr = dominant_category_icon(user_data)
+        tips_ctx = tips_context(tuple(sorted((user_data or {}).items())), region_code, renewable_adjust)
+        icon_hdr, dom_hdr = tips_ctx["icon"], tips_ctx["dom"]
         st.subheader(f"{icon_hdr} Personalized Eco Tips")
         st.caption(f"Get a personalized tip based on today’s inputs and total emissions. Dominant today: {dom_hdr}.")
 
@@ -2878,9 +3447,9 @@ def main():
 
         # Compact summary of today's inputs for context
         st.markdown("**Summary of today’s activities**")
-        summary_str = format_summary(user_data)
+        summary_str = tips_ctx["summary"]
         # Colored tag summary (HTML)
-        st.markdown(format_summary_html(user_data), unsafe_allow_html=True)
+        st.markdown(tips_ctx["html"], unsafe_allow_html=True)
         # Explicitly show today's total emissions coming from backend/session
         em_today = float(st.session_state.get("emissions_today", emissions))
         st.metric("Today's total (backend)", fmt_emissions(em_today))
@@ -2896,22 +3465,11 @@ def main():
             src_label = st.session_state.get("last_tip_source", "Unknown")
 
             # Build data for PDF
-            per_activity_local = calculate_co2_breakdown_v2(
-                user_data,
-                region_code=region_code if 'region_code' in locals() else None,
-                renewable_adjust=renewable_adjust if 'renewable_adjust' in locals() else None,
-            )
-            cat_breakdown = compute_category_emissions(user_data)
+            per_activity_local = tips_ctx["per_activity"]
+            cat_breakdown = tips_ctx["cat"]
 
             # Optional logo
-            logo_bytes = None
-            try:
-                logo_path = os.path.join(os.path.dirname(__file__), "logo.png")
-                if os.path.exists(logo_path):
-                    with open(logo_path, "rb") as lf:
-                        logo_bytes = lf.read()
-            except Exception:
-                logo_bytes = None
+            logo_bytes = read_logo_bytes()
 
             # Safe defaults for PDF options (in case controls render later in the tab)
             pdf_title = st.session_state.get("pdf_title", "Eco Tips Report")
@@ -2930,33 +3488,47 @@ def main():
             em_today = float(st.session_state.get("emissions_today", emissions))
             ctx = {
                 "today_total": fmt_emissions(em_today),
-                "yesterday_total": fmt_emissions(yesterday_total) if 'yesterday_total' in locals() else "",
-                "delta_pct": f"{percentage_change(yesterday_total, em_today):.2f}%" if 'yesterday_total' in locals() else "",
-                "streak_days": f"{streak} days" if 'streak' in locals() else "",
+                "yesterday_total": fmt_emissions(yesterday_total),
+                "delta_pct": f"{percentage_change(yesterday_total, em_today):.2f}%",
+                "streak_days": f"{streak} days",
             }
 
-            pdf_bytes, err = build_eco_tips_pdf(
-                summary_str,
-                tip_for_pdf,
-                st.session_state.get("ai_summary_text"),  # may be None
-                em_today,
-                date_str,
-                src_label,
-                per_activity_local,
-                cat_breakdown,
-                ctx,
-                logo_bytes=logo_bytes,
-                title_text=pdf_title,
-                primary_color=pdf_primary_color,
-                include_pie=pdf_include_pie,
-                include_sparklines=pdf_include_spark,
-                spark_data=None,
-                footer_text=pdf_footer_text if pdf_include_footer else None,
-                margins_cm={"side": pdf_side_margin, "top": pdf_top_margin, "bottom": pdf_bottom_margin},
-                text_hex=pdf_text_color,
-                chart_bg_hex=pdf_chart_bg,
-                experiments_appendix=None,
-            )
+            # Build only after the user asks for it; later reruns hit the cache unless inputs change
+            if st.button("Prepare PDF", key="prepare_pdf_quick"):
+                st.session_state["pdf_quick_requested"] = True
+            if not st.session_state.get("pdf_quick_requested"):
+                st.download_button(
+                    label=" Download Eco Tips PDF (Quick)",
+                    data=b"",
+                    file_name=f"eco_tips_{date_str}.pdf",
+                    mime="application/pdf",
+                    key="download_eco_tips_pdf_quick",
+                    disabled=True,
+                )
+                pdf_bytes, err = None, None
+            else:
+                payload = json.dumps({
+                    "summary_text": summary_str,
+                    "tip_text": tip_for_pdf,
+                    "ai_summary_text": st.session_state.get("ai_summary_text"),  # may be None
+                    "emissions_today": em_today,
+                    "date_str": date_str,
+                    "src_label": src_label,
+                    "per_activity": per_activity_local,
+                    "category_breakdown": cat_breakdown,
+                    "ctx": ctx,
+                    "title_text": pdf_title,
+                    "primary_color": pdf_primary_color,
+                    "include_pie": pdf_include_pie,
+                    "include_sparklines": pdf_include_spark,
+                    "spark_data": None,
+                    "footer_text": pdf_footer_text if pdf_include_footer else None,
+                    "margins_cm": PdfMargins(float(pdf_side_margin), float(pdf_top_margin), float(pdf_bottom_margin)),
+                    "text_hex": pdf_text_color,
+                    "chart_bg_hex": pdf_chart_bg,
+                    "experiments_appendix": None,
+                }, sort_keys=True, default=str)
+                pdf_bytes, err = cached_eco_tips_pdf(payload, logo_bytes)
 
             if pdf_bytes:
                 st.download_button(
@@ -3053,44 +3625,37 @@ def main():
                 st.info("No prompt_log.csv found yet. Run a prompt experiment to create it.")
             else:
                 try:
-                    df_log = pd.read_csv(log_path)
+                    log_stat = os.stat(log_path)
+                    df_log = read_prompt_log(log_path, log_stat.st_mtime_ns, log_stat.st_size)
                 except Exception as e:
                     st.error(f"Could not read prompt_log.csv: {e}.")
                     df_log = None
 
                 if df_log is not None and not df_log.empty:
-                    # Basic hygiene
-                    df_log["tip"] = df_log.get("tip", "").astype(str)
-                    df_log["prompt"] = df_log.get("prompt", "").astype(str)
-                    # Parse timestamp if present
-                    if "timestamp" in df_log.columns:
-                        with pd.option_context('mode.copy_on_write', False):
-                            try:
-                                df_log["timestamp"] = pd.to_datetime(df_log["timestamp"], errors="coerce")
-                            except Exception:
-                                pass
-
-                    # Category filter
-                    cats = sorted([c for c in df_log.get("category", pd.Series(dtype=str)).dropna().unique().tolist() if str(c).strip()])
+                    # Category filter (category/mode are categoricals: options come from the categories, no column scan)
+                    cats = sorted([c for c in df_log.get("category", pd.Series(dtype="category")).cat.categories.tolist() if str(c).strip()])
                     chosen_cat = st.selectbox("Filter by category", options=["All"] + cats, index=0)
-                    dfv = df_log if chosen_cat == "All" else df_log[df_log["category"].astype(str) == chosen_cat]
+                    dfv = df_log if chosen_cat == "All" else df_log[df_log["category"] == chosen_cat]
                     # Mode filter
-                    modes = sorted([m for m in df_log.get("mode", pd.Series(dtype=str)).dropna().unique().tolist() if str(m).strip()])
+                    modes = sorted([m for m in df_log.get("mode", pd.Series(dtype="category")).cat.categories.tolist() if str(m).strip()])
                     chosen_mode = st.selectbox("Filter by mode", options=["All"] + modes, index=0)
                     if chosen_mode != "All":
-                        dfv = dfv[dfv["mode"].astype(str) == chosen_mode]
+                        dfv = dfv[dfv["mode"] == chosen_mode]
                     if dfv.empty:
                         st.info("No rows match the current filter.")
                         st.stop()
 
                     total = len(dfv)
-                    tip_words = dfv["tip"].fillna("").apply(lambda s: len(str(s).split()))
-                    tip_chars = dfv["tip"].fillna("").apply(lambda s: len(str(s)))
+                    # Tip text features, computed once and reused by the metrics, charts and per-mode summary below
+                    tips = dfv["tip"].fillna("")
+                    tips_low = tips.str.strip().str.lower()
+                    tip_words = tips.str.split().str.len().astype("int32")
+                    tip_chars = tips.str.len().astype("int32")
                     avg_words = float(tip_words.mean()) if total else 0.0
                     avg_chars = float(tip_chars.mean()) if total else 0.0
-                    uniq_tips = dfv["tip"].fillna("").str.strip().str.lower().nunique()
+                    uniq_tips = tips_low.nunique()
                     uniq_pct = (uniq_tips / total * 100.0) if total else 0.0
-                    fallback_mask = dfv["prompt"].fillna("").str.contains("Fallback used", case=False, na=False)
+                    fallback_mask = dfv["prompt"].fillna("").str.contains(FALLBACK_RE)
                     fallback_count = int(fallback_mask.sum())
 
                     cA, cB, cC, cD = st.columns(4)
@@ -3131,29 +3696,18 @@ def main():
                         )
                         if bin_choice != default_bin:
                             set_pref("prompt_time_bin", bin_choice)
-                    bin_freq = "H" if bin_choice == "Hourly" else "D"
+                    bin_freq = "h" if bin_choice == "Hourly" else "D"
                     try:
-                        df_plot = dfv.copy()
-                        df_plot["words"] = df_plot["tip"].fillna("").apply(lambda s: len(str(s).split()))
-                        df_plot["chars"] = df_plot["tip"].fillna("").apply(lambda s: len(str(s)))
-                        if "timestamp" in df_plot.columns and df_plot["timestamp"].notna().any() and "mode" in df_plot.columns:
-                            piv = (df_plot
-                                   .dropna(subset=["timestamp"]) 
-                                   .groupby([pd.Grouper(key="timestamp", freq=bin_freq), "mode"])  # time bins
-                                   .agg(words=("words", "mean"))
-                                   .reset_index())
-                            chart_df = piv.pivot(index="timestamp", columns="mode", values="words").sort_index()
+                        if "timestamp" in dfv.columns and dfv["timestamp"].notna().any() and "mode" in dfv.columns:
+                            # Only the columns the aggregation needs (no full copy of dfv); cached, so
+                            # switching chart type only re-renders
+                            df_plot = pd.DataFrame({"timestamp": dfv["timestamp"], "mode": dfv["mode"], "words": tip_words, "chars": tip_chars})
+                            chart_df, chart_df_c = tip_length_pivots(df_plot, bin_freq)
                             if chart_choice == "Line":
                                 st.line_chart(chart_df, height=220)
                             else:
                                 st.bar_chart(chart_df, height=220)
                             # Characters chart
-                            piv_c = (df_plot
-                                     .dropna(subset=["timestamp"]) 
-                                     .groupby([pd.Grouper(key="timestamp", freq=bin_freq), "mode"])  # time bins
-                                     .agg(chars=("chars", "mean"))
-                                     .reset_index())
-                            chart_df_c = piv_c.pivot(index="timestamp", columns="mode", values="chars").sort_index()
                             st.caption("Characters over time by mode")
                             if chart_choice == "Line":
                                 st.line_chart(chart_df_c, height=200)
@@ -3169,44 +3723,12 @@ def main():
                     show_ok_ci = st.checkbox("Show OK-rate with CIs", value=False, key="prompt_okrate_ci_toggle")
                     bootN = st.number_input("Bootstraps", min_value=100, max_value=2000, value=300, step=50, key="prompt_okrate_bootN") if show_ok_ci else 300
                     if show_ok_ci:
-                        def _score_flags_row(row):
-                            t = str(row.get("tip", "")).lower()
-                            words = len(t.split())
-                            verbs = ["try", "switch", "take", "bike", "walk", "reduce", "set", "lower", "replace", "unplug", "turn off", "plan", "use", "install", "carpool"]
-                            actionable = any(v in t for v in verbs)
-                            cat = str(row.get("category", "")).strip()
-                            cat_hints = {
-                                "Energy": ["electric", "heating", "thermostat", "kwh", "standby", "plug"],
-                                "Transport": ["car", "bus", "train", "bike", "walk", "commute", "drive"],
-                                "Meals": ["meal", "meat", "plant", "vegan", "vegetarian", "dairy"],
-                            }
-                            hints = cat_hints.get(cat, [])
-                            relevant = True if (cat == "" or cat == "Mixed" or cat == "Ambiguous") else any(h in t for h in hints)
-                            simple = (words <= 35) and (t.count('.') <= 2)
-                            return bool(relevant and actionable and simple)
-
-                        df_ok = dfv.copy()
-                        df_ok["ok"] = df_ok.apply(_score_flags_row, axis=1)
-                        agg = (
-                            df_ok.dropna(subset=["timestamp"]) 
-                                .groupby([pd.Grouper(key="timestamp", freq=bin_freq), "mode"]) 
-                                .agg(ok_rate=("ok", lambda s: float(s.mean())*100.0), n=("ok","size"))
-                                .reset_index()
-                        )
-                        # Bootstrap CIs per bin/mode
-                        rows_ok = []
-                        for (ts, md_), ggrp in agg.groupby(["timestamp", "mode"], dropna=False):
-                            ok_rate = float(ggrp["ok_rate"].iloc[0]); n = int(ggrp["n"].iloc[0])
-                            samples = []
-                            for _ in range(int(bootN)):
-                                p = max(0.0, min(1.0, ok_rate/100.0))
-                                ones = sum(1 for __ in range(n) if random.random() < p)
-                                samples.append((ones/n)*100.0 if n>0 else 0.0)
-                            samples.sort()
-                            lo = samples[int(0.025*(len(samples)-1))] if samples else 0.0
-                            hi = samples[int(0.975*(len(samples)-1))] if samples else 0.0
-                            rows_ok.append({"timestamp": ts, "mode": md_, "ok_rate": ok_rate, "ok_ci_low": lo, "ok_ci_high": hi, "n": n})
-                        df_ok_ci = pd.DataFrame(rows_ok)
+                        # The bootstrap is one binomial draw per bin, so its cost doesn't grow with the log;
+                        # the per-row scoring is what scales, and it's cached per log/filter state
+                        cat = dfv["category"] if "category" in dfv.columns else pd.Series("", index=dfv.index)
+                        df_ok = pd.DataFrame({"timestamp": dfv["timestamp"], "mode": dfv["mode"], "ok": tip_quality_flags(tips, cat)["ok"]})
+                        # Bootstrap CIs per bin/mode (cached on the data, bin and bootstrap count)
+                        df_ok_ci = ok_rate_ci_frame(df_ok, bin_freq, int(bootN))
 
                         try:
                             if not df_ok_ci.empty:
@@ -3224,14 +3746,10 @@ def main():
                             st.altair_chart(ok_time_chart, use_container_width=True)
 
                             # Save PNG to session for ZIP export if altair_saver available
-                            if alt_save is not None:
+                            if ALT_SAVER_AVAILABLE:
                                 try:
-                                    import tempfile
-                                    tmpf = tempfile.NamedTemporaryFile(suffix=".png", delete=False)
-                                    alt_save(ok_time_chart, tmpf.name, fmt="png")
-                                    with open(tmpf.name, "rb") as _f:
-                                        st.session_state["ok_rate_time_png"] = _f.read()
-                                    os.unlink(tmpf.name)
+                                    # Rendered in the background; unchanged specs keep their pending/finished render
+                                    submit_chart_png("ok_rate_time_png", ok_time_chart)
                                 except Exception:
                                     st.session_state["ok_rate_time_png"] = None
 
@@ -3253,36 +3771,12 @@ def main():
                         # Per-mode stats if available
                         if "mode" in dfv.columns:
                             try:
-                                grp = dfv.groupby("mode", dropna=False)
-                                rows = []
-                                for mode_name, g in grp:
-                                    tips_norm = g["tip"].fillna("").str.strip().str.lower().tolist()
-                                    # Unique tips (case-insensitive)
-                                    uniq = len(set(tips_norm))
-                                    uniq_ratio = (uniq/len(g)*100.0) if len(g) else 0.0
-                                    # Bigram distinctiveness
-                                    def bigrams_of(s: str):
-                                        toks = [t for t in s.split() if t]
-                                        return list(zip(toks, toks[1:])) if len(toks) > 1 else []
-                                    all_bigrams = []
-                                    for t in tips_norm:
-                                        all_bigrams.extend(bigrams_of(t.lower().strip()))
-                                    total_bi = len(all_bigrams)
-                                    uniq_bi = len(set(all_bigrams))
-                                    uniq_bi_ratio = (uniq_bi/total_bi*100.0) if total_bi else 0.0
-                                    avg_w = float(g["tip"].fillna("").apply(lambda s: len(str(s).split())).mean()) if len(g)>0 else 0.0
-                                    fallbacks = int(g["prompt"].fillna("").str.contains("Fallback used", case=False, na=False).sum())
-                                    rows.append({
-                                        "mode": mode_name,
-                                        "samples": len(g),
-                                        "avg_words": avg_w,
-                                        "unique_tips": uniq,
-                                        "unique_tips_%": uniq_ratio,
-                                        "unique_bigrams": uniq_bi,
-                                        "unique_bigrams_%": uniq_bi_ratio,
-                                        "fallbacks": fallbacks,
-                                    })
-                                per_mode = pd.DataFrame(rows).sort_values("mode")
+                                per_mode = prompt_mode_summary(pd.DataFrame({
+                                    "mode": dfv["mode"],
+                                    "tip_low": tips_low,
+                                    "words": tip_words,
+                                    "fallback": fallback_mask,
+                                }))
                                 st.caption("Per‑mode summary")
                                 st.markdown('<div style="max-width:1100px;margin:0 auto;">', unsafe_allow_html=True)
                                 st.dataframe(per_mode, use_container_width=True, height=220)
@@ -3296,12 +3790,16 @@ def main():
                                 try:
                                     import matplotlib.pyplot as plt
                                     fig, ax = plt.subplots(figsize=(6, 3))
-                                    df_box = dfv.copy()
-                                    if "mode" in df_box.columns:
-                                        df_box["words"] = df_box["tip"].fillna("").apply(lambda s: len(str(s).split()))
-                                        modes_order = sorted(df_box["mode"].dropna().unique().tolist())
-                                        data = [df_box[df_box["mode"] == m]["words"].tolist() for m in modes_order]
-                                        ax.boxplot(data, labels=modes_order, showfliers=True)
+                                    if "mode" in dfv.columns:
+                                        # One grouped pass over the categorical codes instead of a mask per mode;
+                                        # read_csv sorts the categories, so the groups come out in label order
+                                        words_by_mode = tip_words.groupby(dfv["mode"], observed=True, sort=True).agg(list)
+                                        modes_order = words_by_mode.index.tolist()
+                                        data = words_by_mode.tolist()
+                                        ax.boxplot(data, showfliers=True)
+                                        # Newer matplotlib dropped boxplot(labels=...); set tick labels directly
+                                        ax.set_xticks(range(1, len(modes_order) + 1))
+                                        ax.set_xticklabels([str(m) for m in modes_order])
                                         ax.set_ylabel("Words")
                                         ax.set_title("Tip length distribution by mode")
                                         st.pyplot(fig, clear_figure=True)
@@ -3312,12 +3810,14 @@ def main():
                         with c1:
                             st.caption("Last 10 runs")
                             st.markdown('<div style="max-width:1100px;margin:0 auto;">', unsafe_allow_html=True)
-                            st.dataframe(dfv.tail(10), use_container_width=True, height=220)
+                            # Only the short display columns; full rows (incl. prompts) are in the CSV download
+                            tail_cols = [c for c in ("timestamp", "category", "mode", "tip") if c in dfv.columns]
+                            st.dataframe(dfv[tail_cols].tail(10), use_container_width=True, height=220)
                             st.markdown('</div>', unsafe_allow_html=True)
                         with c2:
                             try:
-                                with open(log_path, "r", encoding="utf-8") as fh:
-                                    st.download_button("⬇️ Download prompt_log.csv", data=fh.read(), file_name="prompt_log.csv", mime="text/csv")
+                                # Same stat as the parsed frame above, so both refresh together when the log changes
+                                st.download_button("⬇️ Download prompt_log.csv", data=read_file_bytes(log_path, log_stat.st_mtime_ns, log_stat.st_size), file_name="prompt_log.csv", mime="text/csv")
                             except Exception:
                                 pass
                             if st.button("🗑️ Clear log (prompt_log.csv)"):
@@ -3363,6 +3863,10 @@ def main():
                 bootN = st.number_input("Bootstraps", min_value=100, max_value=2000, value=default_boot, step=50, key="d6_bootN", help="Resamples per mode to compute 95% CIs for OK rate and diversity metrics.")
                 if int(bootN) != default_boot:
                     set_pref("d6_bootN", int(bootN))
+                default_seed = int(get_pref("d6_seed", st.session_state.get("d6_seed", 0)))
+                d6_seed = st.number_input("Random seed", min_value=0, value=default_seed, step=1, key="d6_seed", help="Seed for perturbations and bootstrap resampling; 0 draws a fresh seed each run.")
+                if int(d6_seed) != default_seed:
+                    set_pref("d6_seed", int(d6_seed))
             with colF:
                 default_always = bool(get_pref("d6_always_ok_time", st.session_state.get("d6_always_ok_time", True)))
                 always_ok_time = st.checkbox("Always include OK-rate over time", value=default_always, key="d6_always_ok_time", help="Generate the OK-rate over-time chart/spec as part of the Day 6 run so it's guaranteed in the HTML/ZIP.")
@@ -3376,82 +3880,41 @@ def main():
 
             # Advanced: Tunable edge-case thresholds
             if hasattr(st, "popover"):
-               with st.popover("Advanced: Edge-case thresholds (extreme values)"):
-                   st.caption("Adjust per-activity numeric limits used to classify 'extreme' inputs. Saved across sessions.")
-                   default_thr = get_pref("d6_thresholds", st.session_state.get("d6_thresholds", {
-                       "electricity_kwh": 200.0,
-                       "natural_gas_m3": 100.0,
-                       "hot_water_liter": 2000.0,
-                       "petrol_liter": 100.0,
-                       "diesel_liter": 100.0,
-                       "bus_km": 500.0,
-                       "rail_km": 1000.0,
-                       "meat_kg": 10.0,
-                       "dairy_kg": 15.0,
-                       "vegetarian_kg": 20.0,
-                    }))
+                adv_box = st.popover("Advanced: Edge-case thresholds (extreme values)")
             else:
                 st.markdown("#### Advanced: Edge-case thresholds (extreme values)")
                 adv_box = st.container(border=True)
-                with adv_box:
-                    st.caption("Adjust per-activity numeric limits used to classify 'extreme' inputs. Saved across sessions.")
-                    default_thr = get_pref("d6_thresholds", st.session_state.get("d6_thresholds", {
-                        "electricity_kwh": 200.0,
-                        "natural_gas_m3": 100.0,
-                        "hot_water_liter": 2000.0,
-                        "petrol_liter": 100.0,
-                        "diesel_liter": 100.0,
-                        "bus_km": 500.0,
-                        "rail_km": 1000.0,
-                        "meat_kg": 10.0,
-                        "dairy_kg": 15.0,
-                        "vegetarian_kg": 20.0,
-                    }))
+            with adv_box:
+                st.caption("Adjust per-activity numeric limits used to classify 'extreme' inputs. Saved across sessions.")
+                default_thr = get_pref("d6_thresholds", st.session_state.get("d6_thresholds", EDGE_THRESHOLD_DEFAULTS))
                 last_upd = get_pref("d6_thresholds_updated_at", "")
                 if last_upd:
                     st.caption(f"Last updated: {last_upd}")
-                c1, c2, c3 = st.columns(3)
-                with c1:
-                    th_elec = st.number_input("electricity_kwh", min_value=1.0, max_value=10000.0,
-                                  value=float(default_thr.get("electricity_kwh", 200.0)), step=1.0)
-                    th_gas = st.number_input("natural_gas_m3", min_value=1.0, max_value=10000.0,
-                                 value=float(default_thr.get("natural_gas_m3", 100.0)), step=1.0)
-                    th_hot = st.number_input("hot_water_liter", min_value=10.0, max_value=100000.0,
-                                 value=float(default_thr.get("hot_water_liter", 2000.0)), step=10.0)
-                with c2:
-                    th_pet = st.number_input("petrol_liter", min_value=1.0, max_value=10000.0,
-                                 value=float(default_thr.get("petrol_liter", 100.0)), step=1.0)
-                    th_dsl = st.number_input("diesel_liter", min_value=1.0, max_value=10000.0,
-                                 value=float(default_thr.get("diesel_liter", 100.0)), step=1.0)
-                    th_bus = st.number_input("bus_km", min_value=1.0, max_value=100000.0,
-                                 value=float(default_thr.get("bus_km", 500.0)), step=5.0)
-                with c3:
-                    th_rail = st.number_input("rail_km", min_value=1.0, max_value=100000.0,
-                                  value=float(default_thr.get("rail_km", 1000.0)), step=10.0)
-                    th_meat = st.number_input("meat_kg", min_value=0.1, max_value=1000.0,
-                                  value=float(default_thr.get("meat_kg", 10.0)), step=0.1, format="%0.1f")
-                    th_dairy = st.number_input("dairy_kg", min_value=0.1, max_value=1000.0,
-                                   value=float(default_thr.get("dairy_kg", 15.0)), step=0.1, format="%0.1f")
-                    th_veg = st.number_input("vegetarian_kg", min_value=0.1, max_value=1000.0,
-                                 value=float(default_thr.get("vegetarian_kg", 20.0)), step=0.1, format="%0.1f")
-
-                new_thr = {
-                    "electricity_kwh": float(th_elec),
-                    "natural_gas_m3": float(th_gas),
-                    "hot_water_liter": float(th_hot),
-                    "petrol_liter": float(th_pet),
-                    "diesel_liter": float(th_dsl),
-                    "bus_km": float(th_bus),
-                    "rail_km": float(th_rail),
-                    "meat_kg": float(th_meat),
-                    "dairy_kg": float(th_dairy),
-                    "vegetarian_kg": float(th_veg),
-                }
+                # One editor for all limits: a single widget/change event instead of ten number inputs
+                thr_keys = list(EDGE_THRESHOLD_DEFAULTS)
+                edited_thr = st.data_editor(
+                    pd.DataFrame({
+                        "activity": thr_keys,
+                        "limit": [float(default_thr.get(k, EDGE_THRESHOLD_DEFAULTS[k])) for k in thr_keys],
+                    }),
+                    num_rows="fixed",
+                    hide_index=True,
+                    disabled=["activity"],
+                    key="d6_thresholds_editor",
+                    column_config={
+                        "activity": st.column_config.TextColumn("Activity"),
+                        "limit": st.column_config.NumberColumn("Limit", min_value=0.1, step=0.1, format="%0.1f"),
+                    },
+                )
+                # Keep each limit inside its own sane range (the editor's min/max are column-wide)
+                new_thr = dict(default_thr)
+                for k, v in zip(edited_thr["activity"], pd.to_numeric(edited_thr["limit"], errors="coerce")):
+                    lo, hi = EDGE_THRESHOLD_BOUNDS[k]
+                    new_thr[k] = float(min(max(v, lo), hi)) if pd.notna(v) else float(default_thr.get(k, EDGE_THRESHOLD_DEFAULTS[k]))
 
                 # Apply and persist thresholds
                 if new_thr != default_thr:
-                    set_pref("d6_thresholds", new_thr)
-                    set_pref("d6_thresholds_updated_at", dt.datetime.now().isoformat())
+                    set_prefs({"d6_thresholds": new_thr, "d6_thresholds_updated_at": dt.datetime.now().isoformat()})
 
                 # Always apply current thresholds to the classifier
                 try:
@@ -3463,25 +3926,15 @@ def main():
                 rc1, rc2 = st.columns([1, 1])
                 with rc1:
                     if st.button("Reset thresholds to defaults", key="btn_reset_thresholds"):
-                        defaults = {
-                            "electricity_kwh": 200.0,
-                            "natural_gas_m3": 100.0,
-                            "hot_water_liter": 2000.0,
-                            "petrol_liter": 100.0,
-                            "diesel_liter": 100.0,
-                            "bus_km": 500.0,
-                            "rail_km": 1000.0,
-                            "meat_kg": 10.0,
-                            "dairy_kg": 15.0,
-                            "vegetarian_kg": 20.0,
-                        }
-                        set_pref("d6_thresholds", defaults)
-                        set_pref("d6_thresholds_updated_at", dt.datetime.now().isoformat())
+                        defaults = dict(EDGE_THRESHOLD_DEFAULTS)
+                        set_prefs({"d6_thresholds": defaults, "d6_thresholds_updated_at": dt.datetime.now().isoformat()})
                         try:
                             set_extreme_thresholds(defaults)
                         except Exception:
                             pass
-                        st.success("Thresholds reset to defaults. Collapse/expand to refresh controls if values don't immediately reflect.")
+                        # Drop the editor's pending cell edits so it shows the defaults on the next run
+                        st.session_state.pop("d6_thresholds_editor", None)
+                        st.rerun()
 
                 with rc2:
                     try:
@@ -3498,8 +3951,7 @@ def main():
                 try:
                     data = json.loads(upl.getvalue().decode("utf-8"))
                     if isinstance(data, dict) and data:
-                        set_pref("d6_thresholds", data)
-                        set_pref("d6_thresholds_updated_at", dt.datetime.now().isoformat())
+                        set_prefs({"d6_thresholds": data, "d6_thresholds_updated_at": dt.datetime.now().isoformat()})
                         try:
                             set_extreme_thresholds(data)
                         except Exception:
@@ -3538,84 +3990,32 @@ def main():
                     scenarios.append(("Ambiguous", {"electricity_kwh": 50000}))  # extreme
                 return scenarios
 
-            def _perturb_inputs(inputs: dict) -> dict:
-                # Apply small random multiplicative noise to numeric fields
-                if not inputs:
-                    return inputs
-                out = {}
-                for k, v in inputs.items():
-                    try:
-                        f = float(v)
-                        noise = 1.0 + random.uniform(-0.15, 0.15)
-                        out[k] = max(0.0, f * noise)
-                    except Exception:
-                        out[k] = v
-                return out
-
-            def _score_tip(tip: str, category: str) -> dict:
-                t = (tip or "").lower()
-                words = len(t.split())
-                # Heuristic action verbs
-                verbs = ["try", "switch", "take", "bike", "walk", "reduce", "set", "lower", "replace", "unplug", "turn off", "plan", "use", "install", "carpool"]
-                actionable = any(v in t for v in verbs)
-                # Relevance by category keyword hints
-                cat_hints = {
-                    "Energy": ["electric", "heating", "thermostat", "kwh", "standby", "plug"],
-                    "Transport": ["car", "bus", "train", "bike", "walk", "commute", "drive"],
-                    "Meals": ["meal", "meat", "plant", "vegan", "vegetarian", "dairy"],
-                    "Mixed": [],
-                    "Ambiguous": [],
-                }
-                hints = cat_hints.get(category, [])
-                relevant = True if category in ("Mixed", "Ambiguous") else any(h in t for h in hints)
-                simple = (words <= 35) and (t.count('.') <= 2)
-                flags = {
-                    "relevant": relevant,
-                    "actionable": actionable,
-                    "simple": simple,
-                }
-                flags["ok"] = all(flags.values())
-                return flags
-
             if run_suite:
-                scenarios = _scenario_inputs()
-                results_rows = []
-                for (cat, base_inputs) in scenarios:
-                    for _ in range(int(varN)):
-                        user_inputs = _perturb_inputs(base_inputs)
-                        # Estimate emissions locally (simple sum using CO2_FACTORS)
-                        em_est = 0.0
-                        for k, v in (user_inputs or {}).items():
-                            try:
-                                em_est += float(v or 0) * CO2_FACTORS.get(k, 0.0)
-                            except Exception:
-                                pass
-                        for m in d6_modes:
-                            tip_i, prompt_i = generate_eco_tip_with_prompt(user_inputs, float(em_est), mode=m, category=(None if cat in ("Ambiguous", "Mixed") else cat))
-                            flags = _score_tip(tip_i, cat)
-                            results_rows.append({
-                                "timestamp": dt.datetime.now().isoformat(),
-                                "category": cat,
-                                "mode": m,
-                                "emissions_est_kg": f"{em_est:.2f}",
-                                "tip": tip_i,
-                                "relevant": flags["relevant"],
-                                "actionable": flags["actionable"],
-                                "simple": flags["simple"],
-                                "ok": flags["ok"],
-                                "prompt": prompt_i,
-                                "input_type": classify_input_type(user_inputs),
-                                "EC": "⚠️" if classify_input_type(user_inputs) != "valid" else "",
-                            })
+                # Remember what was run so later reruns (filters, downloads) hit the cached results
+                st.session_state["d6_suite_args"] = {
+                    "scenarios": _scenario_inputs(),
+                    "var_n": int(varN),
+                    "modes": tuple(d6_modes),
+                    "boot_n": int(bootN),
+                    "seed": int(d6_seed),
+                    "thresholds": dict(get_pref("d6_thresholds", st.session_state.get("d6_thresholds", EDGE_THRESHOLD_DEFAULTS))),
+                    # A fixed seed lets identical settings reuse the cached run; otherwise every click is fresh
+                    "run_id": "" if int(d6_seed) else uuid.uuid4().hex,
+                }
+            suite_args = st.session_state.get("d6_suite_args")
+            if suite_args:
                 # Convert and show table
                 try:
-                    df_cmp = pd.DataFrame(results_rows)
+                    # Applied here, not inside the cached function, so the classifier state never
+                    # depends on whether this call is a cache hit
+                    set_extreme_thresholds(suite_args["thresholds"])
+                    df_cmp, per_mode_metrics = run_prompt_suite(**suite_args)
                     st.markdown("**Prompt Comparison Table (Day 6)**")
                     view_cols = ["timestamp", "category", "mode", "emissions_est_kg", "ok", "relevant", "actionable", "simple", "fallback_used", "input_type", "EC", "tip"]
                     # Edge-case filter UI
                     df_to_show = df_cmp
                     if "input_type" in df_cmp.columns:
-                        unique_types = sorted([str(x) for x in df_cmp["input_type"].dropna().unique().tolist()])
+                        unique_types = np.sort(df_cmp["input_type"].dropna().astype(str).unique()).tolist()
                         default_filter = get_pref("d6_filter_input_type", unique_types)
                         # Ensure default matches available set
                         if not isinstance(default_filter, list) or not default_filter:
@@ -3631,80 +4031,6 @@ def main():
                     st.markdown('</div>', unsafe_allow_html=True)
                     # Per-mode diversity and OK-rate metrics
                     try:
-                        rows = []
-                        # Helpers for bootstrap CIs
-                        def _quantile(vals, q):
-                            if not vals:
-                                return 0.0
-                            s = sorted(vals)
-                            idx = max(0, min(len(s)-1, int(q * (len(s)-1))))
-                            return float(s[idx])
-                        def _bigrams_of(s: str):
-                            toks = [t for t in s.split() if t]
-                            return list(zip(toks, toks[1:])) if len(toks) > 1 else []
-                        def _bootstrap_metrics(mode_df: pd.DataFrame, n_boot: int = 300):
-                            tips = mode_df["tip"].fillna("").astype(str).tolist()
-                            oks = mode_df["ok"].astype(bool).tolist()
-                            n = len(tips)
-                            if n == 0:
-                                return {"ok_ci": (0.0, 0.0), "uniq_tips_ci": (0.0, 0.0), "uniq_bi_ci": (0.0, 0.0)}
-                            ok_samples = []
-                            utip_samples = []
-                            ubi_samples = []
-                            for _ in range(int(bootN)):
-                                idxs = [random.randrange(0, n) for _ in range(n)]
-                                tips_s = [tips[i] for i in idxs]
-                                oks_s = [oks[i] for i in idxs]
-                                # OK rate
-                                ok_rate = (sum(oks_s)/len(oks_s))*100.0
-                                ok_samples.append(ok_rate)
-                                # Unique tips %
-                                utip = (len(set(t.strip().lower() for t in tips_s))/len(tips_s))*100.0
-                                utip_samples.append(utip)
-                                # Unique bigrams %
-                                bigs = []
-                                for t in tips_s:
-                                    bigs.extend(_bigrams_of(t.lower().strip()))
-                                total_b = len(bigs)
-                                ubi = ((len(set(bigs))/total_b)*100.0) if total_b else 0.0
-                                ubi_samples.append(ubi)
-                            return {
-                                "ok_ci": (_quantile(ok_samples, 0.025), _quantile(ok_samples, 0.975)),
-                                "uniq_tips_ci": (_quantile(utip_samples, 0.025), _quantile(utip_samples, 0.975)),
-                                "uniq_bi_ci": (_quantile(ubi_samples, 0.025), _quantile(ubi_samples, 0.975)),
-                            }
-                        for mode_name, g in df_cmp.groupby("mode", dropna=False):
-                            tips_norm = g["tip"].fillna("").str.strip().str.lower().tolist()
-                            uniq = len(set(tips_norm))
-                            uniq_ratio = (uniq/len(g)*100.0) if len(g) else 0.0
-                            # Bigram distinctiveness
-                            all_bigrams = []
-                            for t in tips_norm:
-                                all_bigrams.extend(_bigrams_of(t))
-                            total_bi = len(all_bigrams)
-                            uniq_bi = len(set(all_bigrams))
-                            uniq_bi_ratio = (uniq_bi/total_bi*100.0) if total_bi else 0.0
-                            ok_rate = float(g["ok"].mean()) * 100.0 if len(g)>0 else 0.0
-                            cis = _bootstrap_metrics(g, n_boot=int(bootN))
-                            ok_ci_low, ok_ci_high = cis['ok_ci']
-                            ut_ci_low, ut_ci_high = cis['uniq_tips_ci']
-                            ub_ci_low, ub_ci_high = cis['uniq_bi_ci']
-                            rows.append({
-                                "mode": mode_name,
-                                "samples": len(g),
-                                "ok_rate_%": ok_rate,
-                                "ok_rate_ci_low": float(ok_ci_low),
-                                "ok_rate_ci_high": float(ok_ci_high),
-                                "unique_tips": uniq,
-                                "unique_tips_%": uniq_ratio,
-                                "unique_tips_ci_low": float(ut_ci_low),
-                                "unique_tips_ci_high": float(ut_ci_high),
-                                "unique_bigrams": uniq_bi,
-                                "unique_bigrams_%": uniq_bi_ratio,
-                                "unique_bigrams_ci_low": float(ub_ci_low),
-                                "unique_bigrams_ci_high": float(ub_ci_high),
-                            })
-                        per_mode_metrics = pd.DataFrame(rows).sort_values("mode")
                         st.caption("Per‑mode diversity and OK‑rate")
                         st.markdown('<div style="max-width:1100px;margin:0 auto;">', unsafe_allow_html=True)
                         st.dataframe(per_mode_metrics, use_container_width=True, height=220)
@@ -3742,9 +4068,10 @@ def main():
                             st.caption(f"Altair error bar charts unavailable: {e}")
                     except Exception:
                         df_cmp = None
-                    # Findings summary for HTML
+                    # Findings summary for HTML; the best mode row is shared with the Markdown summary below
+                    best_row = None
                     try:
-                        best_row = per_mode_metrics.sort_values('ok_rate_%', ascending=False).iloc[0]
+                        best_row = per_mode_metrics.loc[per_mode_metrics['ok_rate_%'].idxmax()]
                         findings = [
                             f"Best mode: {best_row['mode']} (OK rate {best_row['ok_rate_%']:.1f}% | 95% CI [{best_row['ok_rate_ci_low']:.1f}, {best_row['ok_rate_ci_high']:.1f}])",
                             f"Diversity (unique tips %): {best_row['unique_tips_%']:.1f}% | 95% CI [{best_row['unique_tips_ci_low']:.1f}, {best_row['unique_tips_ci_high']:.1f}]",
@@ -3754,49 +4081,32 @@ def main():
                         findings = []
                     # Top 3 deltas across modes (OK rate) and CI overlap flag
                     try:
-                        pm = per_mode_metrics[["mode","ok_rate_%","ok_rate_ci_low","ok_rate_ci_high"]].copy()
-                        pairs = []
-                        for i in range(len(pm)):
-                            for j in range(i+1, len(pm)):
-                                a = pm.iloc[i]; b = pm.iloc[j]
-                                delta = float(a["ok_rate_%"] - b["ok_rate_%"])  # a minus b
-                                # CI overlap: if intervals intersect
-                                overlap = not (a["ok_rate_ci_high"] < b["ok_rate_ci_low"] or b["ok_rate_ci_high"] < a["ok_rate_ci_low"])
-                                pairs.append({
-                                    "pair": f"{a['mode']} vs {b['mode']}",
-                                    "delta": delta,
-                                    "overlap": overlap,
-                                })
-                        pairs_sorted = sorted(pairs, key=lambda x: abs(x["delta"]), reverse=True)[:3]
+                        modes = per_mode_metrics["mode"].astype(str).to_numpy()
+                        v = per_mode_metrics["ok_rate_%"].to_numpy(dtype=np.float64)
+                        lo = per_mode_metrics["ok_rate_ci_low"].to_numpy(dtype=np.float64)
+                        hi = per_mode_metrics["ok_rate_ci_high"].to_numpy(dtype=np.float64)
+                        # All pairwise deltas (row minus column) and CI intersections at once; keep i < j
+                        iu, ju = np.triu_indices(len(v), k=1)
+                        delta = (v[:, None] - v[None, :])[iu, ju]
+                        overlap = ~((hi[:, None] < lo[None, :]) | (hi[None, :] < lo[:, None]))[iu, ju]
+                        top = np.argsort(-np.abs(delta), kind="stable")[:3]
+                        pairs_sorted = [
+                            {"pair": f"{modes[iu[k]]} vs {modes[ju[k]]}", "delta": float(delta[k]), "overlap": bool(overlap[k])}
+                            for k in top
+                        ]
                         top3 = [f"{p['pair']}: ΔOK {p['delta']:+.1f} pts (CIs overlap: {'yes' if p['overlap'] else 'no'})" for p in pairs_sorted]
                     except Exception:
                         top3 = []
                     # Always include OK-rate over time
                     if bool(get_pref("d6_always_ok_time", st.session_state.get("d6_always_ok_time", True))):
                         try:
-                            # Build ok over-time from df_cmp directly (hourly)
-                            df_tmp = df_cmp.copy()
-                            df_tmp['timestamp'] = pd.to_datetime(df_tmp['timestamp'], errors='coerce')
-                            df_tmp = df_tmp.dropna(subset=['timestamp'])
-                            agg = (
-                                df_tmp.groupby([pd.Grouper(key='timestamp', freq='H'), 'mode'])
-                                    .agg(ok_rate=('ok', lambda s: float(s.mean())*100.0), n=('ok','size'))
-                                    .reset_index()
+                            # Build ok over-time from df_cmp directly (hourly); one binomial draw per bucket
+                            df_tmp = df_cmp[['timestamp', 'mode', 'ok']].assign(
+                                # Rows carry isoformat() strings; ISO8601 skips format inference (and tolerates a missing .%f)
+                                timestamp=pd.to_datetime(df_cmp['timestamp'], format='ISO8601', errors='coerce', cache=True),
+                                ok=df_cmp['ok'].astype(bool),
                             )
-                            # Bootstrap
-                            rows_ok = []
-                            for (ts, md_), ggrp in agg.groupby(['timestamp','mode'], dropna=False):
-                                ok_rate = float(ggrp['ok_rate'].iloc[0]); n = int(ggrp['n'].iloc[0])
-                                samples = []
-                                for _ in range(int(bootN)):
-                                    p = max(0.0, min(1.0, ok_rate/100.0))
-                                    ones = sum(1 for __ in range(n) if random.random() < p)
-                                    samples.append((ones/n)*100.0 if n>0 else 0.0)
-                                samples.sort()
-                                lo = samples[int(0.025*(len(samples)-1))] if samples else 0.0
-                                hi = samples[int(0.975*(len(samples)-1))] if samples else 0.0
-                                rows_ok.append({'timestamp': ts, 'mode': md_, 'ok_rate': ok_rate, 'ok_ci_low': lo, 'ok_ci_high': hi, 'n': n})
-                            df_ok_ci = pd.DataFrame(rows_ok)
+                            df_ok_ci = ok_rate_ci_frame(df_tmp, 'h', int(bootN))
                             if not df_ok_ci.empty:
                                 ch = alt.Chart(df_ok_ci).encode(
                                     x=alt.X('timestamp:T', title='Time'), y=alt.Y('ok_rate:Q', title='OK rate (%)'), color='mode:N',
@@ -3809,27 +4119,22 @@ def main():
                                     st.session_state['ok_rate_time_csv'] = df_ok_ci.to_csv(index=False)
                                 except Exception:
                                     pass
-                                if alt_save is not None:
-                                    import tempfile
-                                    tmpf = tempfile.NamedTemporaryFile(suffix='.png', delete=False)
-                                    alt_save(ok_time_chart, tmpf.name, fmt='png')
-                                    with open(tmpf.name, 'rb') as _f:
-                                        st.session_state['ok_rate_time_png'] = _f.read()
-                                    os.unlink(tmpf.name)
+                                if ALT_SAVER_AVAILABLE:
+                                    submit_chart_png('ok_rate_time_png', ok_time_chart)
                         except Exception:
                             pass
                     # Markdown export (compact table)
                     def _to_markdown_table(df: pd.DataFrame) -> str:
                         headers = " | ".join(view_cols)
                         sep = " | ".join(["---"] * len(view_cols))
-                        lines = [f"| {headers} |", f"| {sep} |"]
-                        for _, row in df.iterrows():
-                            vals = [str(row[c]) for c in view_cols]
-                            lines.append("| " + " | ".join(vals) + " |")
-                        return "\n".join(lines)
+                        # Join cells column by column (vectorized string concat) rather than per row
+                        cells = df[view_cols].astype(str).fillna("")
+                        body = "| " + cells[view_cols[0]]
+                        for c in view_cols[1:]:
+                            body = body + " | " + cells[c]
+                        return "\n".join([f"| {headers} |", f"| {sep} |", *(body + " |")])
                     # Summary section (top-line findings)
                     try:
-                        best_row = per_mode_metrics.sort_values('ok_rate_%', ascending=False).iloc[0]
                         summary_lines = [
                             "# Prompt Comparison Table (Day 6)",
                             "",
@@ -3858,37 +4163,14 @@ def main():
                     try:
                         buf = io.BytesIO()
                         with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as zf:
-                            # README.md with quick guide
-                            readme = []
-                            readme.append("# Day 6 Report Package")
-                            readme.append("")
-                            readme.append("## Files")
-                            readme.append("- prompt_compare.csv — All test rows (mode/category/ok flags/tip/prompt)")
-                            readme.append("- prompt_compare.md — Summary + full table in Markdown")
-                            readme.append("- per_mode_metrics.csv — Per-mode OK rate and diversity with 95% CIs")
-                            readme.append("- per_mode_metrics.md — Per-mode metrics in Markdown")
-                            readme.append("- ok_rate.png — OK rate bar chart with error bars")
-                            readme.append("- unique_tips.png — Unique tips % bar chart with error bars")
-                            readme.append("- unique_bigrams.png — Unique bigrams % bar chart with error bars")
-                            readme.append("- ok_rate_over_time.png — OK rate over time with 95% CI (if generated)")
-                            readme.append("- ok_rate_over_time.csv — Data for over-time chart (if generated)")
-                            readme.append("- report.html — Interactive HTML report (if charts available)")
-                            readme.append("")
-                            readme.append("## How to interpret")
-                            readme.append("- OK rate: percent of tips that are Relevant, Actionable, and Simple.")
-                            readme.append("- Unique tips %: lexical uniqueness across tips (case-insensitive).")
-                            readme.append("- Unique bigrams %: n-gram diversity proxy (higher means more varied phrasing).")
-                            readme.append("- 95% CI: uncertainty from bootstrap resampling.")
-                            readme.append("")
-                            readme.append("## input_type taxonomy (heuristics)")
-                            readme.append("- empty: no usable numeric or text inputs provided")
-                            readme.append("- help: explicit request for help (e.g., 'help', '?', 'what should I do?')")
-                            readme.append("- emoji: text dominated by emojis/symbols (very low alphanumeric ratio)")
-                            readme.append("- nonsense: symbol-heavy/gibberish without clear meaning")
-                            readme.append("- negative: any numeric input is negative (per field)")
-                            readme.append("- extreme: numeric input exceeds per-activity sanity thresholds (heuristics)")
-                            readme.append("- valid: inputs pass the above checks")
-                            zf.writestr('README.md', "\n".join(readme))
+                            zf.writestr('README.md', DAY6_README_MD)
+                            if st.session_state.get('ok_rate_time_csv'):
+                                zf.writestr('ok_rate_over_time.csv', st.session_state['ok_rate_time_csv'])
+                            # Only include the over-time PNG once its background render has finished
+                            ok_time_png = chart_png_result('ok_rate_time_png')
+                            if ok_time_png:
+                                # PNGs are already deflate-compressed; store them as-is
+                                zf.writestr('ok_rate_over_time.png', ok_time_png, compress_type=zipfile.ZIP_STORED)
                             # Combined HTML (embed Altair specs)
                             try:
                                 html_parts = ["<!DOCTYPE html><html><head><meta charset='utf-8'><title>Day 6 Report</title>"]
@@ -3897,7 +4179,8 @@ def main():
                                 html_parts.append("<script src='https://cdn.jsdelivr.net/npm/vega-embed@6'></script>")
                                 html_parts.append("</head><body><h1>Day 6 Interactive Report</h1>")
                                 def _embed_div(spec, div_id):
-                                    return f"<div id='{div_id}'></div><script>vegaEmbed('#{div_id}', {json.dumps(spec)});</script>"
+                                    # Compact separators keep the embedded Vega specs smaller
+                                    return f"<div id='{div_id}'></div><script>vegaEmbed('#{div_id}', {json.dumps(spec, separators=(',', ':'))});</script>"
                                 # Build specs for the three per-mode charts
                                 try:
                                     spec_ok = (bars_ok + error_ok).to_dict()
@@ -3917,9 +4200,10 @@ def main():
                                 except Exception:
                                     pass
                                 # Over-time chart if present
-                                if st.session_state.get('ok_rate_time_spec'):
+                                ok_time_spec = st.session_state.get('ok_rate_time_spec')
+                                if ok_time_spec:
                                     html_parts.append("<h2>OK rate over time</h2>")
-                                    html_parts.append(_embed_div(st.session_state.get('ok_rate_time_spec'), "ok_rate_time"))
+                                    html_parts.append(_embed_div(ok_time_spec, "ok_rate_time"))
                                 # Edge-case distribution chart (optional force)
                                 try:
                                     force_ec = bool(get_pref("d6_force_ec_visuals", st.session_state.get("d6_force_ec_visuals", False)))
@@ -3927,8 +4211,7 @@ def main():
                                     spec_ec = None
                                     no_edge_cases = False
                                     if "input_type" in df_cmp.columns:
-                                        df_e = df_cmp.copy()
-                                        e_counts = df_e.groupby(["mode", "input_type"], dropna=False).size().reset_index(name="count")
+                                        e_counts = df_cmp.groupby(["mode", "input_type"], dropna=False).size().reset_index(name="count")
                                         import altair as alt
                                         ec_chart = alt.Chart(e_counts).mark_bar().encode(
                                             x=alt.X('mode:N', title='Mode'),
@@ -3938,7 +4221,7 @@ def main():
                                         spec_ec = ec_chart.to_dict()
                                         show_ec = True
                                         try:
-                                            no_edge_cases = df_e["input_type"].astype(str).apply(lambda s: s.strip().lower() == 'valid').all()
+                                            no_edge_cases = bool(df_cmp["input_type"].astype(str).str.strip().str.lower().eq('valid').all())
                                         except Exception:
                                             no_edge_cases = False
                                     if show_ec and spec_ec is not None:
@@ -3952,29 +4235,45 @@ def main():
                                 zf.writestr('report.html', "".join(html_parts))
                             except Exception:
                                 pass
-                            zf_bytes = buf.getvalue()
-                            st.download_button(
-                                label="⬇️ Save all (CSV + MD) as ZIP",
-                                data=zf_bytes,
-                                file_name="day6_results.zip",
-                                mime="application/zip",
-                                key="download_day6_zip",
-                            )
+                        # Read the buffer only after the archive is closed so the central directory is included
+                        st.download_button(
+                            label="⬇️ Save all (CSV + MD) as ZIP",
+                            data=buf.getvalue(),
+                            file_name="day6_results.zip",
+                            mime="application/zip",
+                            key="download_day6_zip",
+                        )
                     except Exception as e:
                         st.caption(f"ZIP export unavailable: {e}")
                 except Exception:
                     df_cmp = None
+                # Normalize the selected date once for the summary, PDF header and file name
+                if isinstance(selected_date, dt.datetime):
+                    ref_date = selected_date.date()
+                elif isinstance(selected_date, dt.date):
+                    ref_date = selected_date
+                else:
+                    ref_date = dt.date.today()
+                date_str = ref_date.isoformat()
+                # Read the session values this section needs once, up front
+                ss = st.session_state
+                try:
+                    streak_days_val = int(ss.get("streak_days", 0))
+                except (TypeError, ValueError, OverflowError):
+                    streak_days_val = 0
+                tip_for_pdf = ss.get("last_tip_full") or ss.get("last_tip") or ""
+                src_label = ss.get("last_tip_source", "Unknown")
+                include_appendix = bool(ss.get("pdf_include_prompt_appendix", False))
                 # Determine AI summary to include in PDF if requested
                 ai_summary_for_pdf = None
                 try:
-                    if bool(st.session_state.get("pdf_include_ai_summary", False)):
+                    if bool(ss.get("pdf_include_ai_summary", False)):
                         # Prefer any cached AI summary from the UI
-                        ai_summary_for_pdf = st.session_state.get("ai_summary_text")
+                        ai_summary_for_pdf = ss.get("ai_summary_text")
                         if not ai_summary_for_pdf:
                             # Generate on-demand for PDF context
                             df_hist = load_history()
-                            ref_date = selected_date if isinstance(selected_date, (dt.date, dt.datetime)) else dt.date.today()
-                            y_total = get_yesterday_total(df_hist, ref_date if isinstance(ref_date, dt.date) else ref_date.date())
+                            y_total = get_yesterday_total(df_hist, ref_date)
                             cmp = percentage_change(y_total, em_today)
                             if y_total > 0:
                                 comparison_text = f"{abs(cmp):.1f}% {'lower' if cmp < 0 else 'higher'} than yesterday ({fmt_emissions(y_total)})"
@@ -3984,9 +4283,7 @@ def main():
                             weekly_context = None
                             try:
                                 if not df_hist.empty:
-                                    dfx = df_hist.copy()
-                                    dfx["date"] = pd.to_datetime(dfx["date"]).dt.date
-                                    last7 = dfx.sort_values("date").tail(7)
+                                    last7 = load_history_normalized().tail(7)
                                     if not last7.empty:
                                         avg7 = float(last7["total_kg"].mean())
                                         weekly_context = f"7-day average: {avg7:.2f} kg CO₂"
@@ -3995,94 +4292,37 @@ def main():
                             ai_summary_for_pdf = generate_ai_summary(
                                 user_data=user_data,
                                 emissions=em_today,
-                                date=(ref_date.isoformat() if isinstance(ref_date, (dt.date, dt.datetime)) else str(ref_date)),
+                                date=date_str,
                                 comparison_text=comparison_text,
-                                streak_days=int(st.session_state.get("streak_days", 0)) if isinstance(st.session_state.get("streak_days", 0), (int, float)) else 0,
+                                streak_days=streak_days_val,
                                 weekly_context=weekly_context,
                             )
                 except Exception:
                     ai_summary_for_pdf = None
-                # Prepare 7-day per-category sparkline data from history
-                spark = {}
+                # 7-day per-category sparkline data (cached on the history file stamp); only when the PDF shows it
                 try:
-                    _hist = load_history()
-                    if not _hist.empty:
-                        dfh = _hist.copy()
-                        dfh["date"] = pd.to_datetime(dfh["date"]).dt.date
-                        last_dates = sorted(dfh["date"].unique())[-7:]
-                        for d in last_dates:
-                            row = dfh[dfh["date"] == d]
-                            if row.empty:
-                                continue
-                            rdict = {k: float(row.iloc[-1].get(k, 0) or 0) for k in ALL_KEYS if k in row.columns}
-                            cat_vals = compute_category_emissions(rdict)
-                            for cat, val in cat_vals.items():
-                                spark.setdefault(cat, []).append(float(val))
+                    spark = category_sparklines(7) if pdf_include_spark else {}
                 except Exception:
                     spark = {}
-                # Prefer uploaded logo; fallback to project's logo.png path if present
-                logo_bytes = None
-                if logo_file is None:
-                    logo_path = os.path.join(os.path.dirname(__file__), "logo.png")
-                    if os.path.exists(logo_path):
-                        try:
-                            with open(logo_path, "rb") as lf:
-                                logo_bytes = lf.read()
-                        except Exception:
-                            logo_bytes = None
+                # Logo bytes come from st.cache_resource, so disk is only hit on the first read (see read_logo_bytes)
+                logo_bytes = read_logo_bytes()
                 
-                # Ensure these are defined before the PDF build block
-                tip_for_pdf = st.session_state.get("last_tip_full") or st.session_state.get("last_tip") or ""
-                date_str = (selected_date.isoformat() if isinstance(selected_date, (dt.date, dt.datetime)) else str(selected_date))
-                src_label = st.session_state.get("last_tip_source", "Unknown")
                 st.caption("Reached PDF section")
                 
                 
                 if ENABLE_LATE_PDF:
-                    # Guards: ensure required values exist before PDF
-                    missing = []
-                    try:
-                        _summary_ok = bool(summary_str and isinstance(summary_str, str))
-                    except Exception:
-                            _summary_ok = False
-                    try:
-                        _tip_ok = bool(tip_for_pdf and isinstance(tip_for_pdf, str))
-                    except Exception:
-                        _tip_ok = False
-                    try:
-                        _date_ok = bool(date_str and isinstance(date_str, str))
-                    except Exception:
-                        _date_ok = False
-                    
-                    try:
-                        _src_ok = bool(src_label and isinstance(src_label, str))
-                    except Exception:
-                        _src_ok = False
-
-                    if not _summary_ok:
-                        missing.append("summary")
-                    if not _tip_ok:
-                        missing.append("tip")
-                    if not _date_ok:
-                        missing.append("date")
-                    if not _src_ok:
-                        missing.append("source")
-
-                    try:
-                        _pa_ok = isinstance(per_activity, dict) and len(per_activity) > 0
-                    except Exception:
-                        _pa_ok = False
-                    if not _pa_ok:
-                        missing.append("per_activity")
-
-                    try:
-                        cat_breakdown = compute_category_emissions(user_data)
-                        _cb_ok = isinstance(cat_breakdown, dict) and len(cat_breakdown) > 0
-                    except Exception:
-                        _cb_ok = False
-                    if not _cb_ok:
-                        missing.append("category_breakdown")
-
+                    # Guards: ensure required values exist before PDF (none of these checks can raise)
+                    # Same user_data as the tab header, so reuse its category totals
+                    cat_breakdown = tips_ctx["cat"]
+                    missing = [
+                        name for name, val in (
+                            ("summary", summary_str), ("tip", tip_for_pdf), ("date", date_str), ("source", src_label),
+                        )
+                        if not (isinstance(val, str) and val)
+                    ] + [
+                        name for name, val in (("per_activity", per_activity), ("category_breakdown", cat_breakdown))
+                        if not (isinstance(val, dict) and val)
+                    ]
 
                     if missing:
                         st.info(
@@ -4101,9 +4341,9 @@ def main():
                             cat_breakdown,
                             {
                                 "today_total": fmt_emissions(em_today),
-                                "yesterday_total": fmt_emissions(yesterday_total) if 'yesterday_total' in locals() else "",
-                                "delta_pct": f"{percentage_change(yesterday_total, em_today):.2f}%" if 'yesterday_total' in locals() else "",
-                                "streak_days": f"{streak} days" if 'streak' in locals() else "",
+                                "yesterday_total": fmt_emissions(yesterday_total),
+                                "delta_pct": f"{percentage_change(yesterday_total, em_today):.2f}%",
+                                "streak_days": f"{streak} days",
                             },
                             logo_bytes=logo_bytes,
                             title_text=pdf_title,
@@ -4112,18 +4352,10 @@ def main():
                             include_sparklines=bool(pdf_include_spark),
                             spark_data=spark,
                             footer_text=pdf_footer_text if pdf_include_footer else None,
-                            margins_cm={
-                                "side": float(pdf_side_margin),
-                                "top": float(pdf_top_margin),
-                                "bottom": float(pdf_bottom_margin),
-                            },
+                            margins_cm=PdfMargins(float(pdf_side_margin), float(pdf_top_margin), float(pdf_bottom_margin)),
                             text_hex=pdf_text_color,
                             chart_bg_hex=pdf_chart_bg,
-                            experiments_appendix=(
-                                st.session_state.get("prompt_experiments")
-                                if bool(st.session_state.get("pdf_include_prompt_appendix", False))
-                                else None
-                            ),
+                            experiments_appendix=ss.get("prompt_experiments") if include_appendix else None,
                         )
                     
                     if pdf_bytes:
@@ -4135,8 +4367,8 @@ def main():
                             key="download_eco_tips_pdf",
                         )
                     # After export, auto-clear experiments if enabled
-                    if bool(get_pref("pdf_auto_clear_experiments", st.session_state.get("pdf_auto_clear_experiments", False))):
-                        st.session_state["prompt_experiments"] = []
+                    if bool(get_pref("pdf_auto_clear_experiments", ss.get("pdf_auto_clear_experiments", False))):
+                        ss["prompt_experiments"] = []
                         st.caption("Auto-cleared in-session prompt experiments after export.")
                     else:
                         st.error(err or "PDF generation failed.")
@@ -4145,73 +4377,30 @@ def main():
         # Save all (CSV + MD) as ZIP
         buf = io.BytesIO()
         with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as zf:
-            # README.md with quick guide
-            readme = []
-            readme.append("# Day 6 Report Package")
-            readme.append("")
-            readme.append("## Files")
-            readme.append("- prompt_compare.csv — All test rows (mode/category/ok flags/tip/prompt)")
-            readme.append("- prompt_compare.md — Summary + full table in Markdown")
-            readme.append("- per_mode_metrics.csv — Per-mode OK rate and diversity with 95% CIs")
-            readme.append("- per_mode_metrics.md — Per-mode metrics in Markdown")
-            readme.append("- ok_rate.png — OK rate bar chart with error bars")
-            readme.append("- unique_tips.png — Unique tips % bar chart with error bars")
-            readme.append("- unique_bigrams.png — Unique bigrams % bar chart with error bars")
-            readme.append("- ok_rate_over_time.png — OK rate over time with 95% CI (if generated)")
-            readme.append("- ok_rate_over_time.csv — Data for over-time chart (if generated)")
-            readme.append("- report.html — Interactive HTML report (if charts available)")
-            readme.append("")
-            readme.append("## How to interpret")
-            readme.append("- OK rate: percent of tips that are Relevant, Actionable, and Simple.")
-            readme.append("- Unique tips %: lexical uniqueness across tips (case-insensitive).")
-            readme.append("- Unique bigrams %: n-gram diversity proxy (higher means more varied phrasing).")
-            readme.append("- 95% CI: uncertainty from bootstrap resampling.")
-            readme.append("")
-            readme.append("## input_type taxonomy (heuristics)")
-            readme.append("- empty: no usable numeric or text inputs provided")
-            readme.append("- help: explicit request for help (e.g., 'help', '?', 'what should I do?')")
-            readme.append("- emoji: text dominated by emojis/symbols (very low alphanumeric ratio)")
-            readme.append("- nonsense: symbol-heavy/gibberish without clear meaning")
-            readme.append("- negative: any numeric input is negative (per field)")
-            readme.append("- extreme: numeric input exceeds per-activity sanity thresholds (heuristics)")
-            readme.append("- valid: inputs pass the above checks")
-            zf.writestr('README.md', "\n".join(readme))
+            zf.writestr('README.md', DAY6_README_MD)
             # Charts as PNG (if altair_saver available)
-            if alt_save is not None:
+            if ALT_SAVER_AVAILABLE:
                 try:
                     # Save OK-rate bar with CIs
-                    ok_tmp = tempfile.NamedTemporaryFile(suffix='.png', delete=False)
-                    alt_save(bars_ok + error_ok, ok_tmp.name, fmt='png')
-                    with open(ok_tmp.name, 'rb') as _f:
-                        zf.writestr('ok_rate.png', _f.read())
-                    os.unlink(ok_tmp.name)
+                    ok_chart = bars_ok + error_ok
+                    # PNGs are already deflate-compressed; store them as-is
+                    zf.writestr('ok_rate.png', render_chart_png(ok_chart.to_json(), ok_chart, method=None), compress_type=zipfile.ZIP_STORED)
                 except Exception:
                     pass
             # Include active thresholds JSON for provenance
             try:
-                thr_json = json.dumps(get_pref("d6_thresholds", {
-                    "electricity_kwh": 200.0,
-                    "natural_gas_m3": 100.0,
-                    "hot_water_liter": 2000.0,
-                    "petrol_liter": 100.0,
-                    "diesel_liter": 100.0,
-                    "bus_km": 500.0,
-                    "rail_km": 1000.0,
-                    "meat_kg": 10.0,
-                    "dairy_kg": 15.0,
-                    "vegetarian_kg": 20.0,
-                }), indent=2)
-                zf.writestr('edge_case_thresholds.json', thr_json)
+                thr = get_pref("d6_thresholds", None)
+                zf.writestr('edge_case_thresholds.json', json.dumps(thr, indent=2) if thr else EDGE_THRESHOLD_DEFAULTS_JSON)
             except Exception:
                 pass
-            zf_bytes = buf.getvalue()
-            st.download_button(
-                label="⬇️ Save all (CSV + MD) as ZIP",
-                data=zf_bytes,
-                file_name="day6_results.zip",
-                mime="application/zip",
-                key="download_day6_zip",
-            )
+        # Read the buffer only after the archive is closed so the central directory is included
+        st.download_button(
+            label="⬇️ Save all (CSV + MD) as ZIP",
+            data=buf.getvalue(),
+            file_name="day6_results.zip",
+            mime="application/zip",
+            key="download_day6_package_zip",
+        )
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -4,49 +4,92 @@ Functions:
 - _coerce_float(v)
 - has_meaningful_input(user_data)
 - find_invalid_fields(user_data)
+- validate_inputs(user_data)
 - should_generate_tip(user_data)
 """
-from typing import Any, Dict, List, Optional
+import re
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import numpy as np
 
 __all__ = [
     "_coerce_float",
     "has_meaningful_input",
     "find_invalid_fields",
+    "validate_inputs",
+    "Validation",
     "should_generate_tip",
 ]
 
 
+# Characters a decimal float literal can consist of; whatever remains after deleting them
+# must be a special value name or the string cannot parse.
+_FLOAT_CHARS = str.maketrans("", "", "0123456789.-+eE_ \t\n")
+_FLOAT_WORDS = frozenset({"inf", "infinity", "nan"})
+# Plain decimals ("12", "-0.5", "3.") always parse, so they skip the screen and the try
+_PLAIN_NUMBER = re.compile(r"[+-]?[0-9]+(?:\.[0-9]*)?")
+
+
 def _coerce_float(v: Any) -> Optional[float]:
+    # Numeric widget values take the fast path: exact type identity, no MRO walk or exceptions
+    t = type(v)
+    if t is float or t is int:
+        return float(v)
+    if v is None:
+        return None
+    if isinstance(v, str):
+        s = v.strip()
+        if not s:
+            return None
+        if _PLAIN_NUMBER.fullmatch(s):
+            return float(s)
+        # The screen only knows ASCII; float() also accepts Unicode digits ("٣", "１２")
+        if s.isascii():
+            rest = s.translate(_FLOAT_CHARS)
+            if rest and rest.lower() not in _FLOAT_WORDS:
+                return None
+        try:
+            return float(s)
+        except ValueError:
+            return None
     try:
         return float(v)
     except Exception:
         return None
 
 
+def _coerce_values(user_data: Dict[str, Any]) -> np.ndarray:
+    """Coerce all values to float64 with _coerce_float's rules; non-numeric values become NaN."""
+    coerced = (_coerce_float(v) for v in user_data.values())
+    return np.array([np.nan if fv is None else fv for fv in coerced], dtype=np.float64)
+
+
+class Validation(NamedTuple):
+    """Result of validate_inputs."""
+
+    meaningful: bool
+    invalid: List[str]
+
+
+def validate_inputs(user_data: Dict[str, Any]) -> Validation:
+    """Whether any input is > 0 and which keys are non-numeric or negative, from a single coercion."""
+    arr = _coerce_values(user_data)
+    keys = list(user_data.keys())
+    invalid = [keys[i] for i in np.flatnonzero(np.isnan(arr) | (arr < 0))]
+    return Validation(bool(np.nanmax(arr, initial=0.0) > 0), invalid)
+
+
 def has_meaningful_input(user_data: Dict[str, Any]) -> bool:
     """True if at least one numeric input is > 0."""
-    for v in user_data.values():
-        fv = _coerce_float(v)
-        if (fv is not None) and (fv > 0):
-            return True
-    return False
+    return validate_inputs(user_data).meaningful
 
 
 def find_invalid_fields(user_data: Dict[str, Any]) -> List[str]:
     """Return keys that are non-numeric or negative."""
-    bad: List[str] = []
-    for k, v in user_data.items():
-        fv = _coerce_float(v)
-        if fv is None:
-            bad.append(k)
-        elif fv < 0:
-            bad.append(k)
-    return bad
+    return validate_inputs(user_data).invalid
 
 
 def should_generate_tip(user_data: Dict[str, Any]) -> bool:
     """Return True if inputs are valid and meaningful, else False."""
-    invalid = find_invalid_fields(user_data)
-    if invalid:
-        return False
-    return has_meaningful_input(user_data)
+    check = validate_inputs(user_data)
+    return check.meaningful and not check.invalid
@@ -7,6 +7,7 @@ A small engine to estimate CO₂ emissions from daily activities.
 - calculate_co2(activity_data) returns the total emissions in kilograms of CO₂.
 - calculate_co2_breakdown(activity_data) (optional) returns per-activity emissions
   for deeper insights and debugging.
+- calculate_co2_verbose(activity_data) returns (total, warnings) instead of logging them.
 
 Notes for readers:
 - Keys in activity_data should match the factor keys (e.g., "electricity_kWh").
@@ -14,11 +15,31 @@ Notes for readers:
 - Factors are illustrative and can be adapted to local datasets (EPA/IPCC, supplier-specific, etc.).
 """
 
-from typing import Dict, Mapping, Optional, List
+from typing import Dict, Mapping, Optional, List, Tuple
 import os
 import json
+import functools
+import logging
+import threading
+from types import MappingProxyType
+import numpy as np
 from utils import normalize_activity_name
 
+# Optional JIT for the hourly-profile hot loops; falls back to plain Python.
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except Exception:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """No-op stand-in for numba.njit when numba is not installed."""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda fn: fn
+
+logger = logging.getLogger(__name__)
+
 # Emission factors in kg CO₂ per unit.
 # You can adjust these values based on your country/utility factors or published datasets.
 CO2_FACTORS: Dict[str, float] = {
@@ -50,6 +71,34 @@ CO2_FACTORS: Dict[str, float] = {
 }
 
 
+# Factor table as parallel arrays so totals are one gather + dot product
+_FACTOR_KEYS = tuple(CO2_FACTORS)
+# Kept float64: the table is a few hundred bytes, and float32 factors (e.g. 0.233 -> 0.2329999954)
+# would already show in the 4-decimal breakdown for large amounts. Read-only so
+# per-call overrides have to copy it.
+_FACTOR_VALUES = np.fromiter(CO2_FACTORS.values(), dtype=np.float64, count=len(CO2_FACTORS))
+_FACTOR_VALUES.flags.writeable = False
+_FACTOR_INDEX: Dict[str, int] = {k: i for i, k in enumerate(_FACTOR_KEYS)}
+_ELECTRICITY_IDX = _FACTOR_INDEX["electricity_kwh"]
+
+
+@functools.lru_cache(maxsize=1024)
+def _normalized_key(activity_key: str) -> str:
+    return normalize_activity_name(activity_key)
+
+
+def _canonical_key(activity_key: str) -> str:
+    """
+    Canonical CO2_FACTORS key for an input key.
+
+    Keys that are already canonical (the usual case) are returned as-is; other
+    labels are normalized once per distinct label and memoized.
+    """
+    if activity_key in CO2_FACTORS:
+        return activity_key
+    return _normalized_key(activity_key)
+
+
 def _get_factor(activity_key: str) -> Optional[float]:
     """
     Return the emission factor for an activity, after normalizing its key.
@@ -57,8 +106,103 @@ def _get_factor(activity_key: str) -> Optional[float]:
     We accept flexible keys (e.g., "Electricity (kWh)") by normalizing them into
     the canonical format used by CO2_FACTORS.
     """
-    normalized = normalize_activity_name(activity_key)
-    return CO2_FACTORS.get(normalized)
+    return CO2_FACTORS.get(_canonical_key(activity_key))
+
+
+def _coerce_amount(amount) -> Optional[float]:
+    """float(amount), or None when it cannot be coerced. Plain floats/ints skip the try block."""
+    t = type(amount)
+    if t is float:
+        return amount
+    if t is int:
+        return float(amount)
+    try:
+        return float(amount)
+    except Exception:
+        return None
+
+
+def _gather_amounts(activity_data: Mapping[str, float], warnings: Optional[List[str]] = None):
+    """
+    Single pass over activity_data: factor-table indices and float amounts for
+    every known, numeric entry. Negative amounts are clipped to 0.
+
+    Returns (idx, amounts) as NumPy arrays of equal length. When a `warnings`
+    list is given, a message for each skipped or clipped entry is appended to it.
+    """
+    idx: List[int] = []
+    amts: List[float] = []
+    for activity, amount in activity_data.items():
+        i = _FACTOR_INDEX.get(_canonical_key(activity))
+        if i is None:
+            if warnings is not None:
+                warnings.append(f"'{activity}' not found in CO2_FACTORS")
+            continue
+        amt_val = _coerce_amount(amount)
+        if amt_val is None:
+            if warnings is not None:
+                warnings.append(f"amount for '{activity}' is not numeric; skipping.")
+            continue
+        if warnings is not None and amt_val < 0:
+            warnings.append(f"negative amount for '{activity}' ({amt_val}); treating as 0.")
+        idx.append(i)
+        amts.append(amt_val)
+    amt_arr = np.clip(np.asarray(amts, dtype=np.float64), 0.0, None)
+    return np.asarray(idx, dtype=np.intp), amt_arr
+
+
+@njit(cache=True)
+def _sum_emissions_kernel(idx, amts, factors):
+    """Sum of factors[idx[i]] * amts[i] (factor table gather fused with the reduction)."""
+    total = 0.0
+    for i in range(idx.shape[0]):
+        total += factors[idx[i]] * amts[i]
+    return total
+
+
+def _factor_table(region_code: Optional[str], renewable_adjust: Optional[float]) -> np.ndarray:
+    """The factor table, or a copy with the v2 electricity factor (region overlay, else renewable adjustment)."""
+    if not (region_code or renewable_adjust):
+        return _FACTOR_VALUES
+    overlay = _region_overlay(_norm_region(region_code))
+    adj = _clamp_fraction(renewable_adjust)
+    ef = overlay.get("electricity_kwh", CO2_FACTORS["electricity_kwh"])
+    if "electricity_kwh" not in overlay and adj > 0.0:
+        ef = ef * (1.0 - adj)
+    table = _FACTOR_VALUES.copy()
+    table[_ELECTRICITY_IDX] = ef
+    return table
+
+
+def _compute(
+    activity_data: Mapping[str, float],
+    *,
+    breakdown: bool = False,
+    region_code: Optional[str] = None,
+    renewable_adjust: Optional[float] = None,
+    warnings: Optional[List[str]] = None,
+):
+    """
+    One pass shared by all calculate_co2* functions.
+
+    Returns (total kg rounded to 2 decimals, {normalized key: kg rounded to 4} or None).
+    Input warnings are appended to `warnings` when a list is given.
+    The electricity factor follows the v2 rules (region overlay, else renewable
+    adjustment); with neither given it is the default factor, as in v1.
+    """
+    idx, amts = _gather_amounts(activity_data, warnings)
+    table = _factor_table(region_code, renewable_adjust)
+    if NUMBA_AVAILABLE:
+        total = round(float(_sum_emissions_kernel(idx, amts, table)), 2)
+    else:
+        # Without numba the kernel would be a plain Python loop; a gather + dot is faster
+        total = round(float(np.dot(table[idx], amts)), 2)
+    if not breakdown:
+        return total, None
+    kg = table[idx] * amts
+    # more precision here to help users debug contributions; rounded as one array
+    out = {_FACTOR_KEYS[i]: r for i, v, r in zip(idx.tolist(), kg.tolist(), np.round(kg, 4).tolist()) if v}
+    return total, out
 
 
 def calculate_co2(activity_data: Mapping[str, float]) -> float:
@@ -76,29 +220,22 @@ def calculate_co2(activity_data: Mapping[str, float]) -> float:
     Behavior
     - Non-numeric or negative amounts are ignored with a warning.
     - Unknown activity keys are ignored with a warning.
+    - Warnings go to this module's logger; use calculate_co2_verbose to get them back instead.
     """
-    total_emissions = 0.0
-
-    for activity, amount in activity_data.items():
-        factor = _get_factor(activity)
-        if factor is None:
-            print(f"⚠️ Warning: '{activity}' not found in CO2_FACTORS")
-            continue
-
-        # Coerce amount to float and guard against negatives
-        try:
-            amt_val = float(amount)
-        except (TypeError, ValueError):
-            print(f"⚠️ Warning: amount for '{activity}' is not numeric; skipping.")
-            continue
-
-        if amt_val < 0:
-            print(f"⚠️ Warning: negative amount for '{activity}' ({amt_val}); treating as 0.")
-            amt_val = 0.0
+    total, warnings = calculate_co2_verbose(activity_data)
+    for msg in warnings:
+        logger.warning(msg)
+    return total
 
-        total_emissions += factor * amt_val
 
-    return round(total_emissions, 2)
+def calculate_co2_verbose(activity_data: Mapping[str, float]) -> Tuple[float, List[str]]:
+    """
+    Like calculate_co2, but return (total, warnings) instead of logging, so the
+    caller can decide how to surface unknown keys and invalid amounts.
+    """
+    warnings: List[str] = []
+    total = _compute(activity_data, warnings=warnings)[0]
+    return total, warnings
 
 
 def calculate_co2_breakdown(activity_data: Mapping[str, float]) -> Dict[str, float]:
@@ -108,28 +245,9 @@ def calculate_co2_breakdown(activity_data: Mapping[str, float]) -> Dict[str, flo
     Unknown or invalid entries are skipped.
     Keys are returned in their normalized form.
     """
-    breakdown: Dict[str, float] = {}
+    return _compute(activity_data, breakdown=True)[1]
 
-    for activity, amount in activity_data.items():
-        normalized = normalize_activity_name(activity)
-        factor = CO2_FACTORS.get(normalized)
-        if factor is None:
-            continue
 
-        try:
-            amt_val = float(amount)
-        except (TypeError, ValueError):
-            continue
-
-        if amt_val < 0:
-            amt_val = 0.0
-
-        kg = factor * amt_val
-        if kg:
-            # more precision here to help users debug contributions
-            breakdown[normalized] = round(kg, 4)
-
-    return breakdown
 def _clamp_fraction(x: Optional[float]) -> float:
     try:
         xf = float(x) if x is not None else 0.0
@@ -137,13 +255,23 @@ def _clamp_fraction(x: Optional[float]) -> float:
         return 0.0
     return max(0.0, min(1.0, xf))
 
-def _region_overlay(region_code: Optional[str]) -> Dict[str, float]:
-    if not region_code:
-        return {}
-    pack = REGION_FACTOR_PACKS.get(str(region_code).strip())
+def _norm_region(region_code: Optional[str]) -> Optional[str]:
+    """Canonical region key: the stripped code, or None when blank. Public entry points normalize once with this."""
+    return (str(region_code).strip() or None) if region_code else None
+
+_EMPTY_OVERLAY: Mapping[str, float] = MappingProxyType({})
+
+
+@functools.lru_cache(maxsize=32)
+def _region_overlay(region_key: Optional[str]) -> Mapping[str, float]:
+    """Read-only view of a region pack's factor overrides (memoized; packs are fixed once loaded).
+    Expects a key from _norm_region."""
+    if not region_key:
+        return _EMPTY_OVERLAY
+    pack = _get_region_packs().get(region_key)
     if not pack:
-        return {}
-    return dict(pack.get("factors", {}))  # shallow copy
+        return _EMPTY_OVERLAY
+    return MappingProxyType(pack.get("factors", {}))
 
 def get_engine_meta(region_code: Optional[str]) -> Dict[str, str]:
     """Expose factor source metadata for UI captions."""
@@ -153,7 +281,7 @@ def get_engine_meta(region_code: Optional[str]) -> Dict[str, str]:
         "url": "",
         "region_code": str(region_code or "default"),
     }
-    pack = REGION_FACTOR_PACKS.get(str(region_code).strip()) if region_code else None
+    pack = _get_region_packs().get(_norm_region(region_code))
     if pack and "__meta__" in pack:
         meta.update({k: str(v) for k, v in pack["__meta__"].items()})
     return meta
@@ -169,29 +297,7 @@ def calculate_co2_v2(
     - region_code: if provided and known, overrides electricity factor.
     - renewable_adjust: fraction [0..1] that reduces the electricity factor when no region overlay applies.
     """
-    overlay = _region_overlay(region_code)
-    adj = _clamp_fraction(renewable_adjust)
-    total = 0.0
-    for activity, amount in activity_data.items():
-        norm = normalize_activity_name(activity)
-        factor = CO2_FACTORS.get(norm)
-        if factor is None:
-            continue
-        try:
-            amt = float(amount)
-        except Exception:
-            continue
-        if amt < 0:
-            amt = 0.0
-
-        if norm == "electricity_kwh":
-            ef = overlay.get("electricity_kwh", factor)
-            if "electricity_kwh" not in overlay and adj > 0.0:
-                ef = ef * (1.0 - adj)
-            total += ef * amt
-        else:
-            total += factor * amt
-    return round(total, 2)
+    return _compute(activity_data, region_code=region_code, renewable_adjust=renewable_adjust)[0]
 
 
 def calculate_co2_breakdown_v2(
@@ -203,31 +309,54 @@ def calculate_co2_breakdown_v2(
     """
     Per-activity kg CO₂ with same rules as calculate_co2_v2.
     """
-    overlay = _region_overlay(region_code)
-    adj = _clamp_fraction(renewable_adjust)
-    out: Dict[str, float] = {}
-    for activity, amount in activity_data.items():
-        norm = normalize_activity_name(activity)
-        factor = CO2_FACTORS.get(norm)
-        if factor is None:
-            continue
-        try:
-            amt = float(amount)
-        except Exception:
-            continue
-        if amt < 0:
-            amt = 0.0
-
-        ef = factor
-        if norm == "electricity_kwh":
-            ef = overlay.get("electricity_kwh", factor)
-            if "electricity_kwh" not in overlay and adj > 0.0:
-                ef = ef * (1.0 - adj)
-
-        kg = ef * amt
-        if kg:
-            out[norm] = round(kg, 4)
-    return out
+    return _compute(activity_data, breakdown=True, region_code=region_code, renewable_adjust=renewable_adjust)[1]
+
+
+def calculate_co2_with_breakdown_v2(
+    activity_data: Mapping[str, float],
+    *,
+    region_code: Optional[str] = None,
+    renewable_adjust: Optional[float] = None,
+):
+    """
+    (calculate_co2_v2, calculate_co2_breakdown_v2) from a single pass over activity_data.
+    """
+    return _compute(activity_data, breakdown=True, region_code=region_code, renewable_adjust=renewable_adjust)
+
+
+def _amount_column(values) -> np.ndarray:
+    """float64 amounts for one activity column; non-numeric, missing and negative entries become 0."""
+    try:
+        arr = np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        arr = np.array([_coerce_amount(v) for v in values], dtype=np.float64)
+    return np.where(arr > 0, arr, 0.0)
+
+
+def calculate_co2_batch(
+    rows,
+    *,
+    region_code: Optional[str] = None,
+    renewable_adjust: Optional[float] = None,
+) -> np.ndarray:
+    """
+    Totals (kg CO₂, rounded to 2 decimals) for many days at once, e.g. a history table.
+
+    - rows: a pandas DataFrame or a mapping of activity key -> sequence, one entry per day.
+      Columns are matched like calculate_co2_v2 keys; unknown columns are ignored.
+    - Non-numeric, missing (NaN) or negative amounts count as 0.
+    - region_code / renewable_adjust apply to electricity as in calculate_co2_v2.
+    Returns a float64 array with one total per row.
+    """
+    cols = list(rows.items())
+    n = len(cols[0][1]) if cols else 0
+    amounts = np.zeros((n, len(_FACTOR_KEYS)))
+    for col, values in cols:
+        i = _FACTOR_INDEX.get(_canonical_key(col))
+        if i is not None:
+            amounts[:, i] += _amount_column(values)
+    totals = amounts @ _factor_table(region_code, renewable_adjust)
+    return np.array([round(t, 2) for t in totals.tolist()], dtype=np.float64)
 
 
 # ------------------------------
@@ -253,23 +382,64 @@ DEFAULT_REGION_PACKS: Dict[str, dict] = {
     },
 }
 
+_REGION_PACKS_PATH = os.path.join(os.path.dirname(__file__), "data", "regions.json")
+
+
 def _load_region_packs_from_json() -> Dict[str, dict]:
     """Load region factor packs from data/regions.json if available.
-    Returns DEFAULT_REGION_PACKS on any error.
+    Returns DEFAULT_REGION_PACKS on any error (including a missing file).
     """
     try:
-        data_path = os.path.join(os.path.dirname(__file__), "data", "regions.json")
-        if os.path.exists(data_path):
-            with open(data_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                if isinstance(data, dict) and data:
-                    return data  # trust JSON structure
+        # Read the bytes in one go; a missing file raises instead of costing an extra stat
+        with open(_REGION_PACKS_PATH, "rb") as f:
+            data = json.loads(f.read())
+        if isinstance(data, dict) and data:
+            return data  # trust JSON structure
     except Exception:
         pass
     return DEFAULT_REGION_PACKS
 
-# Public pack variable used by the engine and UI
-REGION_FACTOR_PACKS: Dict[str, dict] = _load_region_packs_from_json()
+# Packs are read on first use rather than at import; REGION_FACTOR_PACKS stays
+# importable through the module __getattr__ below.
+_region_packs: Optional[Dict[str, dict]] = None
+_region_packs_lock = threading.Lock()
+
+
+def _get_region_packs() -> Dict[str, dict]:
+    """Region factor packs, loaded once on first access (thread-safe)."""
+    global _region_packs
+    if _region_packs is None:
+        with _region_packs_lock:
+            if _region_packs is None:
+                _region_packs = _load_region_packs_from_json()
+    return _region_packs
+
+
+def get_region_codes() -> List[str]:
+    """Sorted codes of the available region factor packs."""
+    return sorted(_get_region_packs())
+
+
+def reload_region_packs() -> Dict[str, dict]:
+    """Re-read data/regions.json and drop every memoized value derived from the packs."""
+    global _region_packs
+    with _region_packs_lock:
+        _region_packs = _load_region_packs_from_json()
+    for cached in (
+        _region_overlay,
+        _grid_mix_items,
+        _effective_electricity_factor,
+        _hourly_profile,
+        _hourly_profile_with_best,
+    ):
+        cached.cache_clear()
+    return _region_packs
+
+
+def __getattr__(name: str):
+    if name == "REGION_FACTOR_PACKS":
+        return _get_region_packs()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Approximate source intensities in kg CO2 per kWh, for illustrative implied intensity.
 SOURCE_INTENSITIES: Dict[str, float] = {
@@ -285,13 +455,21 @@ SOURCE_INTENSITIES: Dict[str, float] = {
 
 def get_grid_mix(region_code: Optional[str]) -> Dict[str, float]:
     """Return generation mix shares for a region if available.
-    Keys are lowercase source names; values are fractions [0..1].
+    Keys are lowercase source names; values are non-negative fractions [0..1]
+    summing to 1 (or all zero).
     """
-    if not region_code:
+    region_key = _norm_region(region_code)
+    if not region_key:
         return {}
-    pack = REGION_FACTOR_PACKS.get(str(region_code).strip())
+    # Packs are fixed once loaded, so the normalized mix is memoized per region
+    return dict(_grid_mix_items(region_key))
+
+
+@functools.lru_cache(maxsize=128)
+def _grid_mix_items(region_key: str) -> tuple:
+    pack = _get_region_packs().get(region_key)
     if not pack:
-        return {}
+        return ()
     mix = pack.get("grid_mix", {})
     # Validate and normalize
     out: Dict[str, float] = {}
@@ -302,14 +480,14 @@ def get_grid_mix(region_code: Optional[str]) -> Dict[str, float]:
             continue
     total = sum(out.values())
     if total > 0:
-        return {k: v / total for k, v in out.items()}
-    return out
+        return tuple((k, v / total) for k, v in out.items())
+    return tuple(out.items())
 
 def compute_mix_intensity(mix: Dict[str, float]) -> float:
     """Compute implied kg CO2/kWh from a generation mix using SOURCE_INTENSITIES.
     Unknown sources are ignored. Returns a rounded value with 3 decimals.
     """
-    total = 0.0
+    items = []
     for src, share in mix.items():
         try:
             s = float(share)
@@ -317,11 +495,18 @@ def compute_mix_intensity(mix: Dict[str, float]) -> float:
             continue
         if s <= 0:
             continue
-        intensity = SOURCE_INTENSITIES.get(str(src).lower())
-        if intensity is None:
-            continue
-        total += s * float(intensity)
-    return round(total, 3)
+        items.append((str(src).lower(), s))
+    # The same few region mixes are scored on every rerun; key the cache on the
+    # validated pairs so equal mixes hit regardless of value types/key case
+    return _mix_items_intensity(tuple(items))
+
+
+@functools.lru_cache(maxsize=64)
+def _mix_items_intensity(items: tuple) -> float:
+    """compute_mix_intensity for already-validated (source, share) pairs, e.g.
+    from _grid_mix_items: keys are lowercase and shares are non-negative floats."""
+    si = SOURCE_INTENSITIES
+    return round(sum((share * si[src] for src, share in items if src in si), 0.0), 3)
 
 
 def get_effective_electricity_factor(
@@ -334,7 +519,13 @@ def get_effective_electricity_factor(
     - If a known region overlay exists, return its electricity factor.
     - Otherwise, apply a fractional reduction [0..1] to the default electricity factor.
     - All inputs are clamped/validated; always returns a non-negative float.
+    - Memoized per (region, clamped adjustment).
     """
+    return _effective_electricity_factor(_norm_region(region_code), _clamp_fraction(renewable_adjust))
+
+
+@functools.lru_cache(maxsize=64)
+def _effective_electricity_factor(region_code: Optional[str], adj: float) -> float:
     base_ef = float(CO2_FACTORS.get("electricity_kwh", 0.233))
     overlay = _region_overlay(region_code)
     if "electricity_kwh" in overlay:
@@ -343,11 +534,7 @@ def get_effective_electricity_factor(
         except Exception:
             return base_ef
     # No overlay; apply renewable adjustment
-    adj = _clamp_fraction(renewable_adjust)
-    try:
-        return max(0.0, base_ef * (1.0 - float(adj)))
-    except Exception:
-        return base_ef
+    return max(0.0, base_ef * (1.0 - adj))
 
 
 # -----------------------------------------
@@ -400,11 +587,42 @@ HOURLY_PROFILE_SHAPES: Dict[str, List[float]] = {
 
 
 def _normalize_shape_to_avg_one(shape: List[float]) -> List[float]:
-    vals = [max(0.0, float(x)) for x in shape]
-    avg = sum(vals) / len(vals) if vals else 1.0
+    vals = np.clip(np.asarray(shape, dtype=np.float64), 0.0, None)
+    avg = vals.mean() if vals.size else 1.0
     if avg <= 0:
         return [1.0 for _ in range(24)]
-    return [x / avg for x in vals]
+    return (vals / avg).tolist()
+
+
+def _shape_to_24(shape: List[float]) -> np.ndarray:
+    """Average-one normalized shape, padded with its last value or trimmed to 24 hours."""
+    norm = np.asarray(_normalize_shape_to_avg_one(shape), dtype=np.float64)
+    if norm.size < 24:
+        norm = np.concatenate([norm, np.full(24 - norm.size, norm[-1])])
+    return norm[:24]
+
+
+# Shapes are static, so normalize them once at import
+_NORMALIZED_SHAPES: Dict[str, np.ndarray] = {k: _shape_to_24(v) for k, v in HOURLY_PROFILE_SHAPES.items()}
+
+# Region profile types whose own shape wins over the seasonal one
+_REGION_SHAPE_OVERRIDES: Dict[str, str] = {k: k for k in ("solar_heavy", "wind_heavy", "coal_heavy")}
+
+# Season name -> shape, in the order compound names are matched by substring
+_SEASON_SHAPES: Dict[str, str] = {
+    "winter": "winter_dual_peak",
+    "summer": "evening_peak",
+    "spring": "spring_solar",
+    "autumn": "autumn_transition",
+    "fall": "autumn_transition",
+}
+
+def _season_shape(season_key: str) -> str:
+    """Shape name for a lower-cased season; exact names are a dict hit, others fall back to a substring match."""
+    shape = _SEASON_SHAPES.get(season_key)
+    if shape is None:
+        shape = next((v for k, v in _SEASON_SHAPES.items() if k in season_key), "flat")
+    return shape
 
 def _get_region_profile_type(region_code: Optional[str]) -> str:
     """Determine the best hourly profile type based on region's grid mix characteristics."""
@@ -440,10 +658,30 @@ def hourlyIntensityProfile(regionCode: Optional[str], season: str) -> List[float
     - Uses region grid mix (if available) to compute implied base intensity via
       compute_mix_intensity(). Falls back to effective factor if mix missing.
     - Applies a simple season-specific shape and scales to the base intensity.
+    - Memoized per (region, season); each call returns a fresh list.
     """
+    return list(_hourly_profile(_norm_region(regionCode), str(season or "").lower()))
+
+
+def hourly_profile_with_best(regionCode: Optional[str], season: str) -> Tuple[List[float], int, float]:
+    """hourlyIntensityProfile plus its first lowest-intensity hour and that hour's
+    intensity, memoized together so reruns skip the argmin."""
+    profile, best_hour, best_intensity = _hourly_profile_with_best(_norm_region(regionCode), str(season or "").lower())
+    return list(profile), best_hour, best_intensity
+
+
+@functools.lru_cache(maxsize=128)
+def _hourly_profile_with_best(region_key: Optional[str], season_key: str) -> Tuple[tuple, int, float]:
+    profile = _hourly_profile(region_key, season_key)
+    best_hour = int(_best_hour_kernel(np.asarray(profile, dtype=np.float64)))
+    return profile, best_hour, profile[best_hour]
+
+
+@functools.lru_cache(maxsize=128)
+def _hourly_profile(regionCode: Optional[str], season_key: str) -> tuple:
     # Base intensity from mix if available; else from effective factor.
-    mix = get_grid_mix(regionCode)
-    implied = compute_mix_intensity(mix) if mix else None
+    mix_items = _grid_mix_items(regionCode) if regionCode else ()
+    implied = _mix_items_intensity(mix_items) if mix_items else None
     if implied is None:
         try:
             implied = float(
@@ -453,44 +691,131 @@ def hourlyIntensityProfile(regionCode: Optional[str], season: str) -> List[float
             implied = float(CO2_FACTORS.get("electricity_kwh", 0.233))
 
     # Choose shape by season and region characteristics
-    season_key = str(season or "").lower()
     region_type = _get_region_profile_type(regionCode)
     
     # Priority 1: Region-specific patterns override seasonal defaults
-    if region_type == "solar_heavy":
-        raw_shape = HOURLY_PROFILE_SHAPES["solar_heavy"]
-    elif region_type == "wind_heavy":
-        raw_shape = HOURLY_PROFILE_SHAPES["wind_heavy"]
-    elif region_type == "coal_heavy":
-        raw_shape = HOURLY_PROFILE_SHAPES["coal_heavy"]
     # Priority 2: Seasonal patterns for default regions
-    elif "winter" in season_key:
-        raw_shape = HOURLY_PROFILE_SHAPES["winter_dual_peak"]
-    elif "summer" in season_key:
-        raw_shape = HOURLY_PROFILE_SHAPES["evening_peak"]
-    elif "spring" in season_key:
-        raw_shape = HOURLY_PROFILE_SHAPES["spring_solar"]
-    elif "autumn" in season_key or "fall" in season_key:
-        raw_shape = HOURLY_PROFILE_SHAPES["autumn_transition"]
-    else:
-        raw_shape = HOURLY_PROFILE_SHAPES["flat"]
-
-    norm_shape = _normalize_shape_to_avg_one(raw_shape)
-    profile = [round(implied * x, 5) for x in norm_shape]
-    # Ensure 24 values
-    if len(profile) != 24:
-        # pad or trim as needed
-        if len(profile) < 24:
-            profile = profile + [profile[-1]] * (24 - len(profile))
-        else:
-            profile = profile[:24]
-    return profile
+    shape_key = _REGION_SHAPE_OVERRIDES.get(region_type) or _season_shape(season_key)
+
+    # Pre-normalized 24-hour shape scaled to the base intensity
+    return tuple(np.round(implied * _NORMALIZED_SHAPES[shape_key], 5).tolist())
 
 
 def suggest_low_hours(profile: List[float], top_n: int = 3) -> List[int]:
     """Return the indices (hours) of the top_n lowest-intensity hours."""
-    pairs = sorted(((v, i) for i, v in enumerate(profile)), key=lambda t: t[0])
-    return [i for _, i in pairs[: max(1, int(top_n))]]
+    n = max(1, int(top_n))
+    if NUMBA_AVAILABLE:
+        return _topn_low_kernel(np.ascontiguousarray(profile, dtype=np.float64), n).tolist()
+    # Stable, so equal intensities keep the earlier hour first (argpartition would not);
+    # for 24 values the C sort beats a Python-level partial selection
+    return np.argsort(np.asarray(profile, dtype=np.float64), kind="stable")[:n].tolist()
+
+@njit(cache=True)
+def _topn_low_kernel(profile_arr, n):
+    """Indices of the n lowest values in ascending order, in one insertion pass;
+    equal values keep the earlier index first (same order as a stable argsort)."""
+    m = min(n, profile_arr.shape[0])
+    out = np.empty(m, dtype=np.int64)
+    k = 0
+    for h in range(profile_arr.shape[0]):
+        v = profile_arr[h]
+        if k < m:
+            j = k
+            k += 1
+        elif v < profile_arr[out[m - 1]]:
+            j = m - 1
+        else:
+            continue
+        while j > 0 and v < profile_arr[out[j - 1]]:
+            out[j] = out[j - 1]
+            j -= 1
+        out[j] = h
+    return out
+
+@njit(cache=True)
+def _best_hour_kernel(profile_arr):
+    """Index of the first lowest-intensity hour in a float64 profile array."""
+    best = 0
+    best_v = profile_arr[0]
+    for h in range(1, profile_arr.shape[0]):
+        if profile_arr[h] < best_v:
+            best_v = profile_arr[h]
+            best = h
+    return best
+
+
+@njit(cache=True)
+def _compare_tasks_kernel(profile_arr, tasks_arr):
+    """Return an Nx3 array of (intensity, current kg, optimal kg) for Nx2 (kwh, hour) tasks."""
+    n = tasks_arr.shape[0]
+    best_v = profile_arr[_best_hour_kernel(profile_arr)]
+    out = np.empty((n, 3))
+    for i in range(n):
+        kwh = tasks_arr[i, 0]
+        intensity = profile_arr[int(tasks_arr[i, 1])]
+        out[i, 0] = intensity
+        out[i, 1] = kwh * intensity
+        out[i, 2] = kwh * best_v
+    return out
+
+
+def _parse_tasks(tasks: List[dict]) -> Tuple[List[str], np.ndarray]:
+    """Names and an Nx2 float64 (kwh, hour 0-23) array for the valid tasks; invalid ones are skipped."""
+    names: List[str] = []
+    rows: List[tuple] = []
+    for task in tasks:
+        try:
+            name = str(task.get("name", "Unknown"))
+            kwh = float(task.get("kwh", 0))
+            hour = int(task.get("hour", 0)) % 24
+        except Exception:
+            continue
+        names.append(name)
+        rows.append((kwh, hour))
+    return names, np.array(rows, dtype=np.float64).reshape(-1, 2)
+
+
+def compare_tasks_columns(profile: List[float], tasks: List[dict]) -> Dict[str, np.ndarray]:
+    """
+    Column-oriented variant of compare_tasks_at_hours.
+
+    Returns one array per field (same keys as the per-task dicts), so callers can
+    build a DataFrame or take argmax/sums without going through a list of records.
+    Invalid tasks are skipped; with no valid tasks every array is empty.
+    """
+    profile_arr = np.ascontiguousarray(profile, dtype=np.float64)
+    best_hour = int(_best_hour_kernel(profile_arr))
+    best_intensity = float(profile_arr[best_hour])
+
+    # Validate tasks once, then run the numeric part on a single (kwh, hour) array
+    names, tasks_arr = _parse_tasks(tasks)
+    n = len(names)
+    if not n:
+        calc = np.empty((0, 3))
+    elif NUMBA_AVAILABLE:
+        calc = _compare_tasks_kernel(profile_arr, tasks_arr)
+    else:
+        # Without numba the kernel is a per-task Python loop; fancy indexing does the same math in C
+        kwh_arr = tasks_arr[:, 0]
+        intensity = profile_arr[tasks_arr[:, 1].astype(np.intp)]
+        calc = np.column_stack((intensity, kwh_arr * intensity, kwh_arr * best_intensity))
+    co2_current = calc[:, 1]
+    co2_optimal = calc[:, 2]
+    savings = co2_current - co2_optimal
+    savings_pct = np.divide(savings * 100, co2_current, out=np.zeros_like(savings), where=co2_current > 0)
+
+    return {
+        "name": np.array(names, dtype=object),
+        "kwh": tasks_arr[:, 0],
+        "current_hour": tasks_arr[:, 1].astype(np.int64),
+        "current_intensity": np.round(calc[:, 0], 4),
+        "current_co2_kg": np.round(co2_current, 3),
+        "optimal_hour": np.full(n, best_hour, dtype=np.int64),
+        "optimal_intensity": np.full(n, round(best_intensity, 4)),
+        "optimal_co2_kg": np.round(co2_optimal, 3),
+        "savings_kg": np.round(savings, 3),
+        "savings_pct": np.round(savings_pct, 1),
+    }
 
 def compare_tasks_at_hours(profile: List[float], tasks: List[dict]) -> List[dict]:
     """
@@ -503,38 +828,20 @@ def compare_tasks_at_hours(profile: List[float], tasks: List[dict]) -> List[dict
     Returns:
         List of dicts with task details, CO2 emissions, and optimal hour suggestion
     """
-    results = []
-    best_hour = min(range(24), key=lambda h: profile[h])
-    best_intensity = profile[best_hour]
-    
-    for task in tasks:
-        try:
-            name = str(task.get("name", "Unknown"))
-            kwh = float(task.get("kwh", 0))
-            hour = int(task.get("hour", 0)) % 24
-            
-            intensity_at_hour = profile[hour]
-            co2_current = kwh * intensity_at_hour
-            co2_optimal = kwh * best_intensity
-            savings = co2_current - co2_optimal
-            savings_pct = (savings / co2_current * 100) if co2_current > 0 else 0.0
-            
-            results.append({
-                "name": name,
-                "kwh": kwh,
-                "current_hour": hour,
-                "current_intensity": round(intensity_at_hour, 4),
-                "current_co2_kg": round(co2_current, 3),
-                "optimal_hour": best_hour,
-                "optimal_intensity": round(best_intensity, 4),
-                "optimal_co2_kg": round(co2_optimal, 3),
-                "savings_kg": round(savings, 3),
-                "savings_pct": round(savings_pct, 1),
-            })
-        except Exception:
-            continue
-    
-    return results
+    cols = compare_tasks_columns(profile, tasks)
+    lists = {k: v.tolist() for k, v in cols.items()}
+    return [dict(zip(lists, values)) for values in zip(*lists.values())]
+
+def task_hour_matrix(profile: List[float], tasks: List[dict]) -> Tuple[List[str], np.ndarray]:
+    """
+    kg CO2 for every valid task at every hour of the profile, as one broadcast.
+
+    Returns (names, matrix) where matrix[h, i] = profile[h] * kwh of task i
+    (shape len(profile) x N); invalid tasks are skipped as in compare_tasks_columns.
+    """
+    names, tasks_arr = _parse_tasks(tasks)
+    profile_arr = np.ascontiguousarray(profile, dtype=np.float64)
+    return names, np.multiply.outer(profile_arr, tasks_arr[:, 0])
 
 # -------------------------------
 # Smart Home Device Presets
@@ -642,24 +949,47 @@ SEASONAL_ADJUSTMENTS: Dict[str, Dict[str, float]] = {
     },
 }
 
+# Presets grouped once at import; get_device_presets_by_category hands out copies
+_grouped: Dict[str, List[str]] = {}
+for _name, _info in DEVICE_PRESETS.items():
+    _grouped.setdefault(_info.get("category", "Other"), []).append(_name)
+_PRESETS_BY_CATEGORY: Dict[str, Tuple[str, ...]] = {c: tuple(names) for c, names in _grouped.items()}
+del _grouped, _name, _info
+
+# Column (SoA) view of DEVICE_PRESETS for vectorized energy math
+_PRESET_NAMES: Tuple[str, ...] = tuple(DEVICE_PRESETS)
+_PRESET_POWER_W = np.array([DEVICE_PRESETS[n]["power_w"] for n in _PRESET_NAMES], dtype=np.float64)
+_PRESET_HOURS = np.array([DEVICE_PRESETS[n]["hours_per_day"] for n in _PRESET_NAMES], dtype=np.float64)
+_PRESET_CATEGORIES: Tuple[str, ...] = tuple(_PRESETS_BY_CATEGORY)
+_PRESET_CATEGORY_IDX = np.array(
+    [_PRESET_CATEGORIES.index(DEVICE_PRESETS[n].get("category", "Other")) for n in _PRESET_NAMES], dtype=np.intp
+)
+_PRESET_DAILY_KWH = _PRESET_POWER_W * _PRESET_HOURS / 1000.0
+for _arr in (_PRESET_POWER_W, _PRESET_HOURS, _PRESET_CATEGORY_IDX, _PRESET_DAILY_KWH):
+    _arr.flags.writeable = False
+del _arr
+
 def get_device_presets_by_category() -> Dict[str, List[str]]:
     """Return device presets grouped by category."""
-    categories: Dict[str, List[str]] = {}
-    for device, info in DEVICE_PRESETS.items():
-        cat = info.get("category", "Other")
-        if cat not in categories:
-            categories[cat] = []
-        categories[cat].append(device)
-    return categories
+    return {cat: list(names) for cat, names in _PRESETS_BY_CATEGORY.items()}
 
-def apply_seasonal_adjustment(device_name: str, season: str, base_hours: float) -> float:
-    """Apply seasonal adjustment to device usage hours."""
-    adjustments = SEASONAL_ADJUSTMENTS.get(season, {})
-    if device_name in adjustments:
-        return adjustments[device_name]
-    return base_hours
+# (device, season) -> adjusted hours, flattened once so each call is a single lookup
+_SEASONAL_HOURS: Dict[Tuple[str, str], float] = {
+    (device, season): hours
+    for season, adjustments in SEASONAL_ADJUSTMENTS.items()
+    for device, hours in adjustments.items()
+}
 
-def calculate_annual_savings(daily_kwh: float, current_hour: int, profile: List[float]) -> dict:
+def apply_seasonal_adjustment(device_name: str, season: str, base_hours: float) -> float:
+    """Apply seasonal adjustment to device usage hours (the season's override, else base_hours)."""
+    return _SEASONAL_HOURS.get((device_name, season), base_hours)
+
+def calculate_annual_savings(
+    daily_kwh: float,
+    current_hour: int,
+    profile: List[float],
+    best_hour: Optional[int] = None,
+) -> dict:
     """
     Calculate annual CO2 savings from shifting a recurring task to optimal hour.
     
@@ -667,14 +997,18 @@ def calculate_annual_savings(daily_kwh: float, current_hour: int, profile: List[
         daily_kwh: Energy consumption per day (kWh)
         current_hour: Current operating hour (0-23)
         profile: 24-hour intensity profile (kg CO2/kWh)
+        best_hour: Lowest-intensity hour if already known (see hourly_profile_with_best)
     
     Returns:
         Dict with daily, monthly, yearly savings and cost estimates
     """
     try:
-        best_hour = min(range(24), key=lambda h: profile[h])
-        current_intensity = profile[int(current_hour) % 24]
-        best_intensity = profile[best_hour]
+        profile_arr = np.ascontiguousarray(profile, dtype=np.float64)
+        if best_hour is None:
+            best_hour = _best_hour_kernel(profile_arr)
+        best_hour = int(best_hour)
+        current_intensity = float(profile_arr[int(current_hour) % 24])
+        best_intensity = float(profile_arr[best_hour])
         
         daily_savings_kg = daily_kwh * (current_intensity - best_intensity)
         monthly_savings_kg = daily_savings_kg * 30
@@ -706,9 +1040,49 @@ def calculate_annual_savings(daily_kwh: float, current_hour: int, profile: List[
             "savings_pct": 0.0,
         }
 
+def annual_savings_batch(profile: List[float], current_hour: int, optimal_hour: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """
+    Yearly kg CO2 saved by moving every DEVICE_PRESETS device (at its typical daily
+    use) from current_hour to optimal_hour (default: the profile's best hour).
+
+    Returns columns aligned with the preset order: 'name', 'category', 'daily_kwh'
+    and 'yearly_savings_kg' (rounded like calculate_annual_savings).
+    """
+    profile_arr = np.ascontiguousarray(profile, dtype=np.float64)
+    if optimal_hour is None:
+        optimal_hour = _best_hour_kernel(profile_arr)
+    delta = profile_arr[int(current_hour) % 24] - profile_arr[int(optimal_hour) % 24]
+    return {
+        "name": np.array(_PRESET_NAMES, dtype=object),
+        "category": np.array(_PRESET_CATEGORIES, dtype=object)[_PRESET_CATEGORY_IDX],
+        "daily_kwh": _PRESET_DAILY_KWH,
+        "yearly_savings_kg": np.round(_PRESET_DAILY_KWH * delta * 365, 2),
+    }
+
+
 # -------------------------------
 # Energy efficiency score (0–100)
 # -------------------------------
+# Activity keys scored in each efficiency_score category, and the inverted lookup
+_SCORE_CATEGORY_KEYS: Dict[str, List[str]] = {
+    "Energy": ["electricity_kwh", "natural_gas_m3", "district_heating_kwh", "propane_liter", "fuel_oil_liter", "hot_water_liter"],
+    "Transport": ["petrol_liter", "diesel_liter", "bus_km", "train_km", "bicycle_km", "flight_short_km", "flight_long_km"],
+    "Meals": ["meat_kg", "chicken_kg", "eggs_kg", "dairy_kg", "vegetarian_kg", "vegan_kg"],
+}
+_SCORE_KEY_TO_CATEGORY: Dict[str, str] = {k: c for c, keys in _SCORE_CATEGORY_KEYS.items() for k in keys}
+# Simple daily baselines (kg CO2) – illustrative
+_SCORE_BASELINES: Dict[str, float] = {
+    "Energy": 8.0,
+    "Transport": 6.0,
+    "Meals": 5.0,
+}
+_SCORE_WEIGHTS: Dict[str, float] = {
+    "Energy": 0.45,
+    "Transport": 0.35,
+    "Meals": 0.20,
+}
+
+
 def efficiency_score(activity_data: Mapping[str, float]) -> dict:
     """
     Return {'score': int, 'category_scores': dict, 'badges': list[str], 'notes': list[str]}.
@@ -717,41 +1091,15 @@ def efficiency_score(activity_data: Mapping[str, float]) -> dict:
     Score 100 = very low emissions vs baseline. Weighted average across categories.
     """
     try:
-        # Simple daily baselines (kg CO2) – illustrative
-        baselines = {
-            "Energy": 8.0,
-            "Transport": 6.0,
-            "Meals": 5.0,
-        }
-        weights = {
-            "Energy": 0.45,
-            "Transport": 0.35,
-            "Meals": 0.20,
-        }
-        # Compute per-category emissions from activity_data
-        cat = {}
-        # Local import to avoid circulars
-        from co2_engine import CO2_FACTORS as EF  # noqa
-
-        def _sum(keys):
-            s = 0.0
-            for k in keys:
-                try:
-                    amt = float(activity_data.get(k, 0) or 0)
-                except Exception:
-                    amt = 0.0
-                s += amt * EF.get(k, 0.0)
-            return s
-
-        cat["Energy"] = _sum([
-            "electricity_kwh", "natural_gas_m3", "district_heating_kwh", "propane_liter", "fuel_oil_liter", "hot_water_liter"
-        ])
-        cat["Transport"] = _sum([
-            "petrol_liter", "diesel_liter", "bus_km", "train_km", "bicycle_km", "flight_short_km", "flight_long_km"
-        ])
-        cat["Meals"] = _sum([
-            "meat_kg", "chicken_kg", "eggs_kg", "dairy_kg", "vegetarian_kg", "vegan_kg"
-        ])
+        baselines = _SCORE_BASELINES
+        weights = _SCORE_WEIGHTS
+        # Compute per-category emissions from activity_data in one pass
+        cat = dict.fromkeys(_SCORE_CATEGORY_KEYS, 0.0)
+        for k, v in activity_data.items():
+            c = _SCORE_KEY_TO_CATEGORY.get(k)
+            if c is not None:
+                amt = _coerce_amount(v or 0)
+                cat[c] += (amt or 0.0) * CO2_FACTORS.get(k, 0.0)
 
         # Category scores (0-100) – lower than baseline -> higher score
         cat_scores = {}
@@ -781,11 +1129,11 @@ def efficiency_score(activity_data: Mapping[str, float]) -> dict:
         else:
             badges.append("🚧 Needs improvement")
 
-        # Guidance note per dominant category
-        worst_cat = min(cat_scores.items(), key=lambda kv: kv[1])[0]
-        if worst_cat == "Energy":
+        # Guidance note for the lowest-scoring category (first one wins ties)
+        e, t, m = cat_scores["Energy"], cat_scores["Transport"], cat_scores["Meals"]
+        if e <= t and e <= m:
             notes.append("Focus on electricity/gas usage (standby power, thermostat setpoints, efficient appliances).")
-        elif worst_cat == "Transport":
+        elif t <= m:
             notes.append("Shift trips to lower-carbon modes (walk/bike/transit) or consolidate car journeys.")
         else:
             notes.append("Try more plant-forward meals and reduce high-impact ingredients on heavy days.")
@@ -797,24 +1145,31 @@ def efficiency_score(activity_data: Mapping[str, float]) -> dict:
 # --------------------------
 # Offset suggestions (local)
 # --------------------------
+# Simple illustrative offset mix; shared read-only by every estimate_offsets result
+_OFFSET_MIX = tuple(
+    MappingProxyType(m)
+    for m in (
+        {"project": "Reforestation", "share": 0.4},
+        {"project": "Renewable Energy", "share": 0.35},
+        {"project": "Cookstoves", "share": 0.25},
+    )
+)
+
 def estimate_offsets(kg_today: float, kg_week: float | None = None, price_per_tonne_usd: float = 15.0) -> dict:
     """
     Return {'today': {...}, 'week': {...}} with tonnes and costs.
     - price_per_tonne_usd: user-adjustable price in USD per tCO2e.
+    - 'mix' is a shared, read-only sequence of {'project', 'share'} mappings.
     """
     t_today = max(0.0, float(kg_today or 0.0)) / 1000.0
     t_week = max(0.0, float(kg_week or 0.0)) / 1000.0 if kg_week is not None else None
+    price = float(price_per_tonne_usd)
     def _calc(t):
         return {
             "tonnes": round(t, 3),
-            "price_per_tonne": float(price_per_tonne_usd),
-            "cost_usd": round(t * float(price_per_tonne_usd), 2),
-            # simple illustrative mix
-            "mix": [
-                {"project": "Reforestation", "share": 0.4},
-                {"project": "Renewable Energy", "share": 0.35},
-                {"project": "Cookstoves", "share": 0.25},
-            ],
+            "price_per_tonne": price,
+            "cost_usd": round(t * price, 2),
+            "mix": _OFFSET_MIX,
         }
     out = {"today": _calc(t_today)}
     if t_week is not None:
@@ -831,12 +1186,11 @@ def simple_forecast_next7(daily_totals: list[float]) -> list[float]:
     - Else, use the average of all provided.
     Returns 7 values (kg CO2).
     """
-    vals = [max(0.0, float(x)) for x in (daily_totals or []) if x is not None]
-    if not vals:
-        base = 0.0
-    else:
-        base = sum(vals[-7:]) / min(7, len(vals))
-    return [round(base, 2) for _ in range(7)]
+    vals = np.asarray([x for x in (daily_totals or []) if x is not None], dtype=np.float64)
+    # fmax (not clip) so NaN entries count as 0, like max(0.0, nan)
+    np.fmax(vals, 0.0, out=vals)
+    base = float(vals[-7:].mean()) if vals.size else 0.0
+    return [round(base, 2)] * 7
 
 # ------------------------
 # Weekly goal plan
@@ -848,11 +1202,34 @@ def weekly_goal_plan(current_week_sum: float, remaining_days: int, target_week_s
     Returns {'required_per_day': float, 'delta_vs_current_avg': float}
     """
     remain = max(0, int(remaining_days))
+    return _weekly_plan(float(current_week_sum), 7 - remain, remain, float(target_week_sum))
+
+
+def weekly_goal_plan_incremental(
+    prev_state: Optional[dict],
+    new_day_kg: float,
+    remaining_days: int,
+    target_week_sum: float,
+) -> Tuple[dict, dict]:
+    """
+    weekly_goal_plan for callers that feed the week one day at a time.
+    prev_state is {'sum': float, 'elapsed': int} from the previous call (None to start a week).
+    Returns (plan, new_state); plan has the same keys as weekly_goal_plan.
+    """
+    prev = prev_state or {}
+    state = {
+        "sum": float(prev.get("sum", 0.0)) + float(new_day_kg),
+        "elapsed": int(prev.get("elapsed", 0)) + 1,
+    }
+    remain = max(0, int(remaining_days))
+    return _weekly_plan(state["sum"], state["elapsed"], remain, float(target_week_sum)), state
+
+
+def _weekly_plan(week_sum: float, elapsed: int, remain: int, target: float) -> dict:
     if remain == 0:
         return {"required_per_day": 0.0, "delta_vs_current_avg": 0.0}
-    needed = max(0.0, float(target_week_sum) - float(current_week_sum))
-    req = needed / remain
-    cur_avg = (float(current_week_sum) / (7 - remain)) if (7 - remain) > 0 else req
+    req = max(0.0, target - week_sum) / remain
+    cur_avg = (week_sum / elapsed) if elapsed > 0 else req
     return {"required_per_day": round(req, 2), "delta_vs_current_avg": round(req - cur_avg, 2)}
 
 
@@ -32,3 +32,46 @@ def test_should_generate_tip_false_on_invalid():
 def test_should_generate_tip_true_on_valid_and_meaningful():
     data = {"x": 0, "y": 1.5}
     assert should_generate_tip(data) is True
+
+
+def test_validate_inputs_single_pass_matches_helpers():
+    from app_helpers import validate_inputs
+    data = {"a": "", "b": "2", "c": -0.5, "d": None, "e": 0}
+    check = validate_inputs(data)
+    assert check.invalid == find_invalid_fields(data) == ["a", "c", "d"]
+    assert check.meaningful is has_meaningful_input(data) is True
+    assert validate_inputs({}) == (False, [])
+
+
+
+def test_validate_inputs_uses_coerce_float_rules():
+    from app_helpers import validate_inputs
+    data = {"a": "1_000", "b": "0"}
+    assert _coerce_float("1_000") == 1000.0
+    assert validate_inputs(data) == (True, [])
+    assert should_generate_tip(data) is True
+
+def test__coerce_float_fast_paths_and_blanks():
+    assert _coerce_float(3) == 3.0 and isinstance(_coerce_float(3), float)
+    assert _coerce_float(True) == 1.0
+    assert _coerce_float(None) is None
+    assert _coerce_float("  ") is None
+    assert _coerce_float(" 4.5 ") == 4.5
+    assert _coerce_float([1]) is None
+
+
+def test__coerce_float_string_prefilter_keeps_float_semantics():
+    assert _coerce_float("12abc") is None
+    assert _coerce_float("-1e3") == -1000.0
+    assert _coerce_float("1_000") == 1000.0
+    assert _coerce_float("-Infinity") == float("-inf")
+    assert _coerce_float("1e") is None
+    # Non-ASCII strings skip the ASCII-only screen and go straight to float()
+    assert _coerce_float("１２") == 12.0
+
+
+def test__coerce_float_plain_decimal_fast_path():
+    for s in ("12", " -0.5 ", "3.", "+4"):
+        assert _coerce_float(s) == float(s)
+    # Non-ASCII digits miss the ASCII-only fast path but still parse, as with float()
+    assert _coerce_float("٣") == 3.0
@@ -1,5 +1,7 @@
+import json
 import math
 import datetime as dt
+import numpy as np
 import pandas as pd
 import pytest
 
@@ -89,3 +91,203 @@ def test_award_badges_logic():
     assert any("Consistency" in b for b in badges)
     assert any("Low Impact" in b for b in badges)
     assert any("3-Day Streak" in b for b in badges)
+
+
+def test_cached_history_sees_new_entries(tmp_path, monkeypatch):
+    """
+    load_history() is cached on the file's mtime/size, so a later save must still show up.
+    """
+    monkeypatch.setattr(app, "HISTORY_FILE", str(tmp_path / "history.csv"))
+    app.save_entry(dt.date(2025, 1, 3), {"bus_km": 1.0}, 0.12)
+    assert len(app.load_history()) == 1
+    app.save_entry(dt.date(2025, 1, 1), {"bus_km": 2.0}, 0.24)
+    assert len(app.load_history()) == 2
+
+    norm = app.load_history_normalized()
+    assert list(norm["date"]) == [dt.date(2025, 1, 1), dt.date(2025, 1, 3)]
+    assert list(norm.index) == [0, 1]
+
+
+def test_longest_streak_runs():
+    dates = [dt.date(2025, 1, d) for d in (5, 1, 2, 3, 3, 7, 8)]
+    assert app.longest_streak(dates) == 3
+    assert app.longest_streak([dt.date(2025, 1, 1)]) == 1
+    assert app.longest_streak([]) == 0
+
+
+def test_leaderboard_stats_single_pass(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "HISTORY_FILE", str(tmp_path / "history.csv"))
+    for i, total in enumerate([5.0, 2.0, 9.0, 4.0, 3.0, 6.0, 7.0, 1.0]):
+        app.save_entry(dt.date(2025, 1, 1) + dt.timedelta(days=i), {}, total)
+
+    lb = app.leaderboard_stats()
+    assert lb["low"] == (dt.date(2025, 1, 8), 1.0)
+    assert lb["high"] == (dt.date(2025, 1, 3), 9.0)
+    assert lb["best_avg7"] == pytest.approx(32.0 / 7.0)
+    assert lb["streak"] == 8
+    assert list(lb["top5"]["total_kg"]) == [1.0, 2.0, 3.0, 4.0, 5.0]
+    assert len(lb["last30"]) == 8
+
+
+def test_category_sparklines_last_days_match_category_emissions(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "HISTORY_FILE", str(tmp_path / "history.csv"))
+    assert app.category_sparklines(7) == {}
+    days = [dt.date(2025, 1, 1) + dt.timedelta(days=i) for i in range(9)]
+    for i, d in enumerate(days):
+        app.save_entry(d, {"electricity_kwh": float(i), "bus_km": 2.0 * i}, 0.0)
+
+    spark = app.category_sparklines(7)
+    expected = [app.compute_category_emissions({"electricity_kwh": float(i), "bus_km": 2.0 * i}) for i in range(2, 9)]
+    assert set(spark) == set(expected[0])
+    for cat, series in spark.items():
+        assert series == [e[cat] for e in expected]
+
+
+def test_bootstrap_rate_ci_bounds():
+    rng = np.random.default_rng(0)
+    lo, hi = app.bootstrap_rate_ci([10, 0, 50], [50.0, 80.0, 100.0], 500, rng=rng)
+    assert 0.0 <= lo[0] < 50.0 < hi[0] <= 100.0
+    assert lo[1] == hi[1] == 0.0  # empty bin
+    assert lo[2] == hi[2] == 100.0  # certain success
+
+
+def test_bootstrap_mode_cis_degenerate_samples():
+    rng = np.random.default_rng(0)
+    # Identical tips: every replicate has 1 distinct tip of 4 and 2 distinct bigrams of 8
+    cis = app.bootstrap_mode_cis(["turn off lights"] * 4, [True] * 4, 200, rng=rng)
+    assert cis["ok_ci"] == (100.0, 100.0)
+    assert cis["uniq_tips_ci"] == (25.0, 25.0)
+    assert cis["uniq_bi_ci"] == (25.0, 25.0)
+    assert app.bootstrap_mode_cis([], [], 200)["ok_ci"] == (0.0, 0.0)
+
+
+def test_bigram_counts_stay_within_each_tip():
+    texts = pd.Series(["turn off lights", "turn off", "", "lights turn"], index=[7, 3, 9, 1])
+    # bigrams: (turn,off) (off,lights) | (turn,off) | - | (lights,turn); none across tips
+    assert app._bigram_counts(texts) == (4, 3)
+
+
+def test_bigram_counts_weight_repeated_tips():
+    # Each repeat is tokenized once but still counts toward the total
+    texts = pd.Series(["turn off lights"] * 3 + ["walk more", None])
+    assert app._bigram_counts(texts) == (7, 3)
+
+
+def test_set_prefs_writes_only_on_change(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "PREFS_PATH", str(tmp_path / "prefs.json"))
+    monkeypatch.setitem(app.st.session_state, "user_prefs", {})
+    writes = []
+    real_save = app.save_user_prefs
+    monkeypatch.setattr(app, "save_user_prefs", lambda p: (writes.append(dict(p)), real_save(p)))
+
+    app.set_prefs({"a": 1, "b": [1, 2]})
+    app.set_pref("a", 1)
+    app.set_prefs({"a": 1, "b": [1, 2]})
+    assert len(writes) == 1
+    app.set_pref("b", [3])
+    assert writes[-1] == {"a": 1, "b": [3]}
+    assert app.get_pref("b") == [3]
+
+
+def test_submit_chart_png_renders_in_background_once(monkeypatch):
+    calls = []
+
+    def fake_save(chart, fp, fmt, method):
+        calls.append(fmt)
+        fp.write(b"PNG")
+
+    class Chart:
+        def to_json(self):
+            return "{}"
+
+    monkeypatch.setattr(app, "alt_save", lambda: fake_save)
+    monkeypatch.delitem(app.st.session_state, "png_test", raising=False)
+    app.submit_chart_png("png_test", Chart())
+    app.st.session_state["png_test"][1].result(timeout=5)
+    app.submit_chart_png("png_test", Chart())  # unchanged spec: not queued again
+    assert app.chart_png_result("png_test") == b"PNG"
+    assert calls == ["png"]
+    del app.st.session_state["png_test"]
+
+
+def test_prompt_mode_summary_per_mode_stats():
+    df = pd.DataFrame({
+        "mode": pd.Categorical(["B", "A", "B", "A", "B"]),
+        "tip_low": ["turn off lights", "use bus", "turn off lights", "", "walk"],
+        "words": [3, 2, 3, 0, 1],
+        "fallback": [True, False, False, False, True],
+    })
+    rows = app.prompt_mode_summary(df).set_index("mode")
+    assert rows.loc["A", "samples"] == 2 and rows.loc["A", "unique_tips"] == 2
+    assert rows.loc["B", "unique_tips_%"] == pytest.approx(200.0 / 3.0)
+    assert rows.loc["B", "unique_bigrams"] == 2 and rows.loc["B", "unique_bigrams_%"] == pytest.approx(50.0)
+    assert rows.loc["B", "fallbacks"] == 2
+    assert list(rows.index) == ["A", "B"]
+
+
+def test_suite_mode_metrics_point_estimates_and_cis():
+    df = pd.DataFrame({
+        "mode": ["B", "A", "B", "A"],
+        "tip_low": ["turn off lights", "use bus", "turn off lights", "use bus"],
+        "ok": [True, False, True, True],
+    })
+    rows = app.suite_mode_metrics(df, 200, rng=np.random.default_rng(0)).set_index("mode")
+    assert list(rows.index) == ["A", "B"]
+    assert rows.loc["A", "ok_rate_%"] == pytest.approx(50.0)
+    assert rows.loc["B", "unique_tips_%"] == pytest.approx(50.0)
+    assert rows.loc["B", "unique_bigrams"] == 2 and rows.loc["B", "unique_bigrams_%"] == pytest.approx(50.0)
+    # B is always OK and always one tip, so its CIs collapse onto the point estimates
+    assert (rows.loc["B", "ok_rate_ci_low"], rows.loc["B", "ok_rate_ci_high"]) == (100.0, 100.0)
+    assert (rows.loc["B", "unique_tips_ci_low"], rows.loc["B", "unique_tips_ci_high"]) == (50.0, 50.0)
+    assert 0.0 <= rows.loc["A", "ok_rate_ci_low"] <= 50.0 <= rows.loc["A", "ok_rate_ci_high"] <= 100.0
+
+
+def test_run_prompt_suite_rows_and_seeded_perturbation(monkeypatch):
+    monkeypatch.setattr(
+        app, "generate_eco_tips_for_modes",
+        lambda inputs, em, modes, category: {m: (f"Turn off the heating ({m})", "prompt") for m in modes},
+    )
+    scenarios = [("Energy", {"electricity_kwh": 9.5}), ("Ambiguous", {"note": "help"})]
+    args = dict(scenarios=scenarios, var_n=2, modes=("Directive", "Persona"), boot_n=100, seed=7, thresholds={})
+    df_cmp, per_mode = app.run_prompt_suite(**args, run_id=0)
+    assert len(df_cmp) == 2 * 2 * 2
+    assert list(df_cmp.columns[:8]) == ["timestamp", "category", "mode", "emissions_est_kg", "tip", "relevant", "actionable", "simple"]
+    assert df_cmp.groupby("category")["input_type"].first().to_dict() == {"Ambiguous": "help", "Energy": "valid"}
+    assert per_mode["samples"].tolist() == [4, 4]
+    # Same seed, different run_id (cache miss): identical perturbed estimates
+    again, _ = app.run_prompt_suite(**args, run_id=1)
+    assert again["emissions_est_kg"].tolist() == df_cmp["emissions_est_kg"].tolist()
+
+
+def test_tip_quality_flags_relevance_by_category():
+    tips = pd.Series(["Turn off the heating tonight.", "Take the bus to work.", "Use less.", "Nice weather."])
+    cats = pd.Series(["Energy", "Energy", "", "Mixed"])
+    # heating matches Energy; bus is a Transport hint; blank category is always relevant; no verb
+    flags = app.tip_quality_flags(tips, cats)
+    assert flags["ok"].tolist() == [True, False, True, False]
+    assert flags["relevant"].tolist() == [True, False, True, True]
+
+
+def test_cached_category_emissions_matches_and_returns_copies(monkeypatch):
+    data = {"electricity_kwh": 3.0, "bus_km": 4.0, "meat_kg": 0.2}
+    expected = app.compute_category_emissions(data)
+    calls = []
+    real = app.compute_category_emissions
+    monkeypatch.setattr(app, "compute_category_emissions", lambda d: calls.append(d) or real(d))
+    app._cat_emissions_cached.clear()
+    first = app.cached_category_emissions(data)
+    assert first == expected
+    first["Energy"] = -1.0
+    # Same items in another order hit the st.cache_data entry and get an unmodified copy
+    assert app.cached_category_emissions(dict(reversed(list(data.items())))) == expected
+    assert len(calls) == 1
+    monkeypatch.undo()
+    # Unhashable values fall back to the direct computation
+    assert app.cached_category_emissions({"electricity_kwh": [1]}) == app.compute_category_emissions({"electricity_kwh": [1]})
+
+
+def test_pdf_margins_survive_json_round_trip():
+    m = app.PdfMargins(2.0, 1.0, 0.5)
+    assert app._as_pdf_margins(json.loads(json.dumps(m))) == m
+    assert app._as_pdf_margins({"side": 2, "bottom": 0.5}) == app.PdfMargins(2.0, 1.5, 0.5)
+    assert app._as_pdf_margins(None) == app.PdfMargins()
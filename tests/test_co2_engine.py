@@ -9,6 +9,12 @@ from co2_engine import (
     get_effective_electricity_factor,
     get_grid_mix,
     compute_mix_intensity,
+    compare_tasks_at_hours,
+    compare_tasks_columns,
+    calculate_annual_savings,
+    calculate_co2,
+    calculate_co2_breakdown,
+    calculate_co2_with_breakdown_v2,
     REGION_FACTOR_PACKS,
 )
 
@@ -59,3 +65,267 @@ def test_region_packs_loaded_from_json_or_default():
     # Ensure dict present with at least one region
     assert isinstance(REGION_FACTOR_PACKS, dict)
     assert len(REGION_FACTOR_PACKS) > 0
+
+
+def test_compare_tasks_at_hours_skips_invalid_and_uses_first_min_hour():
+    profile = [0.3] * 24
+    profile[5] = 0.1
+    profile[9] = 0.1
+    tasks = [
+        {"name": "Laundry", "kwh": 2.0, "hour": 20},
+        {"name": "Broken", "kwh": "abc", "hour": 3},
+        {"name": "Wrap", "kwh": 1.0, "hour": 29},
+    ]
+    res = compare_tasks_at_hours(profile, tasks)
+    assert [r["name"] for r in res] == ["Laundry", "Wrap"]
+    assert all(r["optimal_hour"] == 5 for r in res)
+    assert res[0]["current_co2_kg"] == 0.6
+    assert res[0]["savings_kg"] == 0.4
+    assert res[1]["current_hour"] == 5 and res[1]["savings_kg"] == 0.0
+
+
+def test_compare_tasks_columns_returns_arrays():
+    profile = [0.3] * 24
+    profile[5] = 0.1
+    cols = compare_tasks_columns(profile, [{"name": "A", "kwh": 1.0, "hour": 1}, {"name": "B", "kwh": 3.0, "hour": 2}])
+    assert list(cols["name"]) == ["A", "B"]
+    assert int(cols["savings_kg"].argmax()) == 1
+    assert list(cols["optimal_hour"]) == [5, 5]
+    empty = compare_tasks_columns(profile, [])
+    assert all(len(v) == 0 for v in empty.values())
+
+
+def test_calculate_annual_savings_best_hour():
+    profile = [0.2] * 24
+    profile[3] = 0.1
+    out = calculate_annual_savings(1.0, 20, profile)
+    assert out["best_hour"] == 3
+    assert out["daily_savings_kg"] == 0.1
+    assert out["savings_pct"] == 50.0
+
+
+def test_calculate_co2_and_breakdown_skip_invalid_and_clip_negatives():
+    data = {"Electricity (kWh)": 4.2, "bus_km": 12, "diesel_liter": -2, "petrol_liter": "a", "unknown": 1}
+    br = calculate_co2_breakdown(data)
+    assert br == {"electricity_kwh": round(4.2 * 0.233, 4), "bus_km": round(12 * 0.12, 4)}
+    assert calculate_co2(data) == round(4.2 * 0.233 + 12 * 0.12, 2)
+    assert calculate_co2({}) == 0.0 and calculate_co2_breakdown({}) == {}
+
+
+def test_calculate_co2_with_breakdown_v2_matches_separate_calls():
+    data = {"electricity_kwh": 10.0, "bus_km": 5.0, "meat_kg": "x"}
+    for kw in ({}, {"region_code": "FR"}, {"renewable_adjust": 0.5}):
+        total, br = calculate_co2_with_breakdown_v2(data, **kw)
+        assert total == calculate_co2_v2(data, **kw)
+        assert br == calculate_co2_breakdown_v2(data, **kw)
+    assert calculate_co2_with_breakdown_v2(data, renewable_adjust=0.5)[1]["electricity_kwh"] == round(10.0 * 0.233 * 0.5, 4)
+
+
+def test_sum_emissions_kernel_matches_dot():
+    import numpy as np
+    import co2_engine
+    idx = np.array([0, 7, 12, 0], dtype=np.intp)
+    amts = np.array([1.0, 2.0, 3.0, 0.5])
+    expected = float(np.dot(co2_engine._FACTOR_VALUES[idx], amts))
+    assert co2_engine._sum_emissions_kernel(idx, amts, co2_engine._FACTOR_VALUES) == pytest.approx(expected)
+
+
+def test_hourly_profile_and_grid_mix_memoized_copies():
+    from co2_engine import hourlyIntensityProfile
+    p1 = hourlyIntensityProfile(" EU-avg ", "Summer")
+    p1[0] = -1.0
+    p2 = hourlyIntensityProfile("EU-avg", "summer")
+    assert p2[0] != -1.0 and len(p2) == 24
+    mix = get_grid_mix("EU-avg")
+    mix.clear()
+    assert get_grid_mix("EU-avg")
+
+
+def test_efficiency_score_single_pass_categories():
+    from co2_engine import efficiency_score
+    low = efficiency_score({"electricity_kwh": 0.0, "bus_km": 0.0})
+    assert low["score"] == 100 and low["category_scores"] == {"Energy": 100, "Transport": 100, "Meals": 100}
+    # Energy at exactly its 8 kg baseline scores 50; junk and unknown keys are ignored
+    out = efficiency_score({"electricity_kwh": 8.0 / 0.233, "meat_kg": "x", "unknown": 5})
+    assert out["category_scores"]["Energy"] == 50 and out["category_scores"]["Meals"] == 100
+
+
+def test_device_presets_by_category_returns_fresh_lists():
+    from co2_engine import DEVICE_PRESETS, get_device_presets_by_category, _PRESET_NAMES, _PRESET_POWER_W, _PRESET_HOURS
+
+    cats = get_device_presets_by_category()
+    assert sorted(n for names in cats.values() for n in names) == sorted(DEVICE_PRESETS)
+    assert cats["Kitchen"][0] == "Refrigerator"
+    cats["Kitchen"].append("Toy")
+    assert "Toy" not in get_device_presets_by_category()["Kitchen"]
+
+    i = _PRESET_NAMES.index("Dryer")
+    assert _PRESET_POWER_W[i] == 3000 and _PRESET_HOURS[i] == 0.8
+
+
+def test_season_shape_dispatch():
+    from co2_engine import _season_shape
+    assert _season_shape("winter") == "winter_dual_peak"
+    assert _season_shape("late fall") == "autumn_transition"
+    assert _season_shape("") == "flat"
+
+
+def test_calculate_co2_verbose_collects_warnings(caplog):
+    from co2_engine import calculate_co2_verbose
+    total, warnings = calculate_co2_verbose({"electricity_kwh": 10, "bus_km": -3, "meat_kg": "x", "teleport_km": 1})
+    assert total == calculate_co2({"electricity_kwh": 10})
+    assert len(warnings) == 3 and any("teleport_km" in w for w in warnings)
+    with caplog.at_level("WARNING", logger="co2_engine"):
+        calculate_co2({"teleport_km": 1})
+    assert "teleport_km" in caplog.text
+
+
+def test_effective_electricity_factor_memoized_and_consistent_with_v2():
+    from co2_engine import CO2_FACTORS, _effective_electricity_factor
+    base = CO2_FACTORS["electricity_kwh"]
+    assert get_effective_electricity_factor(None, 0.25) == base * 0.75
+    assert get_effective_electricity_factor(None, "junk") == base
+    hits = _effective_electricity_factor.cache_info().hits
+    get_effective_electricity_factor(None, 0.25)
+    assert _effective_electricity_factor.cache_info().hits == hits + 1
+    # The cache key is the exact adjustment, so totals agree with calculate_co2_v2
+    for adj in (0.12345, 0.00004):
+        ef = get_effective_electricity_factor(None, adj)
+        assert round(ef * 100000.0, 2) == calculate_co2_v2({"electricity_kwh": 100000.0}, renewable_adjust=adj)
+
+
+def test_mix_items_intensity_matches_public_function():
+    from co2_engine import _grid_mix_items, _mix_items_intensity
+    for code in REGION_FACTOR_PACKS:
+        items = _grid_mix_items(code)
+        if items:
+            assert _mix_items_intensity(items) == compute_mix_intensity(get_grid_mix(code))
+
+
+def test_hourly_profile_with_best_matches_profile_argmin():
+    from co2_engine import hourly_profile_with_best, hourlyIntensityProfile
+    profile, best_hour, best = hourly_profile_with_best("EU-avg", "Winter")
+    assert profile == hourlyIntensityProfile("EU-avg", "Winter")
+    assert best_hour == profile.index(min(profile)) and best == profile[best_hour]
+    out = calculate_annual_savings(2.0, 18, profile, best_hour=best_hour)
+    assert out == calculate_annual_savings(2.0, 18, profile)
+
+
+def test_region_packs_load_lazily_once():
+    import co2_engine
+    packs = co2_engine._get_region_packs()
+    assert co2_engine.REGION_FACTOR_PACKS is packs
+    assert co2_engine.get_region_codes() == sorted(packs)
+    with pytest.raises(AttributeError):
+        co2_engine.NOT_A_THING
+
+
+def test_simple_forecast_next7_uses_last_week_and_ignores_bad_values():
+    from co2_engine import simple_forecast_next7
+    assert simple_forecast_next7(None) == [0.0] * 7
+    assert simple_forecast_next7([100.0] + [2.0] * 7) == [2.0] * 7
+    assert simple_forecast_next7([None, -4.0, float("nan"), 3.0]) == [1.0] * 7
+
+
+def test_topn_low_kernel_matches_nsmallest():
+    import heapq
+    import random
+    import numpy as np
+    from co2_engine import _topn_low_kernel
+    rng = random.Random(7)
+    for _ in range(200):
+        profile = [rng.choice([0.1, 0.2, 0.3, rng.random()]) for _ in range(24)]
+        n = rng.randint(1, 30)
+        expected = heapq.nsmallest(n, range(24), key=profile.__getitem__)
+        assert _topn_low_kernel(np.asarray(profile), n).tolist() == expected
+
+
+def test_weekly_goal_plan_incremental_matches_batch():
+    from co2_engine import weekly_goal_plan, weekly_goal_plan_incremental
+    state = None
+    days = [4.0, 6.5, 3.25]
+    for i, kg in enumerate(days, start=1):
+        plan, state = weekly_goal_plan_incremental(state, kg, 7 - i, 40.0)
+        assert plan == weekly_goal_plan(sum(days[:i]), 7 - i, 40.0)
+    assert state == {"sum": 13.75, "elapsed": 3}
+
+
+def test_estimate_offsets_shares_read_only_mix():
+    from co2_engine import estimate_offsets
+    out = estimate_offsets(2500.0, None, 20.0)
+    assert "week" not in out
+    assert out["today"]["tonnes"] == 2.5 and out["today"]["cost_usd"] == 50.0
+    mix = out["today"]["mix"]
+    assert [m["project"] for m in mix][0] == "Reforestation" and sum(m["share"] for m in mix) == 1.0
+    with pytest.raises(TypeError):
+        mix[0]["share"] = 1.0
+    assert estimate_offsets(-5, 1000)["week"]["mix"] is mix
+
+
+def test_reload_region_packs_clears_derived_caches(monkeypatch):
+    import co2_engine
+    before = co2_engine.get_effective_electricity_factor("FR", None)
+    packs = {"FR": {"factors": {"electricity_kwh": 0.5}, "grid_mix": {"coal": 1.0}}}
+    monkeypatch.setattr(co2_engine, "_load_region_packs_from_json", lambda: packs)
+    try:
+        assert co2_engine.reload_region_packs() is packs
+        assert co2_engine.get_effective_electricity_factor("FR", None) == 0.5
+        assert co2_engine.get_grid_mix("FR") == {"coal": 1.0}
+        assert co2_engine.get_region_codes() == ["FR"]
+    finally:
+        monkeypatch.undo()
+        co2_engine.reload_region_packs()
+    assert co2_engine.get_effective_electricity_factor("FR", None) == before
+
+
+def test_annual_savings_batch_matches_scalar_per_device():
+    from co2_engine import DEVICE_PRESETS, annual_savings_batch, hourlyIntensityProfile
+    profile = hourlyIntensityProfile("EU-avg", "Winter")
+    cols = annual_savings_batch(profile, 19)
+    assert len(cols["name"]) == len(DEVICE_PRESETS)
+    for name in ("Dryer", "Central AC", "EV Charging (Level 2)"):
+        i = list(cols["name"]).index(name)
+        info = DEVICE_PRESETS[name]
+        scalar = calculate_annual_savings(info["power_w"] * info["hours_per_day"] / 1000.0, 19, profile)
+        assert cols["yearly_savings_kg"][i] == pytest.approx(scalar["yearly_savings_kg"], abs=0.011)
+        assert cols["category"][i] == info["category"]
+
+
+def test_task_hour_matrix_agrees_with_compare_columns():
+    import numpy as np
+    from co2_engine import task_hour_matrix, hourlyIntensityProfile
+    profile = hourlyIntensityProfile("EU-avg", "Summer")
+    tasks = [{"name": "Wash", "kwh": 1.5, "hour": 20}, {"name": "bad", "kwh": "x"}, {"name": "EV", "kwh": 7.0, "hour": 2}]
+    names, m = task_hour_matrix(profile, tasks)
+    cols = compare_tasks_columns(profile, tasks)
+    assert names == ["Wash", "EV"] and m.shape == (24, 2)
+    assert np.round(m[cols["current_hour"], [0, 1]], 3).tolist() == cols["current_co2_kg"].tolist()
+    assert np.round(m.min(axis=0), 3).tolist() == cols["optimal_co2_kg"].tolist()
+
+
+def test_calculate_co2_batch_matches_per_day_totals():
+    import pandas as pd
+    from co2_engine import calculate_co2_batch
+    days = [
+        {"electricity_kwh": 12.5, "petrol_liter": 3.0, "meat_kg": 0.2},
+        {"electricity_kwh": 0.0, "bus_km": 20.0, "meat_kg": -1.0},
+        {"electricity_kwh": 7.0, "petrol_liter": 0.0, "bus_km": 4.5},
+    ]
+    df = pd.DataFrame(days).fillna(0.0)
+    for kw in ({}, {"region_code": "EU-avg"}, {"renewable_adjust": 0.3}):
+        expected = [calculate_co2_v2(d, **kw) for d in days]
+        assert calculate_co2_batch(df, **kw).tolist() == expected
+    # Missing values and junk count as zero
+    mixed = {"electricity_kwh": [1.0, None, "x"], "unknown_key": [5, 5, 5]}
+    assert calculate_co2_batch(mixed).tolist() == [calculate_co2_v2({"electricity_kwh": 1.0}), 0.0, 0.0]
+
+
+def test_compute_mix_intensity_cached_on_validated_items():
+    from co2_engine import _mix_items_intensity
+    _mix_items_intensity.cache_clear()
+    a = compute_mix_intensity({"Coal": "0.5", "gas": 0.5, "bogus": "x"})
+    b = compute_mix_intensity({"coal": 0.5, "GAS": 0.5})
+    assert a == b
+    info = _mix_items_intensity.cache_info()
+    assert (info.hits, info.misses) == (1, 1)
+    assert compute_mix_intensity({}) == 0.0 and isinstance(compute_mix_intensity({}), float)
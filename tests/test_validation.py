@@ -1,6 +1,7 @@
 import pytest
 
 import app  # import validation helpers from the Streamlit app module
+from app_helpers import has_meaningful_input  # app.py no longer needs it, so it is not re-exported there
 
 
 def test_has_meaningful_input_true_when_any_gt_zero():
@@ -9,7 +10,7 @@ def test_has_meaningful_input_true_when_any_gt_zero():
         "bus_km": 2.0,
         "meat_kg": 0.0,
     }
-    assert app.has_meaningful_input(user_data) is True
+    assert has_meaningful_input(user_data) is True
 
 
 def test_has_meaningful_input_false_for_all_zero_or_none():
@@ -18,7 +19,7 @@ def test_has_meaningful_input_false_for_all_zero_or_none():
         "bus_km": 0.0,
         "meat_kg": None,
     }
-    assert app.has_meaningful_input(user_data) is False
+    assert has_meaningful_input(user_data) is False
 
 
 def test_find_invalid_fields_negative_values():
@@ -50,6 +51,6 @@ def test_combined_validations_edge_mix():
         "meat_kg": -0.1,
         "train_km": 0.0,
     }
-    assert app.has_meaningful_input(user_data) is False
+    assert has_meaningful_input(user_data) is False
     invalid = app.find_invalid_fields(user_data)
     assert set(invalid) == {"bus_km", "meat_kg"}